@@ -0,0 +1,229 @@
+import { mkdir, readdir, readFile, rm, writeFile } from "node:fs/promises";
+import { join } from "node:path";
+
+// Rough per-event framing overhead when estimating a batch body size.
+const EVENT_OVERHEAD_BYTES = 256;
+
+const estimateBytes = (value) => {
+  try {
+    return JSON.stringify(value).length + EVENT_OVERHEAD_BYTES;
+  } catch (err) {
+    return EVENT_OVERHEAD_BYTES;
+  }
+};
+
+/**
+ * Whether a failed send is worth spooling and retrying. Errors carrying a 4xx `status`
+ * mean the viewer rejected the batch itself, so replaying it would fail the same way;
+ * 408 and 429 are the exceptions. Errors without a status (network, 5xx) are retried.
+ */
+export const isRetryableSendError = (err) => {
+  const status = Number(err?.status);
+  if (!Number.isFinite(status) || status < 400 || status >= 500) {
+    return true;
+  }
+  return status === 408 || status === 429;
+};
+
+/**
+ * Bounded on-disk spool of raw-event batches, one JSON file per batch.
+ *
+ * When full, the oldest batches are dropped. A replayed batch may be sent twice (e.g.
+ * two plugin processes sharing a spool); the viewer dedupes on event_id.
+ */
+export const createRawEventSpool = ({ dir, maxBatches = 200 }) => {
+  let counter = 0;
+
+  const list = async () => {
+    try {
+      const names = await readdir(dir);
+      return names.filter((name) => name.endsWith(".json")).sort();
+    } catch (err) {
+      return [];
+    }
+  };
+
+  const append = async (batch) => {
+    if (!dir || maxBatches <= 0) {
+      return 0;
+    }
+    await mkdir(dir, { recursive: true });
+    counter += 1;
+    const stamp = String(Date.now()).padStart(15, "0");
+    const suffix = `${process.pid}-${String(counter).padStart(6, "0")}`;
+    await writeFile(join(dir, `${stamp}-${suffix}.json`), JSON.stringify(batch));
+    const names = await list();
+    const overflow = names.slice(0, Math.max(0, names.length - maxBatches));
+    await Promise.all(overflow.map((name) => rm(join(dir, name), { force: true })));
+    return overflow.length;
+  };
+
+  const drain = async (send) => {
+    let sent = 0;
+    for (const name of await list()) {
+      const path = join(dir, name);
+      let batch;
+      try {
+        batch = JSON.parse(await readFile(path, "utf8"));
+      } catch (err) {
+        await rm(path, { force: true });
+        continue;
+      }
+      await send(batch);
+      await rm(path, { force: true });
+      sent += 1;
+    }
+    return sent;
+  };
+
+  const size = async () => (await list()).length;
+
+  return { append, drain, size };
+};
+
+/**
+ * Coalesces raw events per session and sends them as one `events` POST body.
+ *
+ * A session's buffer is sent when it reaches `maxBatchEvents` / `maxBatchBytes`, or
+ * `flushDelayMs` after its first event. Batches that fail to send, or arrive while
+ * `isAvailable()` is false (backoff), go to the spool. The spool is replayed before the
+ * next send, and every `drainIntervalMs` while it holds batches, so it empties once the
+ * viewer is back even if no new events arrive. Batches rejected with a non-retryable
+ * error (see `isRetryableSendError`) are reported and dropped, never spooled.
+ */
+export const createRawEventBatcher = ({
+  send,
+  spool = null,
+  flushDelayMs = 100,
+  maxBatchEvents = 50,
+  maxBatchBytes = 512 * 1024,
+  isAvailable = () => true,
+  isRetryable = isRetryableSendError,
+  drainIntervalMs = 1000,
+  onError = () => {},
+}) => {
+  const pending = new Map();
+  let timer = null;
+  let drainTimer = null;
+  let chain = Promise.resolve();
+
+  const takeBatch = (sessionID) => {
+    const entry = pending.get(sessionID);
+    pending.delete(sessionID);
+    if (!entry || !entry.events.length) {
+      return null;
+    }
+    return { ...entry.meta, opencode_session_id: sessionID, events: entry.events };
+  };
+
+  // Replays one spooled batch; a non-retryable rejection drops it instead of blocking
+  // the rest of the spool behind it.
+  const replay = async (batch) => {
+    try {
+      await send(batch);
+    } catch (err) {
+      if (isRetryable(err)) {
+        throw err;
+      }
+      await onError(err, batch);
+    }
+  };
+
+  const scheduleDrain = () => {
+    if (!spool || drainTimer) {
+      return;
+    }
+    drainTimer = setTimeout(() => {
+      drainTimer = null;
+      chain = chain.then(drainSpool);
+    }, Math.max(0, drainIntervalMs));
+    drainTimer.unref?.();
+  };
+
+  const drainSpool = async () => {
+    if (!isAvailable()) {
+      scheduleDrain();
+      return;
+    }
+    try {
+      await spool.drain(replay);
+    } catch (err) {
+      scheduleDrain();
+      await onError(err, null);
+    }
+  };
+
+  const deliver = async (batch) => {
+    if (!isAvailable()) {
+      if (spool) {
+        await spool.append(batch);
+        scheduleDrain();
+      }
+      return;
+    }
+    try {
+      if (spool) {
+        await spool.drain(replay);
+      }
+      await send(batch);
+    } catch (err) {
+      if (spool && isRetryable(err)) {
+        try {
+          await spool.append(batch);
+        } catch (spoolErr) {
+          // spool is best-effort; the original error is reported below
+        }
+        scheduleDrain();
+      }
+      await onError(err, batch);
+    }
+  };
+
+  // Sends run one at a time so batches reach the viewer in the order they were taken.
+  const enqueueDelivery = (batch) => {
+    chain = chain.then(() => deliver(batch));
+    return chain;
+  };
+
+  const flushSession = (sessionID) => {
+    const batch = takeBatch(sessionID);
+    return batch ? enqueueDelivery(batch) : chain;
+  };
+
+  const flush = () => {
+    if (timer) {
+      clearTimeout(timer);
+      timer = null;
+    }
+    for (const sessionID of [...pending.keys()]) {
+      flushSession(sessionID);
+    }
+    return chain;
+  };
+
+  const add = (sessionID, event, meta = {}) => {
+    let entry = pending.get(sessionID);
+    if (!entry) {
+      entry = { events: [], bytes: 0, meta };
+      pending.set(sessionID, entry);
+    }
+    entry.meta = { ...entry.meta, ...meta };
+    entry.events.push(event);
+    entry.bytes += estimateBytes(event);
+    if (entry.events.length >= maxBatchEvents || entry.bytes >= maxBatchBytes) {
+      return flushSession(sessionID);
+    }
+    if (!timer) {
+      timer = setTimeout(() => {
+        timer = null;
+        void flush();
+      }, Math.max(0, flushDelayMs));
+    }
+    return chain;
+  };
+
+  const pendingCount = () =>
+    [...pending.values()].reduce((total, entry) => total + entry.events.length, 0);
+
+  return { add, flush, pendingCount };
+};
@@ -3,6 +3,11 @@ import { dirname } from "node:path";
 import { tool } from "@opencode-ai/plugin";
 
 import { isVersionAtLeast, parseSemver, resolveUpgradeGuidance } from "../lib/compat.js";
+import {
+  createRawEventBatcher,
+  createRawEventSpool,
+  isRetryableSendError,
+} from "../lib/raw-event-batcher.js";
 
 const TRUTHY_VALUES = ["1", "true", "yes"];
 const DISABLED_VALUES = ["0", "false", "off"];
@@ -25,6 +30,13 @@ const resolveLogPath = (logPathEnvRaw, cwd, homeDir) => {
   return logPathEnvRaw;
 };
 
+const resolveSpoolDir = (spoolDirEnvRaw, cwd, homeDir) => {
+  if (spoolDirEnvRaw && DISABLED_VALUES.includes(normalizeEnvValue(spoolDirEnvRaw))) {
+    return null;
+  }
+  return spoolDirEnvRaw || `${homeDir || cwd}/.codemem/raw-events-spool`;
+};
+
 const createLogLine = (logPath) => async (line) => {
   if (!logPath) {
     return;
@@ -184,6 +196,12 @@ export const OpencodeMemPlugin = async ({
   const injectLimit = injectLimitEnv ? parseNumber(injectLimitEnv, null) : null;
   const injectTokenBudgetEnv = process.env.CODEMEM_INJECT_TOKEN_BUDGET;
   const injectTokenBudget = injectTokenBudgetEnv ? parseNumber(injectTokenBudgetEnv, null) : null;
+  // Prefer the warm /api/pack endpoint in the viewer; the CLI is only a fallback.
+  const packUrl = `http://${viewerHost}:${viewerPort}/api/pack`;
+  const injectHttpTimeoutMs = parseNumber(
+    process.env.CODEMEM_INJECT_HTTP_TIMEOUT_MS || "5000",
+    5000
+  );
   const injectedSessions = new Map();
   const injectionToastShown = new Set();
   let sessionStartedAt = null;
@@ -211,6 +229,23 @@ export const OpencodeMemPlugin = async ({
     process.env.CODEMEM_RAW_EVENTS_STATUS_CHECK_MS || "30000",
     30000
   );
+  const rawEventsBatchMs = parseNumber(
+    process.env.CODEMEM_RAW_EVENTS_BATCH_MS || "100",
+    100
+  );
+  const rawEventsBatchMax = parseNumber(
+    process.env.CODEMEM_RAW_EVENTS_BATCH_MAX || "50",
+    50
+  );
+  const rawEventsSpoolDir = resolveSpoolDir(
+    process.env.CODEMEM_RAW_EVENTS_SPOOL_DIR,
+    cwd,
+    process.env.HOME
+  );
+  const rawEventsSpoolMaxBatches = parseNumber(
+    process.env.CODEMEM_RAW_EVENTS_SPOOL_MAX_BATCHES || "200",
+    200
+  );
   let streamUnavailableUntil = 0;
   let streamErrorNoted = false;
   let lastStatusCheckAt = 0;
@@ -233,95 +268,122 @@ export const OpencodeMemPlugin = async ({
     return true;
   };
 
-  const emitRawEvent = async ({ sessionID, type, payload }) => {
-    if (!rawEventsEnabled || !sessionID || !type) {
-      return;
-    }
+  const sendRawEventBatch = async (batch) => {
     const now = Date.now();
-    if (now < streamUnavailableUntil) {
-      return;
-    }
-    try {
-      if (now - lastStatusCheckAt >= Math.max(1000, rawEventsStatusCheckMs)) {
-        const statusResp = await fetch(rawEventsStatusUrl, { method: "GET" });
-        if (!statusResp.ok) {
-          throw new Error(`raw-events status failed (${statusResp.status})`);
-        }
-        const statusJson = await statusResp.json();
-        lastStatusAvailable = statusJson?.ingest?.available !== false;
-        lastStatusCheckAt = now;
-      }
-      if (!lastStatusAvailable) {
-        throw new Error("raw-events ingest unavailable");
+    if (now - lastStatusCheckAt >= Math.max(1000, rawEventsStatusCheckMs)) {
+      const statusResp = await fetch(rawEventsStatusUrl, { method: "GET" });
+      if (!statusResp.ok) {
+        throw new Error(`raw-events status failed (${statusResp.status})`);
       }
+      const statusJson = await statusResp.json();
+      lastStatusAvailable = statusJson?.ingest?.available !== false;
+      lastStatusCheckAt = now;
+    }
+    if (!lastStatusAvailable) {
+      throw new Error("raw-events ingest unavailable");
+    }
+    // One POST per batch; fetch keeps the connection alive between batches.
+    const postResp = await fetch(rawEventsUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(batch),
+    });
+    if (!postResp.ok) {
+      const err = new Error(`raw-events post failed (${postResp.status})`);
+      err.status = postResp.status;
+      throw err;
+    }
+    streamUnavailableUntil = 0;
+    streamErrorNoted = false;
+    lastStatusAvailable = true;
+  };
 
-      const body = {
-        opencode_session_id: sessionID,
-        event_id: nextEventId(),
-        event_type: type,
-        ts_wall_ms: Date.now(),
-        ts_mono_ms:
-          typeof performance !== "undefined" && performance.now
-            ? performance.now()
-            : null,
-        payload,
-        cwd,
-        project: project?.name || (project?.root ? String(project.root).split(/[/\\]/).filter(Boolean).pop() : null) || null,
-        started_at: sessionStartedAt,
-      };
-      const postResp = await fetch(rawEventsUrl, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(body),
-      });
-      if (!postResp.ok) {
-        throw new Error(`raw-events post failed (${postResp.status})`);
-      }
-      streamUnavailableUntil = 0;
-      streamErrorNoted = false;
-      lastStatusAvailable = true;
-    } catch (err) {
+  const handleRawEventBatchError = async (err, batch) => {
+    const sessionID = batch?.opencode_session_id || null;
+    const count = Array.isArray(batch?.events) ? batch.events.length : 0;
+    const retryable = isRetryableSendError(err);
+    if (retryable) {
       streamUnavailableUntil = Date.now() + Math.max(1000, rawEventsBackoffMs);
-      await logLine(`raw_events.error sessionID=${sessionID} type=${type} err=${String(err).slice(0, 200)}`);
+    }
+    await logLine(`raw_events.error sessionID=${sessionID} count=${count} err=${String(err).slice(0, 200)}`);
+    await client.app.log({
+      service: "codemem",
+      level: "error",
+      message: "Failed to stream raw events to codemem viewer",
+      extra: {
+        sessionID,
+        count,
+        viewerHost,
+        viewerPort,
+        error: String(err),
+      },
+    });
+    // A rejected batch (4xx) is dropped; the stream itself is fine, so no backoff or toast.
+    if (!retryable) {
+      return;
+    }
+
+    if (!streamErrorNoted) {
+      streamErrorNoted = true;
       await client.app.log({
         service: "codemem",
         level: "error",
-        message: "Failed to stream raw events to codemem viewer",
+        message: rawEventsSpoolDir
+          ? "codemem stream unavailable; spooling raw events to disk"
+          : "codemem stream unavailable; no fallback available",
         extra: {
           sessionID,
-          type,
-          viewerHost,
-          viewerPort,
-          error: String(err),
+          backoffMs: rawEventsBackoffMs,
+          spoolDir: rawEventsSpoolDir,
         },
       });
+    }
 
-      if (!streamErrorNoted) {
-        streamErrorNoted = true;
-        await client.app.log({
-          service: "codemem",
-          level: "error",
-          message: "codemem stream unavailable; no fallback available",
-          extra: {
-            sessionID,
-            backoffMs: rawEventsBackoffMs,
+    if (client.tui?.showToast && sessionID && shouldToast(sessionID)) {
+      const fallback = rawEventsSpoolDir ? "events spooled for retry" : "no fallback";
+      try {
+        await client.tui.showToast({
+          body: {
+            message: `codemem: stream unavailable (${viewerHost}:${viewerPort}); ${fallback}`,
+            variant: "error",
           },
         });
+      } catch (toastErr) {
+        // best-effort only
       }
+    }
+  };
 
-      if (client.tui?.showToast && shouldToast(sessionID)) {
-        try {
-          await client.tui.showToast({
-            body: {
-              message: `codemem: stream unavailable (${viewerHost}:${viewerPort}); no fallback`,
-              variant: "error",
-            },
-          });
-        } catch (toastErr) {
-          // best-effort only
-        }
-      }
+  const rawEventBatcher = createRawEventBatcher({
+    send: sendRawEventBatch,
+    spool: rawEventsSpoolDir
+      ? createRawEventSpool({ dir: rawEventsSpoolDir, maxBatches: rawEventsSpoolMaxBatches })
+      : null,
+    flushDelayMs: rawEventsBatchMs,
+    maxBatchEvents: Math.max(1, rawEventsBatchMax),
+    isAvailable: () => Date.now() >= streamUnavailableUntil,
+    onError: handleRawEventBatchError,
+  });
+
+  const emitRawEvent = ({ sessionID, type, payload }) => {
+    if (!rawEventsEnabled || !sessionID || !type) {
+      return;
     }
+    const event = {
+      event_id: nextEventId(),
+      event_type: type,
+      ts_wall_ms: Date.now(),
+      ts_mono_ms:
+        typeof performance !== "undefined" && performance.now
+          ? performance.now()
+          : null,
+      payload,
+    };
+    void rawEventBatcher.add(sessionID, event, {
+      cwd,
+      project: project?.name || (project?.root ? String(project.root).split(/[/\\]/).filter(Boolean).pop() : null) || null,
+      started_at: sessionStartedAt,
+    });
   };
 
   const extractSessionID = (event) => {
@@ -742,26 +804,60 @@ export const OpencodeMemPlugin = async ({
     return masked.length > limit ? `${masked.slice(0, limit)}…` : masked;
   };
 
+  const fetchPackFromViewer = async (query) => {
+    if (!viewerEnabled) {
+      return null;
+    }
+    const params = new URLSearchParams({ context: query, cwd });
+    if (injectLimit !== null && Number.isFinite(injectLimit) && injectLimit > 0) {
+      params.set("limit", String(injectLimit));
+    }
+    if (injectTokenBudget !== null && Number.isFinite(injectTokenBudget) && injectTokenBudget > 0) {
+      params.set("token_budget", String(injectTokenBudget));
+    }
+    if (process.env.CODEMEM_PROJECT) {
+      params.set("project", process.env.CODEMEM_PROJECT);
+    }
+    try {
+      const resp = await fetch(`${packUrl}?${params.toString()}`, {
+        method: "GET",
+        signal: AbortSignal.timeout(Math.max(250, injectHttpTimeoutMs)),
+      });
+      if (!resp.ok) {
+        await logLine(`inject.pack.http_error status=${resp.status}`);
+        return null;
+      }
+      return await resp.text();
+    } catch (err) {
+      await logLine(`inject.pack.http_unavailable err=${redactLog(String(err), 200)}`);
+      return null;
+    }
+  };
+
   const buildInjectedContext = async (query) => {
-    const packArgs = buildPackArgs(query);
-    const result = await runCli(packArgs);
-    if (!result || result.exitCode !== 0) {
-      const exitCode = result?.exitCode ?? "unknown";
-      const stderr = redactLog(result?.stderr ? result.stderr.trim() : "");
-      const stdout = redactLog(result?.stdout ? result.stdout.trim() : "");
-      const cmd = [runner, ...runnerArgs, ...packArgs].join(" ");
-      await logLine(
-        `inject.pack.error ${exitCode} cmd=${cmd}` +
-          `${stderr ? ` stderr=${stderr}` : ""}` +
-          `${stdout ? ` stdout=${stdout}` : ""}`
-      );
-      return "";
+    let stdout = await fetchPackFromViewer(query);
+    if (stdout === null) {
+      const packArgs = buildPackArgs(query);
+      const result = await runCli(packArgs);
+      if (!result || result.exitCode !== 0) {
+        const exitCode = result?.exitCode ?? "unknown";
+        const stderr = redactLog(result?.stderr ? result.stderr.trim() : "");
+        const stdoutLog = redactLog(result?.stdout ? result.stdout.trim() : "");
+        const cmd = [runner, ...runnerArgs, ...packArgs].join(" ");
+        await logLine(
+          `inject.pack.error ${exitCode} cmd=${cmd}` +
+            `${stderr ? ` stderr=${stderr}` : ""}` +
+            `${stdoutLog ? ` stdout=${stdoutLog}` : ""}`
+        );
+        return "";
+      }
+      stdout = result.stdout;
     }
-    const packText = parsePackText(result.stdout);
+    const packText = parsePackText(stdout);
     if (!packText) {
       return "";
     }
-    const metrics = parsePackMetrics(result.stdout);
+    const metrics = parsePackMetrics(stdout);
     if (metrics) {
       return {
         text: `[codemem context]\n${packText}`,
@@ -850,6 +946,8 @@ export const OpencodeMemPlugin = async ({
   };
 
   const flushEvents = async () => {
+    // Hand any coalesced raw events to the viewer before the session boundary.
+    await rawEventBatcher.flush();
     if (!events.length) {
       await logLine("flush.skip empty");
       return;
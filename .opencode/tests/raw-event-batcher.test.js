@@ -0,0 +1,183 @@
+import { describe, expect, test } from "bun:test";
+import { mkdtemp, rm } from "node:fs/promises";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+
+import {
+  createRawEventBatcher,
+  createRawEventSpool,
+  isRetryableSendError,
+} from "../lib/raw-event-batcher.js";
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const httpError = (status) => Object.assign(new Error(`failed (${status})`), { status });
+
+const withSpoolDir = async (fn) => {
+  const dir = await mkdtemp(join(tmpdir(), "codemem-spool-"));
+  try {
+    await fn(dir);
+  } finally {
+    await rm(dir, { recursive: true, force: true });
+  }
+};
+
+describe("createRawEventBatcher", () => {
+  test("coalesces events per session into one batch", async () => {
+    const sent = [];
+    const batcher = createRawEventBatcher({
+      send: async (batch) => sent.push(batch),
+      flushDelayMs: 10000,
+    });
+    batcher.add("s1", { event_id: "a" }, { cwd: "/repo" });
+    batcher.add("s1", { event_id: "b" }, { cwd: "/repo" });
+    batcher.add("s2", { event_id: "c" }, { cwd: "/other" });
+    expect(batcher.pendingCount()).toBe(3);
+
+    await batcher.flush();
+
+    expect(batcher.pendingCount()).toBe(0);
+    expect(sent).toEqual([
+      { cwd: "/repo", opencode_session_id: "s1", events: [{ event_id: "a" }, { event_id: "b" }] },
+      { cwd: "/other", opencode_session_id: "s2", events: [{ event_id: "c" }] },
+    ]);
+  });
+
+  test("sends a session batch once it reaches the size limit", async () => {
+    const sent = [];
+    const batcher = createRawEventBatcher({
+      send: async (batch) => sent.push(batch),
+      flushDelayMs: 10000,
+      maxBatchEvents: 2,
+    });
+    batcher.add("s1", { event_id: "a" });
+    await batcher.add("s1", { event_id: "b" });
+
+    expect(sent.map((batch) => batch.events.length)).toEqual([2]);
+    await batcher.flush();
+  });
+
+  test("spools failed batches and replays them before the next send", async () => {
+    await withSpoolDir(async (dir) => {
+      const spool = createRawEventSpool({ dir });
+      const sent = [];
+      const errors = [];
+      let available = true;
+      let failing = true;
+      const batcher = createRawEventBatcher({
+        send: async (batch) => {
+          if (failing) {
+            throw new Error("viewer down");
+          }
+          sent.push(batch);
+        },
+        spool,
+        flushDelayMs: 10000,
+        isAvailable: () => available,
+        onError: (err) => errors.push(String(err)),
+      });
+
+      batcher.add("s1", { event_id: "a" });
+      await batcher.flush();
+      expect(errors.length).toBe(1);
+      expect(await spool.size()).toBe(1);
+
+      available = false;
+      batcher.add("s1", { event_id: "b" });
+      await batcher.flush();
+      expect(errors.length).toBe(1);
+      expect(await spool.size()).toBe(2);
+
+      available = true;
+      failing = false;
+      batcher.add("s1", { event_id: "c" });
+      await batcher.flush();
+
+      expect(sent.map((batch) => batch.events[0].event_id)).toEqual(["a", "b", "c"]);
+      expect(await spool.size()).toBe(0);
+    });
+  });
+
+  test("drains the spool on a timer once the viewer is available again", async () => {
+    await withSpoolDir(async (dir) => {
+      const spool = createRawEventSpool({ dir });
+      const sent = [];
+      let available = false;
+      const batcher = createRawEventBatcher({
+        send: async (batch) => sent.push(batch),
+        spool,
+        flushDelayMs: 10000,
+        drainIntervalMs: 5,
+        isAvailable: () => available,
+      });
+
+      batcher.add("s1", { event_id: "a" });
+      await batcher.flush();
+      expect(await spool.size()).toBe(1);
+
+      available = true;
+      for (let i = 0; i < 200 && sent.length === 0; i += 1) {
+        await sleep(5);
+      }
+      await batcher.flush();
+
+      expect(sent.map((batch) => batch.events[0].event_id)).toEqual(["a"]);
+      expect(await spool.size()).toBe(0);
+    });
+  });
+
+  test("drops batches the viewer rejects with a 4xx instead of spooling them", async () => {
+    await withSpoolDir(async (dir) => {
+      const spool = createRawEventSpool({ dir });
+      await spool.append({ opencode_session_id: "s1", events: [{ event_id: "old" }] });
+      const sent = [];
+      const errors = [];
+      const batcher = createRawEventBatcher({
+        send: async (batch) => {
+          if (batch.events[0].event_id !== "ok") {
+            throw httpError(400);
+          }
+          sent.push(batch);
+        },
+        spool,
+        flushDelayMs: 10000,
+        onError: (err) => errors.push(err.status),
+      });
+
+      batcher.add("s1", { event_id: "bad" });
+      await batcher.flush();
+      batcher.add("s1", { event_id: "ok" });
+      await batcher.flush();
+
+      expect(errors).toEqual([400, 400]);
+      expect(sent.map((batch) => batch.events[0].event_id)).toEqual(["ok"]);
+      expect(await spool.size()).toBe(0);
+    });
+  });
+});
+
+describe("isRetryableSendError", () => {
+  test("retries network and 5xx errors but not client errors", () => {
+    expect(isRetryableSendError(new Error("ECONNREFUSED"))).toBe(true);
+    expect(isRetryableSendError(httpError(503))).toBe(true);
+    expect(isRetryableSendError(httpError(429))).toBe(true);
+    expect(isRetryableSendError(httpError(400))).toBe(false);
+    expect(isRetryableSendError(httpError(413))).toBe(false);
+  });
+});
+
+describe("createRawEventSpool", () => {
+  test("drops the oldest batches beyond the bound", async () => {
+    await withSpoolDir(async (dir) => {
+      const spool = createRawEventSpool({ dir, maxBatches: 2 });
+      await spool.append({ events: [{ event_id: "a" }] });
+      await spool.append({ events: [{ event_id: "b" }] });
+      await spool.append({ events: [{ event_id: "c" }] });
+
+      const replayed = [];
+      await spool.drain(async (batch) => replayed.push(batch.events[0].event_id));
+
+      expect(replayed).toEqual(["b", "c"]);
+    });
+  });
+});
@@ -14,7 +14,7 @@ import warnings
 from pathlib import Path
 from typing import Any
 
-from .utils import detect_git_info, find_agent_notes, redact, strip_ansi
+from .utils import cached_git_info, find_agent_notes, redact, strip_ansi
 
 DEFAULT_MAX_TRANSCRIPT_BYTES = 200_000
 TRUNCATION_NOTICE = "\n[codemem] transcript truncated\n"
@@ -51,7 +51,7 @@ class CommandResult:
 
 
 def capture_pre_context(cwd: str) -> dict[str, str]:
-    git_info = detect_git_info(cwd)
+    git_info = cached_git_info(cwd)
     project = git_info.get("repo_root")
     agents = find_agent_notes(cwd)
     return {
@@ -67,7 +67,7 @@ def capture_pre_context(cwd: str) -> dict[str, str]:
 
 
 def capture_post_context(cwd: str) -> dict[str, str]:
-    git_info = detect_git_info(cwd)
+    git_info = cached_git_info(cwd)
     return {
         "git_status": git_info.get("status") or "",
         "git_diff": git_info.get("diff") or "",
@@ -4,102 +4,26 @@ import json
 import os
 import subprocess
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import typer
 from rich import print
 
 from . import __version__, db
-from .commands.common import (
-    compact_lines,
-    compact_list,
-    mdns_runtime_status,
-    normalize_local_check_host,
-    read_config_or_exit,
-    resolve_project_for_cli,
-    write_config_or_exit,
-)
-from .commands.db_cmds import (
-    normalize_projects_cmd,
-    prune_memories_cmd,
-    prune_observations_cmd,
-    rename_project_cmd,
-)
-from .commands.import_export_cmds import export_memories_cmd, import_memories_cmd
-from .commands.maintenance_cmds import (
-    backfill_discovery_tokens_cmd,
-    backfill_tags_cmd,
-    embed_cmd,
-    hybrid_eval_cmd,
-    ingest_cmd,
-    init_db_cmd,
-    mcp_cmd,
-    pack_benchmark_cmd,
-    pack_stats_cmd,
-    stats_cmd,
-)
-from .commands.memory_cmds import (
-    compact_cmd,
-    forget_cmd,
-    inject_cmd,
-    normalize_imported_metadata_cmd,
-    pack_cmd,
-    recent_cmd,
-    remember_cmd,
-    search_cmd,
-    show_cmd,
-)
-from .commands.opencode_integration_cmds import install_mcp_cmd, install_plugin_cmd
-from .commands.raw_events_cmds import (
-    flush_raw_events_cmd,
-    raw_events_gate_cmd,
-    raw_events_retry_cmd,
-    raw_events_status_cmd,
-)
-from .commands.sync_cmds import (
-    sync_attempts_cmd,
-    sync_daemon_cmd,
-    sync_disable_cmd,
-    sync_doctor_cmd,
-    sync_enable_cmd,
-    sync_install_cmd,
-    sync_once_cmd,
-    sync_pair_cmd,
-    sync_peers_list_cmd,
-    sync_peers_remove_cmd,
-    sync_peers_rename_cmd,
-    sync_repair_legacy_keys_cmd,
-    sync_status_cmd,
-    sync_uninstall_cmd,
-)
-from .commands.sync_service_cmds import install_autostart_quiet as _install_autostart_quiet
-from .commands.sync_service_cmds import run_service_action as _run_service_action
-from .commands.sync_service_cmds import run_service_action_quiet as _run_service_action_quiet
-from .commands.sync_service_cmds import (
-    sync_service_restart_cmd,
-    sync_service_start_cmd,
-    sync_service_status_cmd,
-    sync_service_stop_cmd,
-)
-from .commands.sync_service_cmds import sync_uninstall_impl as _sync_uninstall_impl
-from .commands.viewer_cmds import _port_open
-from .commands.viewer_cmds import serve as _serve
 from .config import get_config_path, load_config
 from .db import DEFAULT_DB_PATH
 from .net import pick_advertise_host, pick_advertise_hosts
-from .store import MemoryStore
-from .summarizer import Summarizer
-from .sync.daemon import run_sync_daemon
-from .sync.discovery import (
-    discover_peers_via_mdns,
-    mdns_enabled,
-    set_peer_project_filter,
-    update_peer_addresses,
-)
-from .sync.sync_pass import run_sync_pass, sync_pass_preflight
 from .sync_identity import ensure_device_identity, fingerprint_public_key, load_public_key
 from .sync_runtime import effective_status, spawn_daemon, stop_pidfile_with_reason
-from .viewer import DEFAULT_VIEWER_HOST, DEFAULT_VIEWER_PORT
+from .viewer_http import DEFAULT_VIEWER_HOST, DEFAULT_VIEWER_PORT
+
+if TYPE_CHECKING:
+    from .store import MemoryStore
+
+# The store, summarizer, viewer server and sync pass pull in most of the package
+# (sqlite-vec/numpy, http.client); they, and the codemem.commands module behind each
+# command, are imported inside the commands that need them so `codemem --help`,
+# `codemem version` and the plugin's CLI calls load only what they dispatch to.
 
 app = typer.Typer(help="codemem: persistent memory for OpenCode CLI")
 sync_app = typer.Typer(help="Sync codemem between devices")
@@ -117,6 +41,8 @@ def sync_attempts(
 ) -> None:
     """Show recent sync attempts."""
 
+    from .commands.sync_cmds import sync_attempts_cmd
+
     sync_attempts_cmd(store_from_path=_store, db_path=db_path, limit=limit)
 
 
@@ -151,34 +77,50 @@ def sync_restart(
 
 
 def _store(db_path: str | None) -> MemoryStore:
+    from .store import MemoryStore
+
     return MemoryStore(db_path or DEFAULT_DB_PATH)
 
 
 def _mdns_runtime_status(enabled: bool) -> tuple[bool, str]:
+    from .commands.common import mdns_runtime_status
+
     return mdns_runtime_status(enabled)
 
 
 def _resolve_project(cwd: str, project: str | None, all_projects: bool = False) -> str | None:
+    from .commands.common import resolve_project_for_cli
+
     return resolve_project_for_cli(cwd, project, all_projects=all_projects)
 
 
 def _compact_lines(text: str, limit: int) -> str:
+    from .commands.common import compact_lines
+
     return compact_lines(text, limit)
 
 
 def _compact_list(text: str, limit: int) -> str:
+    from .commands.common import compact_list
+
     return compact_list(text, limit)
 
 
 def _read_config_or_exit() -> dict[str, Any]:
+    from .commands.common import read_config_or_exit
+
     return read_config_or_exit()
 
 
 def _write_config_or_exit(data: dict[str, Any]) -> None:
+    from .commands.common import write_config_or_exit
+
     write_config_or_exit(data)
 
 
 def _normalize_local_check_host(host: str) -> str:
+    from .commands.common import normalize_local_check_host
+
     return normalize_local_check_host(host)
 
 
@@ -186,6 +128,36 @@ def _sync_daemon_running(host: str, port: int) -> bool:
     return effective_status(host, port).running
 
 
+def _port_open(host: str, port: int) -> bool:
+    from .commands.viewer_cmds import _port_open as port_open
+
+    return port_open(host, port)
+
+
+def _run_service_action(action: str, *, user: bool, system: bool) -> None:
+    from .commands.sync_service_cmds import run_service_action
+
+    run_service_action(action, user=user, system=system)
+
+
+def _run_service_action_quiet(action: str, *, user: bool, system: bool) -> bool:
+    from .commands.sync_service_cmds import run_service_action_quiet
+
+    return run_service_action_quiet(action, user=user, system=system)
+
+
+def _install_autostart_quiet(*, user: bool) -> bool:
+    from .commands.sync_service_cmds import install_autostart_quiet
+
+    return install_autostart_quiet(user=user)
+
+
+def _sync_uninstall_impl(*, user: bool) -> None:
+    from .commands.sync_service_cmds import sync_uninstall_impl
+
+    sync_uninstall_impl(user=user)
+
+
 def _build_import_key(
     source: str,
     record_type: str,
@@ -264,6 +236,8 @@ def _merge_summary_metadata(metadata: dict[str, Any], import_metadata: Any) -> d
 @app.command()
 def init_db(db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """Create the SQLite database (no-op if it already exists)."""
+    from .commands.maintenance_cmds import init_db_cmd
+
     init_db_cmd(store_from_path=_store, db_path=db_path)
 
 
@@ -276,6 +250,8 @@ def search(
     all_projects: bool = typer.Option(False, help="Search across all projects"),
 ) -> None:
     """Search memories by keyword or semantic recall."""
+    from .commands.memory_cmds import search_cmd
+
     search_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -296,6 +272,8 @@ def recent(
     all_projects: bool = typer.Option(False, help="Search across all projects"),
 ) -> None:
     """Show recent memories."""
+    from .commands.memory_cmds import recent_cmd
+
     recent_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -310,6 +288,8 @@ def recent(
 @app.command()
 def show(memory_id: int, db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """Print a memory item as JSON."""
+    from .commands.memory_cmds import show_cmd
+
     show_cmd(store_from_path=_store, db_path=db_path, memory_id=memory_id)
 
 
@@ -323,6 +303,8 @@ def remember(
     project: str = typer.Option(None, help="Project identifier (defaults to git repo root)"),
 ) -> None:
     """Manually add a memory item."""
+    from .commands.memory_cmds import remember_cmd
+
     remember_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -340,6 +322,8 @@ def forget(
     memory_id: int, db_path: str = typer.Option(None, help="Path to SQLite database")
 ) -> None:
     """Deactivate a memory item by id."""
+    from .commands.memory_cmds import forget_cmd
+
     forget_cmd(store_from_path=_store, db_path=db_path, memory_id=memory_id)
 
 
@@ -350,6 +334,8 @@ def db_prune_observations(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Deactivate low-signal observations (does not delete rows)."""
+    from .commands.db_cmds import prune_observations_cmd
+
     prune_observations_cmd(store_from_path=_store, db_path=db_path, limit=limit, dry_run=dry_run)
 
 
@@ -363,6 +349,8 @@ def db_prune_memories(
     db_path: str = typer.Option(None),
 ) -> None:
     """Deactivate low-signal memories across multiple kinds (does not delete rows)."""
+    from .commands.db_cmds import prune_memories_cmd
+
     prune_memories_cmd(
         store_from_path=_store, db_path=db_path, limit=limit, dry_run=dry_run, kinds=kinds
     )
@@ -378,6 +366,8 @@ def pack(
     all_projects: bool = typer.Option(False, help="Search across all projects"),
 ) -> None:
     """Build a JSON memory pack for a query/context string."""
+    from .commands.memory_cmds import pack_cmd
+
     pack_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -401,6 +391,8 @@ def inject(
     all_projects: bool = typer.Option(False, help="Search across all projects"),
 ) -> None:
     """Build a context block from memories for manual injection into prompts."""
+    from .commands.memory_cmds import inject_cmd
+
     inject_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -421,6 +413,9 @@ def compact(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Re-run summarization for past sessions (uses model if configured)."""
+    from .commands.memory_cmds import compact_cmd
+    from .summarizer import Summarizer
+
     compact_cmd(
         store_from_path=_store,
         summarizer_factory=Summarizer,
@@ -433,6 +428,8 @@ def compact(
 @app.command()
 def stats(db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """Show database statistics."""
+    from .commands.maintenance_cmds import stats_cmd
+
     stats_cmd(store_from_path=_store, db_path=db_path)
 
 
@@ -444,6 +441,8 @@ def pack_stats(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Analyze pack generation statistics."""
+    from .commands.maintenance_cmds import pack_stats_cmd
+
     pack_stats_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -464,6 +463,8 @@ def embed(
     inactive: bool = typer.Option(False, help="Include inactive memories"),
     dry_run: bool = typer.Option(False, help="Report without writing"),
 ) -> None:
+    from .commands.maintenance_cmds import embed_cmd
+
     embed_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -489,6 +490,8 @@ def backfill_tags(
 ) -> None:
     """Populate tags_text for memories missing tags."""
 
+    from .commands.maintenance_cmds import backfill_tags_cmd
+
     backfill_tags_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -509,6 +512,8 @@ def backfill_discovery_tokens(
 ) -> None:
     """Populate discovery_group/discovery_tokens for existing observer memories."""
 
+    from .commands.maintenance_cmds import backfill_discovery_tokens_cmd
+
     backfill_discovery_tokens_cmd(
         store_from_path=_store, db_path=db_path, limit_sessions=limit_sessions
     )
@@ -525,6 +530,8 @@ def flush_raw_events(
 ) -> None:
     """Flush spooled raw events into the normal ingest pipeline."""
 
+    from .commands.raw_events_cmds import flush_raw_events_cmd
+
     store = _store(db_path)
     try:
         flush_raw_events_cmd(
@@ -546,6 +553,8 @@ def raw_events_status(
 ) -> None:
     """Show pending raw-event backlog by OpenCode session."""
 
+    from .commands.raw_events_cmds import raw_events_status_cmd
+
     store = _store(db_path)
     try:
         raw_events_status_cmd(store, limit=limit)
@@ -561,6 +570,8 @@ def raw_events_retry(
 ) -> None:
     """Retry error raw-event flush batches for a session."""
 
+    from .commands.raw_events_cmds import raw_events_retry_cmd
+
     store = _store(db_path)
     try:
         raw_events_retry_cmd(store, opencode_session_id=opencode_session_id, limit=limit)
@@ -590,6 +601,8 @@ def raw_events_gate(
 ) -> None:
     """Validate raw-event reliability metrics against baseline thresholds."""
 
+    from .commands.raw_events_cmds import raw_events_gate_cmd
+
     store = _store(db_path)
     try:
         raw_events_gate_cmd(
@@ -619,6 +632,8 @@ def pack_benchmark(
 ) -> None:
     """Run pack generation for a query set and report token metrics."""
 
+    from .commands.maintenance_cmds import pack_benchmark_cmd
+
     pack_benchmark_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -655,6 +670,8 @@ def hybrid_eval(
     ),
 ) -> None:
     """Evaluate baseline vs hybrid retrieval precision/recall deltas."""
+    from .commands.maintenance_cmds import hybrid_eval_cmd
+
     hybrid_eval_cmd(
         store_from_path=_store,
         db_path=db_path,
@@ -669,12 +686,16 @@ def hybrid_eval(
 @app.command()
 def mcp() -> None:
     """Run the MCP server for OpenCode."""
+    from .commands.maintenance_cmds import mcp_cmd
+
     mcp_cmd()
 
 
 @app.command()
 def ingest() -> None:
     """Ingest plugin events from stdin."""
+    from .commands.maintenance_cmds import ingest_cmd
+
     ingest_cmd()
 
 
@@ -713,6 +734,8 @@ def serve(
     stop: bool = typer.Option(False, help="Stop background viewer"),
     restart: bool = typer.Option(False, help="Restart background viewer"),
 ) -> None:
+    from .commands.viewer_cmds import serve as _serve
+
     _serve(
         db_path=db_path,
         host=host,
@@ -732,6 +755,8 @@ def dev(
 ) -> None:
     """Developer mode: watch the UI bundle and run the viewer."""
 
+    from .commands.viewer_cmds import serve as _serve
+
     os.environ["CODEMEM_VIEWER_NO_CACHE"] = "1"
 
     watcher: subprocess.Popen[Any] | None = None
@@ -782,6 +807,8 @@ def sync_enable(
     ),
 ) -> None:
     """Enable sync and initialize device identity."""
+    from .commands.sync_cmds import sync_enable_cmd
+
     sync_enable_cmd(
         store_from_path=_store,
         read_config_or_exit=_read_config_or_exit,
@@ -809,6 +836,8 @@ def sync_disable(
     uninstall: bool = typer.Option(False, help="Remove autostart service configuration"),
 ) -> None:
     """Disable sync without deleting keys or peers."""
+    from .commands.sync_cmds import sync_disable_cmd
+
     sync_disable_cmd(
         read_config_or_exit=_read_config_or_exit,
         write_config_or_exit=_write_config_or_exit,
@@ -823,6 +852,8 @@ def sync_disable(
 @sync_app.command("status")
 def sync_status(db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """Show sync configuration and peer summary."""
+    from .commands.sync_cmds import sync_status_cmd
+
     sync_status_cmd(
         store_from_path=_store,
         load_config=load_config,
@@ -867,6 +898,9 @@ def sync_pair(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Print pairing payload or accept a peer payload."""
+    from .commands.sync_cmds import sync_pair_cmd
+    from .sync.discovery import set_peer_project_filter, update_peer_addresses
+
     sync_pair_cmd(
         store_from_path=_store,
         ensure_device_identity=ensure_device_identity,
@@ -893,6 +927,8 @@ def sync_pair(
 @sync_peers_app.command("list")
 def sync_peers_list(db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """List known sync peers."""
+    from .commands.sync_cmds import sync_peers_list_cmd
+
     sync_peers_list_cmd(store_from_path=_store, from_json=db.from_json, db_path=db_path)
 
 
@@ -902,6 +938,8 @@ def sync_peers_remove(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Remove a peer."""
+    from .commands.sync_cmds import sync_peers_remove_cmd
+
     sync_peers_remove_cmd(store_from_path=_store, peer=peer, db_path=db_path)
 
 
@@ -912,6 +950,8 @@ def sync_peers_rename(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Rename a peer."""
+    from .commands.sync_cmds import sync_peers_rename_cmd
+
     sync_peers_rename_cmd(
         store_from_path=_store, peer_device_id=peer_device_id, name=name, db_path=db_path
     )
@@ -923,12 +963,15 @@ def sync_once_command(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
 ) -> None:
     """Run a single sync pass."""
+    from .commands.sync_cmds import sync_once_cmd
+    from .sync import discovery, sync_pass
+
     sync_once_cmd(
         store_from_path=_store,
-        sync_pass_preflight=sync_pass_preflight,
-        mdns_enabled=mdns_enabled,
-        discover_peers_via_mdns=discover_peers_via_mdns,
-        run_sync_pass=run_sync_pass,
+        sync_pass_preflight=sync_pass.sync_pass_preflight,
+        mdns_enabled=discovery.mdns_enabled,
+        discover_peers_via_mdns=discovery.discover_peers_via_mdns,
+        run_sync_pass=sync_pass.run_sync_pass,
         peer=peer,
         db_path=db_path,
     )
@@ -937,6 +980,8 @@ def sync_once_command(
 @sync_app.command("doctor")
 def sync_doctor(db_path: str = typer.Option(None, help="Path to SQLite database")) -> None:
     """Diagnose common sync setup and connectivity issues."""
+    from .commands.sync_cmds import sync_doctor_cmd
+
     sync_doctor_cmd(
         store_from_path=_store,
         load_config=load_config,
@@ -960,6 +1005,8 @@ def sync_repair_legacy_keys(
     device-prefixed form (legacy:<device_id>:memory_item:<n>) and tombstones the old key.
     """
 
+    from .commands.sync_cmds import sync_repair_legacy_keys_cmd
+
     sync_repair_legacy_keys_cmd(
         store_from_path=_store, db_path=db_path, limit=limit, dry_run=dry_run
     )
@@ -973,6 +1020,9 @@ def sync_daemon(
     interval_s: int | None = typer.Option(None, help="Sync interval in seconds"),
 ) -> None:
     """Run the sync daemon loop."""
+    from .commands.sync_cmds import sync_daemon_cmd
+    from .sync.daemon import run_sync_daemon
+
     sync_daemon_cmd(
         load_config=load_config,
         run_sync_daemon=run_sync_daemon,
@@ -989,6 +1039,8 @@ def sync_service_status(
     verbose: bool = typer.Option(False, help="Show raw service output"),
 ) -> None:
     """Show service status for sync daemon."""
+    from .commands.sync_service_cmds import sync_service_status_cmd
+
     sync_service_status_cmd(
         load_config=load_config,
         effective_status=effective_status,
@@ -1003,6 +1055,8 @@ def sync_service_start(
     system: bool = typer.Option(False, help="Use system-level service"),
 ) -> None:
     """Start sync daemon."""
+    from .commands.sync_service_cmds import sync_service_start_cmd
+
     sync_service_start_cmd(
         load_config=load_config,
         effective_status=effective_status,
@@ -1017,6 +1071,8 @@ def sync_service_stop(
     system: bool = typer.Option(False, help="Use system-level service"),
 ) -> None:
     """Stop sync daemon."""
+    from .commands.sync_service_cmds import sync_service_stop_cmd
+
     sync_service_stop_cmd(
         load_config=load_config,
         effective_status=effective_status,
@@ -1031,6 +1087,8 @@ def sync_service_restart(
     system: bool = typer.Option(False, help="Use system-level service"),
 ) -> None:
     """Restart sync daemon."""
+    from .commands.sync_service_cmds import sync_service_restart_cmd
+
     sync_service_restart_cmd(
         load_config=load_config,
         effective_status=effective_status,
@@ -1047,12 +1105,16 @@ def sync_install(
     system: bool = typer.Option(False, help="Install system-level service (requires root)"),
 ) -> None:
     """Install autostart service for sync daemon."""
+    from .commands.sync_cmds import sync_install_cmd
+
     sync_install_cmd(user=user, system=system)
 
 
 @sync_app.command("uninstall")
 def sync_uninstall() -> None:
     """Uninstall autostart service configuration."""
+    from .commands.sync_cmds import sync_uninstall_cmd
+
     sync_uninstall_cmd(sync_uninstall_impl=_sync_uninstall_impl)
 
 
@@ -1068,6 +1130,8 @@ def export_memories(
     ),
 ) -> None:
     """Export memories to a JSON file for sharing or backup."""
+    from .commands.import_export_cmds import export_memories_cmd
+
     export_memories_cmd(
         store_from_path=_store,
         resolve_project=_resolve_project,
@@ -1089,6 +1153,8 @@ def import_memories(
     dry_run: bool = typer.Option(False, help="Preview import without writing"),
 ) -> None:
     """Import memories from an exported JSON file."""
+    from .commands.import_export_cmds import import_memories_cmd
+
     import_memories_cmd(
         store_from_path=_store,
         build_import_key=_build_import_key,
@@ -1111,6 +1177,8 @@ def db_normalize_projects(
     basename ("codemem") to avoid machine-specific anchoring.
     """
 
+    from .commands.db_cmds import normalize_projects_cmd
+
     normalize_projects_cmd(store_from_path=_store, db_path=db_path, apply=apply)
 
 
@@ -1127,17 +1195,66 @@ def db_rename_project(
     matches OLD_NAME (e.g. "/Users/.../product-context" matches "product-context").
     """
 
+    from .commands.db_cmds import rename_project_cmd
+
     rename_project_cmd(
         store_from_path=_store, db_path=db_path, old_name=old_name, new_name=new_name, apply=apply
     )
 
 
+@db_app.command("tune")
+def db_tune(
+    role: str = typer.Option("reader", help="Connection profile: reader, writer or bulk"),
+    db_path: str = typer.Option(None, help="Path to codemem SQLite database"),
+) -> None:
+    """Show a connection profile's PRAGMAs and time read probes with and without it."""
+
+    from .commands.db_cmds import tune_db_cmd
+
+    tune_db_cmd(store_from_path=_store, db_path=db_path, role=role)
+
+
+@db_app.command("maintain")
+def db_maintain(
+    fts: str = typer.Option(
+        "optimize", help="FTS compaction: 'optimize' (full) or 'merge' (incremental)"
+    ),
+    checkpoint: bool = typer.Option(True, help="Truncate the WAL after maintenance"),
+    db_path: str = typer.Option(None, help="Path to codemem SQLite database"),
+) -> None:
+    """Compact FTS indexes, run PRAGMA optimize and checkpoint the WAL, with timings."""
+
+    from .commands.db_cmds import maintain_db_cmd
+
+    maintain_db_cmd(store_from_path=_store, db_path=db_path, fts_mode=fts, checkpoint=checkpoint)
+
+
+@db_app.command("sweeper-benchmark")
+def db_sweeper_benchmark(
+    events: str = typer.Option(
+        "10000,100000,500000", help="Comma-separated raw_events sizes to benchmark"
+    ),
+    sessions: int = typer.Option(100, help="Raw-event sessions spread across the events"),
+) -> None:
+    """Time the raw-event sweeper's per-tick queries on scratch databases of growing size."""
+
+    from .commands.db_cmds import sweeper_benchmark_cmd
+
+    try:
+        event_counts = [int(part) for part in events.split(",") if part.strip()]
+    except ValueError as exc:
+        raise typer.BadParameter("--events must be comma-separated integers") from exc
+    sweeper_benchmark_cmd(event_counts=event_counts, sessions=sessions)
+
+
 @app.command()
 def normalize_imported_metadata(
     db_path: str = typer.Option(None, help="Path to SQLite database"),
     dry_run: bool = typer.Option(False, help="Preview changes without writing"),
 ) -> None:
     """Normalize imported session summary metadata for viewer rendering."""
+    from .commands.memory_cmds import normalize_imported_metadata_cmd
+
     normalize_imported_metadata_cmd(
         store_from_path=_store,
         from_json=db.from_json,
@@ -1153,6 +1270,8 @@ def install_plugin(
     force: bool = typer.Option(False, "--force", "-f", help="Overwrite existing plugin file"),
 ) -> None:
     """Install the codemem plugin to OpenCode's plugin directory."""
+    from .commands.opencode_integration_cmds import install_plugin_cmd
+
     install_plugin_cmd(force=force)
 
 
@@ -1161,6 +1280,8 @@ def install_mcp(
     force: bool = typer.Option(False, "--force", "-f", help="Overwrite existing MCP config"),
 ) -> None:
     """Install the codemem MCP entry into OpenCode's config."""
+    from .commands.opencode_integration_cmds import install_mcp_cmd
+
     install_mcp_cmd(force=force)
 
 
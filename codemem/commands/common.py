@@ -3,18 +3,22 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import typer
 from rich import print
 
 from codemem.config import read_config_file, write_config_file
 from codemem.db import DEFAULT_DB_PATH
-from codemem.store import MemoryStore
 from codemem.utils import resolve_project
 
+if TYPE_CHECKING:
+    from codemem.store import MemoryStore
+
 
 def store_from_path(db_path: str | None) -> MemoryStore:
+    from codemem.store import MemoryStore
+
     return MemoryStore(db_path or DEFAULT_DB_PATH)
 
 
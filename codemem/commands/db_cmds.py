@@ -81,3 +81,64 @@ def rename_project_cmd(
     print(f"- Usage events: {result.get('usage_events_to_update')}")
     if result.get("dry_run"):
         print("\n[dim]Pass --apply to execute.[/dim]")
+
+
+def tune_db_cmd(*, store_from_path, db_path: str | None, role: str) -> None:
+    """Show a connection profile's PRAGMAs and time read probes with and without it."""
+
+    from ..store import maintenance as store_maintenance
+
+    store = store_from_path(db_path)
+    path = store.db_path
+    store.close()
+    try:
+        result = store_maintenance.benchmark_connection_profile(path, role)
+    except ValueError as exc:
+        print(f"[red]Error:[/red] {exc}")
+        raise SystemExit(2) from exc
+    before, after = result["before"], result["after"]
+    print(f"[bold]Connection profile[/bold] [cyan]{role}[/cyan]")
+    for name, value in after["settings"].items():
+        print(f"- {name}: {before['settings'].get(name)} -> {value}")
+    print("[bold]Read probes[/bold] (best of 3)")
+    for name, seconds in after["seconds"].items():
+        print(f"- {name}: {before['seconds'][name] * 1000:.2f} ms -> {seconds * 1000:.2f} ms")
+
+
+def sweeper_benchmark_cmd(*, event_counts: list[int], sessions: int) -> None:
+    """Time the raw-event sweeper's per-tick queries as raw_events grows."""
+
+    from ..sweeper_benchmark import benchmark_sweeper_queries
+
+    results = benchmark_sweeper_queries(event_counts, sessions=sessions)
+    print(f"[bold]Sweeper tick queries[/bold] ({sessions} sessions, best of 5)")
+    for result in results:
+        timings = ", ".join(
+            f"{name} {seconds * 1000:.3f} ms" for name, seconds in result["seconds"].items()
+        )
+        print(f"- {result['events']} raw events: {timings}")
+
+
+def maintain_db_cmd(
+    *, store_from_path, db_path: str | None, fts_mode: str, checkpoint: bool
+) -> None:
+    """Run FTS merge/optimize, PRAGMA optimize and a WAL checkpoint with timings."""
+
+    from .. import db
+
+    store = store_from_path(db_path)
+    try:
+        db.apply_connection_profile(store.conn, "bulk")
+        steps = store.maintain_database(fts_mode=fts_mode, checkpoint=checkpoint)
+    except ValueError as exc:
+        print(f"[red]Error:[/red] {exc}")
+        raise SystemExit(2) from exc
+    finally:
+        store.close()
+    print("[bold]Database maintenance[/bold]")
+    for step in steps:
+        line = f"- {step['step']}: {step['seconds'] * 1000:.1f} ms"
+        if "before" in step:
+            unit = " bytes" if step["step"] == "wal_checkpoint" else " segments"
+            line += f" ({step['before']}{unit} -> {step['after']}{unit})"
+        print(line)
@@ -48,6 +48,13 @@ def stats_cmd(*, store_from_path, db_path: str | None) -> None:
     )
     print(f"- Artifacts: {db_stats['artifacts']}")
     print(f"- Raw events: {db_stats['raw_events']}")
+    vector_index = db_stats.get("vector_index") or {}
+    print(
+        f"- Vectors: {db_stats['vector_rows']} rows, "
+        f"{vector_index.get('pending', 0)} memories queued "
+        f"(lag {float(vector_index.get('lag_s') or 0.0):.0f}s"
+        f", {vector_index.get('failed', 0)} failed)"
+    )
 
     print("\n[bold]Usage[/bold]")
     if not usage["events"]:
@@ -79,6 +86,13 @@ def embed_cmd(
     inactive: bool,
     dry_run: bool,
 ) -> None:
+    def report_progress(counts: dict[str, int]) -> None:
+        if counts["checked"] < counts["total"]:
+            print(
+                f"[dim]Checked {counts['checked']}/{counts['total']} memories, "
+                f"{counts['inserted']} vectors written[/dim]"
+            )
+
     store = store_from_path(db_path)
     try:
         resolved_project = resolve_project(os.getcwd(), project, all_projects=all_projects)
@@ -88,6 +102,7 @@ def embed_cmd(
             project=resolved_project,
             active_only=not inactive,
             dry_run=dry_run,
+            progress=report_progress,
         )
     finally:
         store.close()
@@ -152,6 +167,7 @@ def pack_stats_cmd(
             print(f"Project: {resolved_project}")
 
         # Fetch usage events
+        store.flush_usage()
         query = "SELECT metadata_json, created_at FROM usage_events WHERE event = 'pack' ORDER BY created_at DESC LIMIT ?"
         rows = store.conn.execute(query, (limit,)).fetchall()
 
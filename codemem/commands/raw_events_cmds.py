@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import typer
 from rich import print
 
-from codemem.store import MemoryStore
+if TYPE_CHECKING:
+    from codemem.store import MemoryStore
 
 
 def flush_raw_events_cmd(
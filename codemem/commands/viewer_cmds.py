@@ -10,8 +10,6 @@ from pathlib import Path
 import typer
 from rich import print
 
-from codemem.viewer import start_viewer
-
 
 def _viewer_pid_path() -> Path:
     pid_path = os.environ.get("CODEMEM_VIEWER_PID", "~/.codemem-viewer.pid")
@@ -177,5 +175,7 @@ def serve(
     if _port_open(host, port):
         print(f"[yellow]Viewer already running at http://{host}:{port}[/yellow]")
         return
+    from codemem.viewer import start_viewer
+
     print(f"[green]Viewer running at http://{host}:{port}[/green]")
     start_viewer(host=host, port=port, background=False)
@@ -9,6 +9,7 @@ from typing import Any
 
 DEFAULT_CONFIG_PATH = Path("~/.config/codemem/config.json").expanduser()
 DEFAULT_CONFIG_PATH_JSONC = Path("~/.config/codemem/config.jsonc").expanduser()
+HYBRID_FUSION_MODES = frozenset({"rrf", "weighted"})
 
 CONFIG_ENV_OVERRIDES = {
     "observer_provider": "CODEMEM_OBSERVER_PROVIDER",
@@ -19,6 +20,10 @@ CONFIG_ENV_OVERRIDES = {
     "hybrid_retrieval_enabled": "CODEMEM_HYBRID_RETRIEVAL_ENABLED",
     "hybrid_retrieval_shadow_log": "CODEMEM_HYBRID_RETRIEVAL_SHADOW_LOG",
     "hybrid_retrieval_shadow_sample_rate": "CODEMEM_HYBRID_RETRIEVAL_SHADOW_SAMPLE_RATE",
+    "hybrid_retrieval_fusion": "CODEMEM_HYBRID_RETRIEVAL_FUSION",
+    "hybrid_retrieval_rrf_k": "CODEMEM_HYBRID_RETRIEVAL_RRF_K",
+    "hybrid_retrieval_fts_weight": "CODEMEM_HYBRID_RETRIEVAL_FTS_WEIGHT",
+    "hybrid_retrieval_vector_weight": "CODEMEM_HYBRID_RETRIEVAL_VECTOR_WEIGHT",
     "sync_enabled": "CODEMEM_SYNC_ENABLED",
     "sync_host": "CODEMEM_SYNC_HOST",
     "sync_port": "CODEMEM_SYNC_PORT",
@@ -187,6 +192,10 @@ class OpencodeMemConfig:
     hybrid_retrieval_enabled: bool = False
     hybrid_retrieval_shadow_log: bool = False
     hybrid_retrieval_shadow_sample_rate: float = 1.0
+    hybrid_retrieval_fusion: str = "rrf"
+    hybrid_retrieval_rrf_k: int = 60
+    hybrid_retrieval_fts_weight: float = 1.0
+    hybrid_retrieval_vector_weight: float = 1.0
     viewer_auto: bool = True
     viewer_auto_stop: bool = True
     viewer_enabled: bool = True
@@ -271,6 +280,20 @@ def _parse_float(value: object, default: float, *, key: str) -> float:
         return default
 
 
+def _parse_choice(value: object, default: str, *, key: str, choices: frozenset[str]) -> str:
+    if value is None:
+        return default
+    text = str(value).strip().lower()
+    if text in choices:
+        return text
+    warnings.warn(
+        f"Invalid {key}: {value!r} (expected one of {', '.join(sorted(choices))})",
+        RuntimeWarning,
+        stacklevel=2,
+    )
+    return default
+
+
 def _coerce_str_list(value: object, *, key: str) -> list[str] | None:
     if value is None:
         return None
@@ -318,9 +341,13 @@ def _apply_dict(cfg: OpencodeMemConfig, data: dict[str, Any]) -> OpencodeMemConf
             "plugin_cmd_timeout_ms",
             "sync_port",
             "sync_interval_s",
+            "hybrid_retrieval_rrf_k",
         }:
             setattr(cfg, key, _parse_int(value, getattr(cfg, key), key=key))
             continue
+        if key in {"hybrid_retrieval_fts_weight", "hybrid_retrieval_vector_weight"}:
+            setattr(cfg, key, max(0.0, _parse_float(value, getattr(cfg, key), key=key)))
+            continue
         if key in {"hybrid_retrieval_shadow_sample_rate"}:
             sample_rate = _parse_float(value, getattr(cfg, key), key=key)
             setattr(cfg, key, min(1.0, max(0.0, sample_rate)))
@@ -337,6 +364,13 @@ def _apply_dict(cfg: OpencodeMemConfig, data: dict[str, Any]) -> OpencodeMemConf
         }:
             setattr(cfg, key, _coerce_bool(value, getattr(cfg, key), key=key))
             continue
+        if key == "hybrid_retrieval_fusion":
+            setattr(
+                cfg,
+                key,
+                _parse_choice(value, getattr(cfg, key), key=key, choices=HYBRID_FUSION_MODES),
+            )
+            continue
         if key in {"sync_projects_include", "sync_projects_exclude"}:
             parsed = _coerce_str_list(value, key=key)
             if parsed is not None:
@@ -395,6 +429,33 @@ def _apply_env(cfg: OpencodeMemConfig) -> OpencodeMemConfig:
             ),
         ),
     )
+    cfg.hybrid_retrieval_fusion = _parse_choice(
+        os.getenv("CODEMEM_HYBRID_RETRIEVAL_FUSION"),
+        cfg.hybrid_retrieval_fusion,
+        key="hybrid_retrieval_fusion",
+        choices=HYBRID_FUSION_MODES,
+    )
+    cfg.hybrid_retrieval_rrf_k = _parse_int(
+        os.getenv("CODEMEM_HYBRID_RETRIEVAL_RRF_K"),
+        cfg.hybrid_retrieval_rrf_k,
+        key="hybrid_retrieval_rrf_k",
+    )
+    cfg.hybrid_retrieval_fts_weight = max(
+        0.0,
+        _parse_float(
+            os.getenv("CODEMEM_HYBRID_RETRIEVAL_FTS_WEIGHT"),
+            cfg.hybrid_retrieval_fts_weight,
+            key="hybrid_retrieval_fts_weight",
+        ),
+    )
+    cfg.hybrid_retrieval_vector_weight = max(
+        0.0,
+        _parse_float(
+            os.getenv("CODEMEM_HYBRID_RETRIEVAL_VECTOR_WEIGHT"),
+            cfg.hybrid_retrieval_vector_weight,
+            key="hybrid_retrieval_vector_weight",
+        ),
+    )
     cfg.viewer_auto = _parse_bool(os.getenv("CODEMEM_VIEWER_AUTO"), cfg.viewer_auto)
     cfg.viewer_auto_stop = _parse_bool(os.getenv("CODEMEM_VIEWER_AUTO_STOP"), cfg.viewer_auto_stop)
     cfg.viewer_enabled = _parse_bool(os.getenv("CODEMEM_VIEWER"), cfg.viewer_enabled)
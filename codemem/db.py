@@ -1,21 +1,25 @@
 from __future__ import annotations
 
+import datetime as dt
 import json
 import os
 import shutil
 import sqlite3
-from collections.abc import Iterable
+import threading
+from collections.abc import Callable, Iterable
 from pathlib import Path
 from typing import Any
 
-import sqlite_vec
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 DEFAULT_DB_PATH = Path.home() / ".codemem" / "mem.sqlite"
 LEGACY_DEFAULT_DB_PATHS = (
     Path.home() / ".codemem.sqlite",
     Path.home() / ".opencode-mem.sqlite",
 )
-SCHEMA_VERSION = 1
 
 
 def _sidecar_paths(path: Path) -> list[Path]:
@@ -66,6 +70,9 @@ def _load_sqlite_vec(conn: sqlite3.Connection) -> None:
             "Install a Python build with enable_load_extension (mise/homebrew) and try again."
         ) from exc
     try:
+        # Imported lazily: sqlite_vec pulls in numpy, which dominates CLI startup.
+        import sqlite_vec
+
         sqlite_vec.load(conn)
         if sqlite_vec_version(conn) is None:
             raise RuntimeError("sqlite-vec loaded but version check failed")
@@ -91,11 +98,68 @@ def _load_sqlite_vec(conn: sqlite3.Connection) -> None:
             return
 
 
-def connect(db_path: Path | str, check_same_thread: bool = True) -> sqlite3.Connection:
+# Per-connection PRAGMAs by role. Readers (viewer list/search endpoints) get the largest
+# page cache; bulk jobs (maintenance, backfills) also checkpoint the WAL less often and
+# leave the final checkpoint to ``wal_checkpoint``. cache_size is in KiB when negative.
+CONNECTION_PROFILES: dict[str, dict[str, int]] = {
+    "reader": {"cache_size": -32768, "temp_store": 2, "wal_autocheckpoint": 1000},
+    "writer": {"cache_size": -16384, "temp_store": 2, "wal_autocheckpoint": 1000},
+    "bulk": {"cache_size": -65536, "temp_store": 2, "wal_autocheckpoint": 10000},
+}
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+# Per-connection prepared statement cache. Store queries are built with f-strings (one
+# text per filter/IN-list shape), which overflows sqlite3's default of 128 on a
+# long-lived viewer or MCP connection and re-prepares hot statements.
+CACHED_STATEMENTS = 512
+
+
+def _mmap_size() -> int:
+    # mmap misbehaves on some network filesystems; CODEMEM_SQLITE_MMAP_SIZE=0 turns it off.
+    value = os.environ.get("CODEMEM_SQLITE_MMAP_SIZE")
+    if value is None:
+        return DEFAULT_MMAP_SIZE
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_MMAP_SIZE
+
+
+def connection_profile(role: str) -> dict[str, int]:
+    if role not in CONNECTION_PROFILES:
+        raise ValueError(
+            f"Unknown connection role {role!r}; expected one of {sorted(CONNECTION_PROFILES)}"
+        )
+    return {**CONNECTION_PROFILES[role], "mmap_size": _mmap_size()}
+
+
+def apply_connection_profile(conn: sqlite3.Connection, role: str) -> None:
+    for name, value in connection_profile(role).items():
+        conn.execute(f"PRAGMA {name} = {int(value)}")
+
+
+def connection_settings(conn: sqlite3.Connection) -> dict[str, int]:
+    """Current values of the PRAGMAs a connection profile sets."""
+    names = next(iter(CONNECTION_PROFILES.values())).keys() | {"mmap_size"}
+    settings: dict[str, int] = {}
+    for name in sorted(names):
+        row = conn.execute(f"PRAGMA {name}").fetchone()
+        settings[name] = int(row[0]) if row is not None and row[0] is not None else 0
+    return settings
+
+
+def connect(
+    db_path: Path | str, check_same_thread: bool = True, *, role: str | None = "writer"
+) -> sqlite3.Connection:
+    """Open a codemem database with WAL enabled and the ``role`` connection profile.
+
+    ``role=None`` keeps SQLite's defaults (used to measure the profiles).
+    """
     path = Path(db_path).expanduser()
     migrate_legacy_default_db(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn = sqlite3.connect(
+        path, check_same_thread=check_same_thread, cached_statements=CACHED_STATEMENTS
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA busy_timeout = 5000")
@@ -104,11 +168,14 @@ def connect(db_path: Path | str, check_same_thread: bool = True) -> sqlite3.Conn
     except sqlite3.OperationalError:
         conn.execute("PRAGMA journal_mode = DELETE")
     conn.execute("PRAGMA synchronous = NORMAL")
+    if role is not None:
+        apply_connection_profile(conn, role)
     return conn
 
 
 def _initialize_schema_v1(conn: sqlite3.Connection) -> None:
-    conn.executescript(
+    _execute_script(
+        conn,
         """
         CREATE TABLE IF NOT EXISTS sessions (
             id INTEGER PRIMARY KEY,
@@ -168,7 +235,8 @@ def _initialize_schema_v1(conn: sqlite3.Connection) -> None:
         END;
 
         DROP TRIGGER IF EXISTS memory_items_au;
-        CREATE TRIGGER memory_items_au AFTER UPDATE ON memory_items BEGIN
+        CREATE TRIGGER memory_items_au
+        AFTER UPDATE OF title, body_text, tags_text ON memory_items BEGIN
             INSERT INTO memory_fts(memory_fts, rowid, title, body_text, tags_text)
             VALUES('delete', old.id, old.title, old.body_text, old.tags_text);
             INSERT INTO memory_fts(rowid, title, body_text, tags_text)
@@ -344,7 +412,7 @@ def _initialize_schema_v1(conn: sqlite3.Connection) -> None:
             last_error_at TEXT,
             last_ok_at TEXT
         );
-        """
+        """,
     )
     _ensure_column(conn, "sessions", "project", "TEXT")
     _ensure_column(conn, "sessions", "import_key", "TEXT")
@@ -405,21 +473,80 @@ def _normalize_legacy_memory_kinds(conn: sqlite3.Connection) -> None:
     conn.execute("UPDATE memory_items SET kind = 'decision' WHERE lower(trim(kind)) = 'project'")
 
 
-def _ensure_vector_schema(conn: sqlite3.Connection) -> None:
-    if os.getenv("CODEMEM_EMBEDDING_DISABLED", "").lower() in {"1", "true", "yes"}:
+MEMORY_VECTORS_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memory_vectors USING vec0(
+        embedding float[384],
+        project_key TEXT,
+        kind TEXT,
+        memory_id INTEGER,
+        chunk_index INTEGER,
+        content_hash TEXT,
+        model TEXT
+    );
+"""
+
+
+def _vector_schema_enabled() -> bool:
+    return os.getenv("CODEMEM_EMBEDDING_DISABLED", "").lower() not in {"1", "true", "yes"}
+
+
+def _ensure_vector_schema(conn: sqlite3.Connection, *, rebuild: bool = False) -> None:
+    """Create memory_vectors (sqlite-vec must already be loaded into ``conn``)."""
+    if not _vector_schema_enabled():
         return
-    _load_sqlite_vec(conn)
-    conn.execute(
-        """
-        CREATE VIRTUAL TABLE IF NOT EXISTS memory_vectors USING vec0(
-            embedding float[384],
-            memory_id INTEGER,
-            chunk_index INTEGER,
-            content_hash TEXT,
-            model TEXT
-        );
-        """
-    )
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'memory_vectors'"
+    ).fetchone()
+    if row is not None and (rebuild or "project_key" not in str(row[0])):
+        _rebuild_memory_vectors_with_metadata(conn)
+        return
+    conn.execute(MEMORY_VECTORS_DDL)
+
+
+def _rebuild_memory_vectors_with_metadata(conn: sqlite3.Connection) -> None:
+    """Recreate memory_vectors with project_key/kind metadata columns.
+
+    vec0 tables cannot be altered, so rows are copied out, the table is recreated, and the
+    rows are copied back with metadata taken from memory_items. Embeddings are reused.
+    """
+    # A savepoint rather than ``with conn``: inside a migration the step's transaction
+    # must stay open until user_version is bumped.
+    conn.execute("SAVEPOINT rebuild_memory_vectors")
+    try:
+        conn.execute("DROP TABLE IF EXISTS memory_vectors_migrate")
+        conn.execute(
+            """
+            CREATE TEMP TABLE memory_vectors_migrate AS
+            SELECT rowid AS vector_rowid, embedding, memory_id, chunk_index, content_hash, model
+            FROM memory_vectors
+            """
+        )
+        conn.execute("DROP TABLE memory_vectors")
+        conn.execute(MEMORY_VECTORS_DDL)
+        conn.execute(
+            """
+            INSERT INTO memory_vectors(
+                rowid, embedding, project_key, kind, memory_id, chunk_index, content_hash, model
+            )
+            SELECT
+                migrate.vector_rowid,
+                migrate.embedding,
+                COALESCE(memory_items.project_key, ''),
+                COALESCE(memory_items.kind, ''),
+                migrate.memory_id,
+                migrate.chunk_index,
+                migrate.content_hash,
+                migrate.model
+            FROM memory_vectors_migrate AS migrate
+            LEFT JOIN memory_items ON memory_items.id = migrate.memory_id
+            """
+        )
+        conn.execute("DROP TABLE memory_vectors_migrate")
+    except BaseException:
+        conn.execute("ROLLBACK TO rebuild_memory_vectors")
+        conn.execute("RELEASE rebuild_memory_vectors")
+        raise
+    conn.execute("RELEASE rebuild_memory_vectors")
 
 
 def _ensure_raw_event_reliability_schema(conn: sqlite3.Connection) -> None:
@@ -462,16 +589,658 @@ def _ensure_raw_event_reliability_schema(conn: sqlite3.Connection) -> None:
     _ensure_column(conn, "raw_event_flush_batches", "attempt_count", "INTEGER NOT NULL DEFAULT 0")
 
 
-def initialize_schema(conn: sqlite3.Connection) -> None:
-    if _schema_user_version(conn) < SCHEMA_VERSION:
-        _initialize_schema_v1(conn)
-        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
-    _ensure_vector_schema(conn)
-    _ensure_raw_event_reliability_schema(conn)
+def _ensure_vector_index_queue_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vector_index_queue (
+            memory_id INTEGER PRIMARY KEY REFERENCES memory_items(id) ON DELETE CASCADE,
+            enqueued_at TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_vector_index_queue_enqueued
+        ON vector_index_queue(enqueued_at)
+        """
+    )
+
+
+def _ensure_vector_metadata_queue_schema(conn: sqlite3.Connection) -> None:
+    """Queue memories whose project_key/kind changed so only their vectors get re-keyed.
+
+    memory_vectors can only be searched by memory_id with a full vec0 scan, so metadata
+    refreshes run for these memories alone rather than for every touched memory.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vector_metadata_queue (
+            memory_id INTEGER PRIMARY KEY REFERENCES memory_items(id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS memory_items_vector_metadata_au
+        AFTER UPDATE OF kind, project_key ON memory_items
+        WHEN old.kind IS NOT new.kind OR old.project_key IS NOT new.project_key BEGIN
+            INSERT OR IGNORE INTO vector_metadata_queue(memory_id) VALUES (new.id);
+        END
+        """
+    )
+
+
+def _project_key_sql(column: str) -> str:
+    """SQL mirror of store.utils.project_key: lowercased basename of a path-like project value."""
+    # char(32, 9, 10, 13, 12, 11) is store.utils.PROJECT_KEY_WHITESPACE.
+    trimmed = f"trim({column}, char(32, 9, 10, 13, 12, 11))"
+    normalized = f"rtrim(replace({trimmed}, '\\', '/'), '/')"
+    return f"lower(replace({normalized}, rtrim({normalized}, replace({normalized}, '/', '')), ''))"
+
+
+def _ensure_project_key_schema(conn: sqlite3.Connection) -> bool:
+    """project_key lets project filters use one indexed equality instead of suffix LIKEs.
+
+    Writers set sessions.project_key with project and memory_items.project_key with
+    session_id; only the cross-table propagation runs as a trigger. Returns True when
+    existing keys were rewritten, so memory_vectors metadata must be rebuilt.
+    """
+    session_columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)").fetchall()}
+    if "project_key" not in session_columns:
+        conn.execute("ALTER TABLE sessions ADD COLUMN project_key TEXT")
+        conn.execute(f"UPDATE sessions SET project_key = {_project_key_sql('project')}")
+    memory_columns = {row[1] for row in conn.execute("PRAGMA table_info(memory_items)").fetchall()}
+    if "project_key" not in memory_columns:
+        conn.execute("ALTER TABLE memory_items ADD COLUMN project_key TEXT")
+        conn.execute(
+            """
+            UPDATE memory_items
+            SET project_key = (
+                SELECT sessions.project_key FROM sessions
+                WHERE sessions.id = memory_items.session_id
+            )
+            """
+        )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS sessions_project_key_propagate
+        AFTER UPDATE OF project_key ON sessions BEGIN
+            UPDATE memory_items SET project_key = new.project_key
+            WHERE session_id = new.id AND project_key IS NOT new.project_key;
+        END
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_project_key ON sessions(project_key)")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_memory_items_project_active_created
+        ON memory_items(project_key, active, created_at DESC)
+        """
+    )
+    legacy_trigger = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'sessions_project_key_ai'"
+    ).fetchone()
+    if legacy_trigger is None:
+        return False
+    # Databases from before keys were case-folded: drop the same-row triggers and rekey.
+    for trigger in (
+        "sessions_project_key_ai",
+        "sessions_project_key_au",
+        "memory_items_project_key_ai",
+        "memory_items_project_key_au",
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    session_key = _project_key_sql("project")
+    conn.execute(
+        f"UPDATE sessions SET project_key = {session_key} WHERE project_key IS NOT {session_key}"
+    )
+    usage_columns = {row[1] for row in conn.execute("PRAGMA table_info(usage_events)").fetchall()}
+    if "project_key" in usage_columns:
+        conn.execute(
+            f"""
+            UPDATE usage_events SET project_key = {_USAGE_PROJECT_KEY_SQL}
+            WHERE project_key IS NOT NULL AND project_key IS NOT {_USAGE_PROJECT_KEY_SQL}
+            """
+        )
+    return True
+
+
+def _ensure_memory_recency_schema(conn: sqlite3.Connection) -> None:
+    """Mirror created_at as unix seconds so recency ranking never parses date strings."""
+    fts_trigger = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'memory_items_au'"
+    ).fetchone()
+    if fts_trigger is not None and "UPDATE OF" not in str(fts_trigger[0]):
+        # Older databases reindex FTS on every column update; scope it so the epoch
+        # backfill and bookkeeping updates (active, rev, ...) do not rewrite FTS rows.
+        conn.execute("DROP TRIGGER memory_items_au")
+        conn.execute(
+            """
+            CREATE TRIGGER memory_items_au
+            AFTER UPDATE OF title, body_text, tags_text ON memory_items BEGIN
+                INSERT INTO memory_fts(memory_fts, rowid, title, body_text, tags_text)
+                VALUES('delete', old.id, old.title, old.body_text, old.tags_text);
+                INSERT INTO memory_fts(rowid, title, body_text, tags_text)
+                VALUES (new.id, new.title, new.body_text, new.tags_text);
+            END
+            """
+        )
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(memory_items)").fetchall()}
+    if "created_at_epoch" not in existing:
+        conn.execute("ALTER TABLE memory_items ADD COLUMN created_at_epoch INTEGER")
+        conn.execute(
+            """
+            UPDATE memory_items
+            SET created_at_epoch = CAST(strftime('%s', created_at) AS INTEGER)
+            """
+        )
+    # Every statement that writes created_at also writes created_at_epoch, so the row is
+    # never updated a second time by a trigger.
+    conn.execute("DROP TRIGGER IF EXISTS memory_items_epoch_ai")
+    conn.execute("DROP TRIGGER IF EXISTS memory_items_epoch_au")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_memory_items_active_kind_epoch
+        ON memory_items(active, kind, created_at_epoch DESC)
+        """
+    )
+
+
+def _usage_project_sql(row: str) -> str:
+    return (
+        f"CASE WHEN json_valid({row}.metadata_json) = 1 "
+        f"THEN json_extract({row}.metadata_json, '$.project') ELSE NULL END"
+    )
+
+
+# Attribute a usage event to its metadata project, falling back to the session's project.
+_USAGE_PROJECT_KEY_SQL = f"""
+    COALESCE(
+        NULLIF({_project_key_sql("usage_events.project")}, ''),
+        (SELECT sessions.project_key FROM sessions WHERE sessions.id = usage_events.session_id),
+        ''
+    )
+"""
+
+
+def _ensure_usage_rollup_schema(conn: sqlite3.Connection) -> None:
+    """Lift the usage project out of metadata_json and keep per-day rollups current.
+
+    usage_events.project/project_key are written with each row; a row with a NULL
+    project_key is not counted into usage_event_rollups. The triggers below add, move,
+    and remove a row's counts as it is inserted, changed, and deleted.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(usage_events)").fetchall()}
+    if "project" not in existing:
+        conn.execute("ALTER TABLE usage_events ADD COLUMN project TEXT")
+        conn.execute(f"UPDATE usage_events SET project = {_usage_project_sql('usage_events')}")
+    if "project_key" not in existing:
+        conn.execute("ALTER TABLE usage_events ADD COLUMN project_key TEXT")
+        conn.execute(f"UPDATE usage_events SET project_key = {_USAGE_PROJECT_KEY_SQL}")
+    rollup_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_event_rollups'"
+    ).fetchone()
+    if rollup_exists is None:
+        conn.execute(
+            """
+            CREATE TABLE usage_event_rollups (
+                event TEXT NOT NULL,
+                project_key TEXT NOT NULL,
+                day TEXT NOT NULL,
+                events INTEGER NOT NULL DEFAULT 0,
+                tokens_read INTEGER NOT NULL DEFAULT 0,
+                tokens_written INTEGER NOT NULL DEFAULT 0,
+                tokens_saved INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (event, project_key, day)
+            )
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO usage_event_rollups(
+                event, project_key, day, events, tokens_read, tokens_written, tokens_saved
+            )
+            SELECT event, project_key, substr(created_at, 1, 10), COUNT(*),
+                   COALESCE(SUM(tokens_read), 0), COALESCE(SUM(tokens_written), 0),
+                   COALESCE(SUM(tokens_saved), 0)
+            FROM usage_events
+            WHERE project_key IS NOT NULL
+            GROUP BY event, project_key, substr(created_at, 1, 10)
+            """
+        )
+    # Writers set project/project_key in the INSERT or UPDATE itself (store/usage.py); older
+    # databases lifted them with same-row triggers.
+    conn.execute("DROP TRIGGER IF EXISTS usage_events_project_ai")
+    conn.execute("DROP TRIGGER IF EXISTS usage_events_project_au")
+    rollup_au = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'usage_events_rollup_au'"
+    ).fetchone()
+    if rollup_au is not None and "UPDATE OF event," not in str(rollup_au[0]):
+        # Older trigger only moved counts when project_key changed.
+        conn.execute("DROP TRIGGER usage_events_rollup_au")
+    add_new = """
+            INSERT INTO usage_event_rollups(
+                event, project_key, day, events, tokens_read, tokens_written, tokens_saved
+            )
+            SELECT new.event, new.project_key, substr(new.created_at, 1, 10), 1,
+                   COALESCE(new.tokens_read, 0), COALESCE(new.tokens_written, 0),
+                   COALESCE(new.tokens_saved, 0)
+            WHERE new.project_key IS NOT NULL
+            ON CONFLICT(event, project_key, day) DO UPDATE SET
+                events = events + 1,
+                tokens_read = tokens_read + excluded.tokens_read,
+                tokens_written = tokens_written + excluded.tokens_written,
+                tokens_saved = tokens_saved + excluded.tokens_saved;
+    """
+    _execute_script(
+        conn,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS usage_events_rollup_ai
+        AFTER INSERT ON usage_events BEGIN
+            {add_new}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS usage_events_rollup_au
+        AFTER UPDATE OF event, project_key, created_at, tokens_read, tokens_written, tokens_saved
+        ON usage_events BEGIN
+            UPDATE usage_event_rollups
+            SET events = events - 1,
+                tokens_read = tokens_read - COALESCE(old.tokens_read, 0),
+                tokens_written = tokens_written - COALESCE(old.tokens_written, 0),
+                tokens_saved = tokens_saved - COALESCE(old.tokens_saved, 0)
+            WHERE event = old.event
+              AND project_key = old.project_key
+              AND day = substr(old.created_at, 1, 10);
+            {add_new}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS usage_events_rollup_ad
+        AFTER DELETE ON usage_events WHEN old.project_key IS NOT NULL BEGIN
+            UPDATE usage_event_rollups
+            SET events = events - 1,
+                tokens_read = tokens_read - COALESCE(old.tokens_read, 0),
+                tokens_written = tokens_written - COALESCE(old.tokens_written, 0),
+                tokens_saved = tokens_saved - COALESCE(old.tokens_saved, 0)
+            WHERE event = old.event
+              AND project_key = old.project_key
+              AND day = substr(old.created_at, 1, 10);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS sessions_usage_project_key_propagate
+        AFTER UPDATE OF project_key ON sessions BEGIN
+            UPDATE usage_events SET project_key = COALESCE(new.project_key, '')
+            WHERE session_id = new.id
+              AND NULLIF({_project_key_sql("usage_events.project")}, '') IS NULL
+              AND project_key IS NOT COALESCE(new.project_key, '');
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_usage_events_event_project_key_created
+        ON usage_events(event, project_key, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_usage_events_event_project
+        ON usage_events(event, project);
+        """,
+    )
+
+
+def _discovery_group_sql(row: str) -> str:
+    return (
+        f"CASE WHEN json_valid({row}.metadata_json) = 1 "
+        f"THEN json_extract({row}.metadata_json, '$.discovery_group') ELSE NULL END"
+    )
+
+
+def _discovery_tokens_sql(row: str) -> str:
+    return (
+        f"CASE WHEN json_valid({row}.metadata_json) = 1 "
+        f"THEN COALESCE(CAST(json_extract({row}.metadata_json, '$.discovery_tokens') AS INTEGER), 0) "
+        "ELSE 0 END"
+    )
+
+
+def _ensure_discovery_rollup_schema(conn: sqlite3.Connection) -> None:
+    """Per-session discovery token rollups backing the work investment totals.
+
+    memory_discovery_totals keeps additive sums; memory_discovery_groups keeps the max per
+    discovery_group, recomputed from the session's memories when a row's share can shrink.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_discovery_groups'"
+    ).fetchone()
+    group = _discovery_group_sql("memory_items")
+    tokens = _discovery_tokens_sql("memory_items")
+    if exists is None:
+        conn.execute("DROP TABLE IF EXISTS memory_discovery_totals")
+        conn.execute(
+            """
+            CREATE TABLE memory_discovery_totals (
+                session_id INTEGER PRIMARY KEY,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                ungrouped_tokens INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE memory_discovery_groups (
+                session_id INTEGER NOT NULL,
+                discovery_group TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (session_id, discovery_group)
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO memory_discovery_totals(session_id, tokens, ungrouped_tokens)
+            SELECT session_id, SUM({tokens}),
+                   SUM(CASE WHEN {group} IS NULL THEN {tokens} ELSE 0 END)
+            FROM memory_items
+            GROUP BY session_id
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO memory_discovery_groups(session_id, discovery_group, tokens)
+            SELECT session_id, {group}, MAX({tokens})
+            FROM memory_items
+            WHERE {group} IS NOT NULL
+            GROUP BY session_id, {group}
+            """
+        )
+    new_group = _discovery_group_sql("new")
+    new_tokens = _discovery_tokens_sql("new")
+    old_group = _discovery_group_sql("old")
+    old_tokens = _discovery_tokens_sql("old")
+    add_totals = f"""
+            INSERT INTO memory_discovery_totals(session_id, tokens, ungrouped_tokens)
+            VALUES (
+                new.session_id,
+                {new_tokens},
+                CASE WHEN {new_group} IS NULL THEN {new_tokens} ELSE 0 END
+            )
+            ON CONFLICT(session_id) DO UPDATE SET
+                tokens = tokens + excluded.tokens,
+                ungrouped_tokens = ungrouped_tokens + excluded.ungrouped_tokens;
+    """
+    subtract_totals = f"""
+            UPDATE memory_discovery_totals
+            SET tokens = tokens - ({old_tokens}),
+                ungrouped_tokens = ungrouped_tokens
+                    - (CASE WHEN {old_group} IS NULL THEN {old_tokens} ELSE 0 END)
+            WHERE session_id = old.session_id;
+    """
+    raise_group = f"""
+            INSERT INTO memory_discovery_groups(session_id, discovery_group, tokens)
+            SELECT new.session_id, {new_group}, {new_tokens}
+            WHERE {new_group} IS NOT NULL
+            ON CONFLICT(session_id, discovery_group) DO UPDATE SET
+                tokens = MAX(tokens, excluded.tokens);
+    """
+    recompute_old_group = f"""
+            DELETE FROM memory_discovery_groups
+            WHERE session_id = old.session_id AND discovery_group = {old_group};
+            INSERT INTO memory_discovery_groups(session_id, discovery_group, tokens)
+            SELECT old.session_id, {old_group}, MAX({tokens})
+            FROM memory_items
+            WHERE memory_items.session_id = old.session_id AND {group} = {old_group}
+            GROUP BY memory_items.session_id;
+    """
+    # Growing (or first-time) group contributions only ever raise the max.
+    grows = (
+        f"({old_group} IS NULL OR (old.session_id = new.session_id "
+        f"AND {old_group} IS {new_group} AND {new_tokens} >= {old_tokens}))"
+    )
+    _execute_script(
+        conn,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS memory_items_discovery_ai
+        AFTER INSERT ON memory_items BEGIN
+            {add_totals}
+            {raise_group}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_discovery_totals_au
+        AFTER UPDATE OF metadata_json, session_id ON memory_items BEGIN
+            {subtract_totals}
+            {add_totals}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_discovery_grow_au
+        AFTER UPDATE OF metadata_json, session_id ON memory_items WHEN {grows} BEGIN
+            {raise_group}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_discovery_shrink_au
+        AFTER UPDATE OF metadata_json, session_id ON memory_items WHEN NOT {grows} BEGIN
+            {recompute_old_group}
+            {raise_group}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_discovery_ad
+        AFTER DELETE ON memory_items BEGIN
+            {subtract_totals}
+            {recompute_old_group}
+        END;
+        """,
+    )
+
+
+def trigram_index_available(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_trigram'"
+    ).fetchone()
+    return row is not None
+
+
+def _ensure_memory_trigram_schema(conn: sqlite3.Connection) -> None:
+    """Trigram FTS over titles/bodies so fuzzy lookup scans an index, not recent rows."""
+    if trigram_index_available(conn):
+        return
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE memory_trigram USING fts5(
+                title, body_text,
+                content='memory_items',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        # SQLite < 3.34 has no trigram tokenizer; fuzzy search falls back to a recent scan.
+        return
+    _execute_script(
+        conn,
+        """
+        CREATE TRIGGER IF NOT EXISTS memory_items_trigram_ai AFTER INSERT ON memory_items BEGIN
+            INSERT INTO memory_trigram(rowid, title, body_text)
+            VALUES (new.id, new.title, new.body_text);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_trigram_au
+        AFTER UPDATE OF title, body_text ON memory_items BEGIN
+            INSERT INTO memory_trigram(memory_trigram, rowid, title, body_text)
+            VALUES('delete', old.id, old.title, old.body_text);
+            INSERT INTO memory_trigram(rowid, title, body_text)
+            VALUES (new.id, new.title, new.body_text);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS memory_items_trigram_ad AFTER DELETE ON memory_items BEGIN
+            INSERT INTO memory_trigram(memory_trigram, rowid, title, body_text)
+            VALUES('delete', old.id, old.title, old.body_text);
+        END;
+        """,
+    )
+    conn.execute("INSERT INTO memory_trigram(memory_trigram) VALUES('rebuild')")
+
+
+def _migrate_project_keys(conn: sqlite3.Connection) -> None:
+    if _ensure_project_key_schema(conn):
+        # Rebuilding an older memory_vectors table copies the new keys from memory_items.
+        _ensure_vector_schema(conn, rebuild=True)
+
+
+def _cleanup_legacy_rows(conn: sqlite3.Connection) -> None:
     _normalize_legacy_memory_kinds(conn)
     _cleanup_orphan_prompt_links(conn)
+
+
+def _ensure_raw_event_session_counters(conn: sqlite3.Connection) -> None:
+    """Make raw_event_sessions.last_received_event_seq authoritative for backlog queries.
+
+    Events stored before server-assigned sequencing (or sessions that never got a row)
+    left the counter behind MAX(raw_events.event_seq); backfill it once so the sweeper
+    can stop aggregating raw_events.
+    """
+    now = dt.datetime.now(dt.UTC).isoformat()
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO raw_event_sessions(opencode_session_id, updated_at)
+        SELECT DISTINCT opencode_session_id, ? FROM raw_events
+        """,
+        (now,),
+    )
+    conn.execute(
+        """
+        UPDATE raw_event_sessions
+        SET last_received_event_seq = (
+            SELECT MAX(event_seq) FROM raw_events
+            WHERE raw_events.opencode_session_id = raw_event_sessions.opencode_session_id
+        )
+        WHERE COALESCE(last_received_event_seq, -1) < (
+            SELECT MAX(event_seq) FROM raw_events
+            WHERE raw_events.opencode_session_id = raw_event_sessions.opencode_session_id
+        )
+        """
+    )
+    conn.execute(
+        """
+        UPDATE raw_event_sessions SET last_received_event_seq = -1
+        WHERE last_received_event_seq IS NULL
+        """
+    )
+    # Only sessions with unflushed events, ordered for the idle sweep.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_raw_event_sessions_pending
+        ON raw_event_sessions(last_seen_ts_wall_ms)
+        WHERE last_received_event_seq > last_flushed_event_seq
+        """
+    )
+
+
+def _ensure_raw_event_wall_clock_index(conn: sqlite3.Connection) -> None:
+    # Retention purges select raw_events by ts_wall_ms in bounded batches. Tables that
+    # predate the column never had it added.
+    _ensure_column(conn, "raw_events", "ts_wall_ms", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_raw_events_ts_wall_ms ON raw_events(ts_wall_ms)")
+
+
+# Numbered schema migrations: MIGRATIONS[n - 1] brings a database to user_version n. Every
+# step is idempotent, because databases created before this list existed are all at
+# version 1 whatever subset of the later steps they already carry. Append new steps;
+# never reorder or remove one.
+MIGRATIONS: tuple[Callable[[sqlite3.Connection], None], ...] = (
+    _initialize_schema_v1,
+    _ensure_raw_event_reliability_schema,
+    _ensure_vector_index_queue_schema,
+    _ensure_memory_recency_schema,
+    _migrate_project_keys,
+    _ensure_vector_metadata_queue_schema,
+    _ensure_usage_rollup_schema,
+    _ensure_discovery_rollup_schema,
+    _cleanup_legacy_rows,
+    _ensure_raw_event_session_counters,
+    _ensure_raw_event_wall_clock_index,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# (database path, vectors enabled) pairs this process has already brought to
+# SCHEMA_VERSION and checked for capability-dependent tables.
+_VERIFIED_SCHEMAS: set[tuple[str, bool]] = set()
+_VERIFIED_SCHEMAS_LOCK = threading.Lock()
+# Stores opened together (e.g. the viewer pool) must not run the same ALTER TABLE twice.
+_MIGRATIONS_LOCK = threading.Lock()
+
+
+def initialize_schema(conn: sqlite3.Connection, db_path: Path | str | None = None) -> None:
+    """Bring the database behind ``conn`` up to SCHEMA_VERSION.
+
+    Pending migrations run in order, each recorded in ``user_version`` as it completes.
+    Tables that depend on what this process can load (memory_vectors via sqlite-vec, the
+    trigram index) are checked once per process and database, so an open of a current,
+    verified database costs one PRAGMA read plus loading sqlite-vec into the connection.
+    """
+    vectors_enabled = _vector_schema_enabled()
+    if vectors_enabled:
+        _load_sqlite_vec(conn)
+    version = _schema_user_version(conn)
+    migrated = version < SCHEMA_VERSION
+    if migrated:
+        with _MIGRATIONS_LOCK:
+            _run_migrations(conn)
+    key = _schema_cache_key(conn, db_path, vectors_enabled)
+    with _VERIFIED_SCHEMAS_LOCK:
+        verified = key in _VERIFIED_SCHEMAS
+    if verified and not migrated:
+        return
+    _ensure_memory_trigram_schema(conn)
+    _ensure_vector_schema(conn)
     if conn.in_transaction:
         conn.commit()
+    if key is not None:
+        with _VERIFIED_SCHEMAS_LOCK:
+            _VERIFIED_SCHEMAS.add(key)
+
+
+def _run_migrations(conn: sqlite3.Connection) -> None:
+    """Apply pending MIGRATIONS, each in one ``BEGIN IMMEDIATE`` transaction.
+
+    A step's DDL, its backfill and the ``user_version`` bump commit together, so a crash
+    or lock error part way through leaves the step to be redone whole. ``user_version`` is
+    re-read after taking the write lock, so processes migrating the same database at once
+    run each step exactly once.
+    """
+    for version, migrate in enumerate(MIGRATIONS, start=1):
+        if _schema_user_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _schema_user_version(conn) >= version:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    """Run a multi-statement script without ``executescript``'s implicit COMMIT."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _schema_cache_key(
+    conn: sqlite3.Connection, db_path: Path | str | None, vectors_enabled: bool
+) -> tuple[str, bool] | None:
+    if db_path is None:
+        row = conn.execute("SELECT file FROM pragma_database_list WHERE name = 'main'").fetchone()
+        db_path = row[0] if row else ""
+    if not db_path or str(db_path) == ":memory:":
+        return None
+    return str(Path(db_path).expanduser().resolve()), vectors_enabled
 
 
 def _ensure_column(conn: sqlite3.Connection, table: str, column: str, column_type: str) -> None:
@@ -502,6 +1271,17 @@ def to_json(data: Any) -> str:
     return json.dumps(payload, ensure_ascii=False)
 
 
+def to_json_compact(data: Any) -> str:
+    """Compact JSON for bulk payload columns; uses orjson when it is installed."""
+    payload = {} if data is None else data
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
 def from_json(text: str | None) -> dict[str, Any]:
     if not text:
         return {}
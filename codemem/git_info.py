@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import os
 import subprocess
+import threading
+import time
 from collections.abc import Sequence
+from pathlib import Path
 
 LOCKFILE_PATTERNS: list[str] = [
     "uv.lock",
@@ -62,6 +66,77 @@ def detect_git_info(cwd: str) -> dict[str, str | None]:
     }
 
 
+# cwd -> (expires_at monotonic, (index mtime_ns, HEAD mtime_ns) or None, detect_git_info result)
+_GIT_INFO_CACHE: dict[str, tuple[float, tuple[int, int] | None, dict[str, str | None]]] = {}
+_GIT_INFO_CACHE_MAX = 64
+_GIT_INFO_LOCK = threading.Lock()
+
+
+def _git_context_ttl_ms() -> int:
+    value = os.environ.get("CODEMEM_GIT_CONTEXT_TTL_MS", "10000")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 10000
+
+
+def _git_dir(cwd: str) -> Path | None:
+    """Find the git dir for ``cwd`` without forking git (follows worktree ``.git`` files)."""
+    start = Path(cwd).resolve()
+    for parent in (start, *start.parents):
+        dot_git = parent / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            try:
+                text = dot_git.read_text(encoding="utf-8").strip()
+            except OSError:
+                return None
+            if text.startswith("gitdir:"):
+                return (parent / text.removeprefix("gitdir:").strip()).resolve()
+            return None
+    return None
+
+
+def _git_state(cwd: str) -> tuple[int, int] | None:
+    git_dir = _git_dir(cwd)
+    if git_dir is None:
+        return None
+    stamps = []
+    for name in ("index", "HEAD"):
+        try:
+            stamps.append((git_dir / name).stat().st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return stamps[0], stamps[1]
+
+
+def cached_git_info(cwd: str) -> dict[str, str | None]:
+    """``detect_git_info`` cached per cwd for ``CODEMEM_GIT_CONTEXT_TTL_MS``.
+
+    An entry is dropped early when the mtime of ``.git/index`` or ``HEAD`` changes
+    (staging, commits, checkouts). Unstaged edits inside the TTL are not seen, which is
+    why the TTL is short; ``0`` disables the cache.
+    """
+    ttl_ms = _git_context_ttl_ms()
+    if ttl_ms <= 0:
+        return detect_git_info(cwd)
+    key = os.path.realpath(cwd)
+    state = _git_state(cwd)
+    now = time.monotonic()
+    with _GIT_INFO_LOCK:
+        entry = _GIT_INFO_CACHE.get(key)
+        if entry is not None and entry[0] > now and entry[1] == state:
+            return dict(entry[2])
+    info = detect_git_info(cwd)
+    with _GIT_INFO_LOCK:
+        _GIT_INFO_CACHE.pop(key, None)
+        _GIT_INFO_CACHE[key] = (now + ttl_ms / 1000, state, info)
+        while len(_GIT_INFO_CACHE) > _GIT_INFO_CACHE_MAX:
+            _GIT_INFO_CACHE.pop(next(iter(_GIT_INFO_CACHE)))
+    return dict(info)
+
+
 def resolve_worktree_parent(cwd: str) -> str | None:
     """If cwd is a git worktree, return the main repo root. Otherwise return None."""
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..observer_prompts import ToolEvent
+from .events import LOW_SIGNAL_TOOLS, event_to_tool_event
+from .transcript import transcript_part
+
+
+def prompt_record(event: dict[str, Any]) -> dict[str, Any] | None:
+    if event.get("type") != "user_prompt":
+        return None
+    prompt_text = str(event.get("prompt_text") or "").strip()
+    if not prompt_text:
+        return None
+    return {
+        "prompt_text": prompt_text,
+        "prompt_number": event.get("prompt_number"),
+        "timestamp": event.get("timestamp"),
+    }
+
+
+def assistant_message_text(event: dict[str, Any]) -> str | None:
+    if event.get("type") != "assistant_message":
+        return None
+    text = str(event.get("assistant_text") or "").strip()
+    return text or None
+
+
+def assistant_usage_record(event: dict[str, Any]) -> dict[str, int] | None:
+    if event.get("type") != "assistant_usage":
+        return None
+    usage = event.get("usage") or {}
+    if not isinstance(usage, dict):
+        return None
+    input_tokens = int(usage.get("input_tokens") or 0)
+    output_tokens = int(usage.get("output_tokens") or 0)
+    cache_creation = int(usage.get("cache_creation_input_tokens") or 0)
+    cache_read = int(usage.get("cache_read_input_tokens") or 0)
+    total = input_tokens + output_tokens + cache_creation
+    if total <= 0:
+        return None
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cache_creation_input_tokens": cache_creation,
+        "cache_read_input_tokens": cache_read,
+        "total_tokens": total,
+    }
+
+
+def _optional_int(value: Any) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ExtractedEvents:
+    """Everything ingest derives from a batch of events, built by one ``extract_events`` pass."""
+
+    event_count: int = 0
+    prompts: list[dict[str, Any]] = field(default_factory=list)
+    tool_events: list[ToolEvent] = field(default_factory=list)
+    assistant_messages: list[str] = field(default_factory=list)
+    assistant_usage: list[dict[str, int]] = field(default_factory=list)
+    transcript_parts: list[str] = field(default_factory=list)
+    prompt_count: int = 0
+    tool_count: int = 0
+    first_prompt: str | None = None
+    files_modified: set[str] = field(default_factory=set)
+    files_read: set[str] = field(default_factory=set)
+    min_ts_wall_ms: int | None = None
+    max_ts_wall_ms: int | None = None
+    start_event_seq: int | None = None
+    end_event_seq: int | None = None
+
+    @property
+    def transcript(self) -> str:
+        return "\n\n".join(self.transcript_parts)
+
+    def session_context(self) -> dict[str, Any]:
+        duration_ms = 0
+        if self.min_ts_wall_ms is not None and self.max_ts_wall_ms is not None:
+            duration_ms = max(0, self.max_ts_wall_ms - self.min_ts_wall_ms)
+        return {
+            "first_prompt": self.first_prompt,
+            "prompt_count": self.prompt_count,
+            "tool_count": self.tool_count,
+            "duration_ms": duration_ms,
+            "files_modified": sorted(self.files_modified),
+            "files_read": sorted(self.files_read),
+        }
+
+    def _track_session(self, event: dict[str, Any], event_type: Any) -> None:
+        ts = _optional_int(event.get("timestamp_wall_ms"))
+        if ts is not None:
+            self.min_ts_wall_ms = (
+                ts if self.min_ts_wall_ms is None else min(self.min_ts_wall_ms, ts)
+            )
+            self.max_ts_wall_ms = (
+                ts if self.max_ts_wall_ms is None else max(self.max_ts_wall_ms, ts)
+            )
+        seq = _optional_int(event.get("event_seq"))
+        if seq is not None:
+            self.start_event_seq = (
+                seq if self.start_event_seq is None else min(self.start_event_seq, seq)
+            )
+            self.end_event_seq = seq if self.end_event_seq is None else max(self.end_event_seq, seq)
+        if event_type == "user_prompt":
+            self.prompt_count += 1
+            if self.first_prompt is None:
+                text = event.get("prompt_text")
+                if isinstance(text, str) and text.strip():
+                    self.first_prompt = text.strip()
+        elif event_type == "tool.execute.after":
+            self.tool_count += 1
+            args = event.get("args") or {}
+            file_path = args.get("filePath") or args.get("path") if isinstance(args, dict) else None
+            if isinstance(file_path, str) and file_path:
+                tool = str(event.get("tool") or "").lower()
+                if tool in {"write", "edit"}:
+                    self.files_modified.add(file_path)
+                if tool == "read":
+                    self.files_read.add(file_path)
+
+
+def extract_events(
+    events: Iterable[dict[str, Any]],
+    *,
+    max_chars: int,
+    strip_private: Callable[[str], str],
+    low_signal_tools: set[str] = LOW_SIGNAL_TOOLS,
+) -> ExtractedEvents:
+    """Build prompts, tool events, assistant text/usage, transcript and session context.
+
+    ``events`` is consumed once, so it can be a generator over raw_events rows; no event
+    is kept after its derived values are recorded.
+    """
+    extracted = ExtractedEvents()
+    for event in events:
+        extracted.event_count += 1
+        event_type = event.get("type")
+        extracted._track_session(event, event_type)
+        if event_type == "user_prompt":
+            prompt = prompt_record(event)
+            if prompt is not None:
+                extracted.prompts.append(prompt)
+        elif event_type == "tool.execute.after":
+            tool_event = event_to_tool_event(
+                event, max_chars=max_chars, low_signal_tools=low_signal_tools
+            )
+            if tool_event is not None:
+                extracted.tool_events.append(tool_event)
+        elif event_type == "assistant_message":
+            message = assistant_message_text(event)
+            if message is not None:
+                extracted.assistant_messages.append(message)
+        elif event_type == "assistant_usage":
+            usage = assistant_usage_record(event)
+            if usage is not None:
+                extracted.assistant_usage.append(usage)
+        part = transcript_part(event, strip_private=strip_private)
+        if part:
+            extracted.transcript_parts.append(part)
+    return extracted
@@ -4,6 +4,13 @@ from collections.abc import Callable
 from typing import Any
 
 
+def latest_prompt_number(prompts: list[dict[str, Any]]) -> int | None:
+    prompt_number = None
+    for prompt in prompts:
+        prompt_number = prompt.get("prompt_number") or prompt_number
+    return prompt_number
+
+
 def persist_user_prompts(
     store: Any,
     *,
@@ -11,9 +18,7 @@ def persist_user_prompts(
     project: str | None,
     prompts: list[dict[str, Any]],
 ) -> int | None:
-    prompt_number = None
     for prompt in prompts:
-        prompt_number = prompt.get("prompt_number") or prompt_number
         store.add_user_prompt(
             session_id,
             project,
@@ -21,7 +26,7 @@ def persist_user_prompts(
             prompt_number=prompt.get("prompt_number"),
             metadata={"source": "plugin"},
         )
-    return prompt_number
+    return latest_prompt_number(prompts)
 
 
 def persist_artifacts(
@@ -17,18 +17,23 @@ def build_transcript(
 
     transcript_parts: list[str] = []
     for event in events:
-        event_type = event.get("type")
-        if event_type == "user_prompt":
-            prompt_text = strip_private(str(event.get("prompt_text") or "")).strip()
-            if prompt_text:
-                transcript_parts.append(f"User: {prompt_text}")
-        elif event_type == "assistant_message":
-            assistant_text = strip_private(str(event.get("assistant_text") or "")).strip()
-            if assistant_text:
-                transcript_parts.append(f"Assistant: {assistant_text}")
+        part = transcript_part(event, strip_private=strip_private)
+        if part:
+            transcript_parts.append(part)
     return "\n\n".join(transcript_parts)
 
 
+def transcript_part(event: dict[str, Any], *, strip_private: Callable[[str], str]) -> str | None:
+    event_type = event.get("type")
+    if event_type == "user_prompt":
+        prompt_text = strip_private(str(event.get("prompt_text") or "")).strip()
+        return f"User: {prompt_text}" if prompt_text else None
+    if event_type == "assistant_message":
+        assistant_text = strip_private(str(event.get("assistant_text") or "")).strip()
+        return f"Assistant: {assistant_text}" if assistant_text else None
+    return None
+
+
 def normalize_request_text(text: str | None) -> str:
     if not text:
         return ""
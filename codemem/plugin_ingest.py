@@ -31,9 +31,16 @@ from .ingest.events import (
 from .ingest.events import (
     normalize_tool_name as _normalize_tool_name_impl,
 )
+from .ingest.extract import (
+    ExtractedEvents,
+    extract_events,
+)
 from .ingest.persist import (
     end_session as _end_session_impl,
 )
+from .ingest.persist import (
+    latest_prompt_number as _latest_prompt_number_impl,
+)
 from .ingest.persist import (
     persist_artifacts as _persist_artifacts_impl,
 )
@@ -123,44 +130,6 @@ def _normalize_tool_name(event: dict[str, Any]) -> str:
     return _normalize_tool_name_impl(event)
 
 
-def _extract_assistant_messages(events: Iterable[dict[str, Any]]) -> list[str]:
-    messages: list[str] = []
-    for event in events:
-        if event.get("type") != "assistant_message":
-            continue
-        text = str(event.get("assistant_text") or "").strip()
-        if text:
-            messages.append(text)
-    return messages
-
-
-def _extract_assistant_usage(events: Iterable[dict[str, Any]]) -> list[dict[str, int]]:
-    usage_events: list[dict[str, int]] = []
-    for event in events:
-        if event.get("type") != "assistant_usage":
-            continue
-        usage = event.get("usage") or {}
-        if not isinstance(usage, dict):
-            continue
-        input_tokens = int(usage.get("input_tokens") or 0)
-        output_tokens = int(usage.get("output_tokens") or 0)
-        cache_creation = int(usage.get("cache_creation_input_tokens") or 0)
-        cache_read = int(usage.get("cache_read_input_tokens") or 0)
-        total = input_tokens + output_tokens + cache_creation
-        if total <= 0:
-            continue
-        usage_events.append(
-            {
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-                "cache_creation_input_tokens": cache_creation,
-                "cache_read_input_tokens": cache_read,
-                "total_tokens": total,
-            }
-        )
-    return usage_events
-
-
 def _build_transcript(events: Iterable[dict[str, Any]]) -> str:
     """Build a transcript from user prompts and assistant messages in chronological order."""
 
@@ -243,29 +212,36 @@ def _normalize_paths(paths: list[str], repo_root: str | None) -> list[str]:
     return normalized
 
 
-def _extract_prompts(events: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
-    prompts: list[dict[str, Any]] = []
-    for event in events:
-        if event.get("type") != "user_prompt":
-            continue
-        prompt_text = str(event.get("prompt_text") or "").strip()
-        if not prompt_text:
-            continue
-        prompts.append(
-            {
-                "prompt_text": prompt_text,
-                "prompt_number": event.get("prompt_number"),
-                "timestamp": event.get("timestamp"),
-            }
-        )
-    return prompts
+def _extract(events: Iterable[dict[str, Any]]) -> ExtractedEvents:
+    return extract_events(
+        events,
+        max_chars=_get_config().summary_max_chars,
+        strip_private=_strip_private,
+    )
 
 
-def ingest(payload: dict[str, Any]) -> None:
+def ingest(
+    payload: dict[str, Any],
+    *,
+    store: MemoryStore | None = None,
+    extracted: ExtractedEvents | None = None,
+) -> None:
+    """Turn one batch of plugin events into a session, observations and a summary.
+
+    Pass ``store`` to reuse an open store (the caller keeps ownership); otherwise one is
+    opened from ``CODEMEM_DB`` and closed afterwards. Pass ``extracted`` (from
+    ``_extract``/``extract_events``) when the events were already walked, e.g. streamed
+    from raw_events; ``payload["events"]`` is then ignored.
+    """
     cwd = payload.get("cwd") or os.getcwd()
-    events = payload.get("events") or []
-    if not isinstance(events, list) or not events:
+    if extracted is None:
+        events = payload.get("events") or []
+        if not isinstance(events, list) or not events:
+            return
+        extracted = _extract(events)
+    if not extracted.event_count:
         return
+    event_count = extracted.event_count
 
     # Extract session context from plugin (for comprehensive memories)
     session_context = payload.get("session_context") or {}
@@ -294,56 +270,49 @@ def ingest(payload: dict[str, Any]) -> None:
     else:
         project = raw_project
     repo_root = pre.get("project") or None
-    db_path = os.environ.get("CODEMEM_DB")
-    store = MemoryStore(Path(db_path) if db_path else db.DEFAULT_DB_PATH)
+    owns_store = store is None
+    if store is None:
+        db_path = os.environ.get("CODEMEM_DB")
+        store = MemoryStore(Path(db_path) if db_path else db.DEFAULT_DB_PATH)
     try:
         started_at = payload.get("started_at")
         opencode_session_id = session_context.get("opencode_session_id")
-        if isinstance(opencode_session_id, str) and opencode_session_id.strip():
-            session_id = store.get_or_create_opencode_session(
-                opencode_session_id=opencode_session_id,
-                cwd=cwd,
-                project=project,
-                metadata={
-                    "pre": pre,
-                    "source": "plugin",
-                    "event_count": len(events),
-                    "started_at": started_at,
-                    "session_context": session_context,
-                },
-            )
-        else:
-            session_id = store.start_session(
+        session_metadata = {
+            "pre": pre,
+            "source": "plugin",
+            "event_count": event_count,
+            "started_at": started_at,
+            "session_context": session_context,
+        }
+
+        def open_session() -> int:
+            if isinstance(opencode_session_id, str) and opencode_session_id.strip():
+                return store.get_or_create_opencode_session(
+                    opencode_session_id=opencode_session_id,
+                    cwd=cwd,
+                    project=project,
+                    metadata=session_metadata,
+                )
+            return store.start_session(
                 cwd=cwd,
                 project=project,
                 git_remote=pre.get("git_remote"),
                 git_branch=pre.get("git_branch"),
                 user=os.environ.get("USER", "unknown"),
                 tool_version="plugin",
-                metadata={
-                    "pre": pre,
-                    "source": "plugin",
-                    "event_count": len(events),
-                    "started_at": started_at,
-                    "session_context": session_context,
-                },
+                metadata=session_metadata,
             )
-        prompts = _extract_prompts(events)
-        prompt_number = _persist_user_prompts_impl(
-            store,
-            session_id=session_id,
-            project=project,
-            prompts=prompts,
-        )
-        max_chars = _get_config().summary_max_chars
-        tool_events = _extract_tool_events(events, max_chars)
+
+        prompts = extracted.prompts
+        prompt_number = _latest_prompt_number_impl(prompts)
+        tool_events = extracted.tool_events
 
         cfg = _get_config()
         observer_budget = int(getattr(cfg, "observer_max_chars", 12000) or 12000)
         tool_budget = max(2000, min(8000, observer_budget - 5000))
         tool_events = _budget_tool_events(tool_events, max_total_chars=tool_budget, max_events=30)
-        assistant_messages = _extract_assistant_messages(events)
-        assistant_usage_events = _extract_assistant_usage(events)
+        assistant_messages = extracted.assistant_messages
+        assistant_usage_events = extracted.assistant_usage
         last_assistant_message = assistant_messages[-1] if assistant_messages else None
         # Use first_prompt from session_context if available (more complete)
         latest_prompt = first_prompt or (prompts[-1]["prompt_text"] if prompts else None)
@@ -358,25 +327,27 @@ def ingest(payload: dict[str, Any]) -> None:
         ):
             should_process = False
         if not should_process:
-            _end_session_impl(
-                store,
-                session_id=session_id,
-                metadata={
-                    "post": post,
-                    "source": "plugin",
-                    "event_count": len(events),
-                    "session_context": session_context,
-                },
-            )
+            with store.batch():
+                session_id = open_session()
+                _persist_user_prompts_impl(
+                    store,
+                    session_id=session_id,
+                    project=project,
+                    prompts=prompts,
+                )
+                _end_session_impl(
+                    store,
+                    session_id=session_id,
+                    metadata={
+                        "post": post,
+                        "source": "plugin",
+                        "event_count": event_count,
+                        "session_context": session_context,
+                    },
+                )
             return
-        transcript = _build_transcript(events)
+        transcript = extracted.transcript
         artifacts = _build_artifacts_impl(pre, post, transcript, build_bundle=build_artifact_bundle)
-        _persist_artifacts_impl(
-            store,
-            session_id=session_id,
-            artifacts=artifacts,
-            flush_batch=flush_batch,
-        )
 
         # Build session context summary for observer
         session_summary_parts = []
@@ -411,6 +382,7 @@ def ingest(payload: dict[str, Any]) -> None:
             diff_summary=diff_summary,
             recent_files=post.get("recent_files") or "",
         )
+        # The observer call runs before any write so no transaction is held across it.
         response = _get_observer().observe(observer_context)
         flusher = session_context.get("flusher")
         if isinstance(flusher, str) and flusher == "raw_events" and not response.raw:
@@ -432,15 +404,6 @@ def ingest(payload: dict[str, Any]) -> None:
         else:
             discovery_tokens = store.estimate_tokens(discovery_text)
 
-        discovery_group = None
-        if isinstance(opencode_session_id, str) and opencode_session_id.strip():
-            if prompt_number is not None:
-                discovery_group = f"{opencode_session_id.strip()}:p{prompt_number}"
-            else:
-                discovery_group = f"{opencode_session_id.strip()}:unknown"
-        elif prompt_number is not None:
-            discovery_group = f"session:{session_id}:p{prompt_number}"
-
         observations_to_store = []
         if STORE_TYPED and has_meaningful_observation(parsed.observations):
             allowed_kinds = {
@@ -488,51 +451,77 @@ def ingest(payload: dict[str, Any]) -> None:
                     summary.request = derived_request
                 summary_to_store = summary
 
-        _persist_observations_impl(
-            store,
-            session_id=session_id,
-            observations=observations_to_store,
-            prompt_number=prompt_number,
-            discovery_group=discovery_group,
-            discovery_tokens=int(discovery_tokens),
-            discovery_source="usage" if usage_token_total > 0 else "estimate",
-            flush_batch=flush_batch,
-        )
-
-        if summary_to_store:
-            _persist_session_summary_impl(
+        # One transaction per flush: a failure anywhere below leaves no partial writes behind.
+        with store.batch():
+            session_id = open_session()
+            _persist_user_prompts_impl(
                 store,
                 session_id=session_id,
                 project=project,
-                summary=summary_to_store,
+                prompts=prompts,
+            )
+            _persist_artifacts_impl(
+                store,
+                session_id=session_id,
+                artifacts=artifacts,
+                flush_batch=flush_batch,
+            )
+
+            discovery_group = None
+            if isinstance(opencode_session_id, str) and opencode_session_id.strip():
+                if prompt_number is not None:
+                    discovery_group = f"{opencode_session_id.strip()}:p{prompt_number}"
+                else:
+                    discovery_group = f"{opencode_session_id.strip()}:unknown"
+            elif prompt_number is not None:
+                discovery_group = f"session:{session_id}:p{prompt_number}"
+
+            _persist_observations_impl(
+                store,
+                session_id=session_id,
+                observations=observations_to_store,
                 prompt_number=prompt_number,
-                request_original=request_original,
                 discovery_group=discovery_group,
                 discovery_tokens=int(discovery_tokens),
                 discovery_source="usage" if usage_token_total > 0 else "estimate",
                 flush_batch=flush_batch,
-                summary_body=_summary_body,
-                is_low_signal_text=is_low_signal_observation,
-                first_sentence=_first_sentence,
             )
 
-        _record_observer_usage_impl(
-            store,
-            session_id=session_id,
-            project=project,
-            response_raw=response.raw or "",
-            transcript=transcript,
-            observation_count=len(observations_to_store),
-            has_summary=summary_to_store is not None,
-        )
+            if summary_to_store:
+                _persist_session_summary_impl(
+                    store,
+                    session_id=session_id,
+                    project=project,
+                    summary=summary_to_store,
+                    prompt_number=prompt_number,
+                    request_original=request_original,
+                    discovery_group=discovery_group,
+                    discovery_tokens=int(discovery_tokens),
+                    discovery_source="usage" if usage_token_total > 0 else "estimate",
+                    flush_batch=flush_batch,
+                    summary_body=_summary_body,
+                    is_low_signal_text=is_low_signal_observation,
+                    first_sentence=_first_sentence,
+                )
+
+            _record_observer_usage_impl(
+                store,
+                session_id=session_id,
+                project=project,
+                response_raw=response.raw or "",
+                transcript=transcript,
+                observation_count=len(observations_to_store),
+                has_summary=summary_to_store is not None,
+            )
 
-        _end_session_impl(
-            store,
-            session_id=session_id,
-            metadata={"post": post, "source": "plugin", "event_count": len(events)},
-        )
+            _end_session_impl(
+                store,
+                session_id=session_id,
+                metadata={"post": post, "source": "plugin", "event_count": event_count},
+            )
     finally:
-        store.close()
+        if owns_store:
+            store.close()
 
 
 def main() -> None:
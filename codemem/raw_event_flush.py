@@ -4,64 +4,77 @@ import datetime as dt
 import os
 from typing import Any
 
-from .plugin_ingest import ingest
+from .ingest.extract import ExtractedEvents
+from .plugin_ingest import _extract, ingest
 from .store import MemoryStore
 from .store.raw_events import RAW_EVENT_QUEUE_FAILED
 
 EXTRACTOR_VERSION = "raw_events_v1"
+DEFAULT_FLUSH_CHUNK_EVENTS = 500
 
 
-def build_session_context(events: list[dict[str, Any]]) -> dict[str, Any]:
-    prompt_count = sum(1 for e in events if e.get("type") == "user_prompt")
-    tool_count = sum(1 for e in events if e.get("type") == "tool.execute.after")
-
-    ts_values = []
-    for e in events:
-        ts = e.get("timestamp_wall_ms")
-        if ts is None:
-            continue
-        try:
-            ts_values.append(int(ts))
-        except (TypeError, ValueError):
-            continue
-    duration_ms = 0
-    if ts_values:
-        duration_ms = max(0, max(ts_values) - min(ts_values))
-
-    files_modified: set[str] = set()
-    files_read: set[str] = set()
-    for e in events:
-        if e.get("type") != "tool.execute.after":
-            continue
-        tool = str(e.get("tool") or "").lower()
-        args = e.get("args") or {}
-        if not isinstance(args, dict):
-            continue
-        file_path = args.get("filePath") or args.get("path")
-        if not isinstance(file_path, str) or not file_path:
-            continue
-        if tool in {"write", "edit"}:
-            files_modified.add(file_path)
-        if tool == "read":
-            files_read.add(file_path)
-
-    first_prompt = None
-    for e in events:
-        if e.get("type") != "user_prompt":
-            continue
-        text = e.get("prompt_text")
-        if isinstance(text, str) and text.strip():
-            first_prompt = text.strip()
-            break
-
-    return {
-        "first_prompt": first_prompt,
-        "prompt_count": prompt_count,
-        "tool_count": tool_count,
-        "duration_ms": duration_ms,
-        "files_modified": sorted(files_modified),
-        "files_read": sorted(files_read),
-    }
+def flush_chunk_events() -> int:
+    value = os.environ.get("CODEMEM_RAW_EVENTS_FLUSH_CHUNK_EVENTS", str(DEFAULT_FLUSH_CHUNK_EVENTS))
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_FLUSH_CHUNK_EVENTS
+
+
+class RawEventFlushWriter:
+    """The store operations a raw-event flush performs, each under the store's write lock.
+
+    Sweeper workers flush different sessions at once over one writer connection. Every
+    method here holds ``store.write_lock`` (the lock ``batch()`` takes), so none of these
+    statements lands inside another worker's open batch; ingest writes in ``store.batch()``.
+    The observer call between them holds no lock, so workers still overlap there.
+    """
+
+    def __init__(self, store: MemoryStore) -> None:
+        self.store = store
+
+    def session_meta(self, opencode_session_id: str) -> dict[str, Any]:
+        with self.store.write_lock:
+            return self.store.raw_event_session_meta(opencode_session_id)
+
+    def extract_pending(self, opencode_session_id: str, *, limit: int) -> ExtractedEvents:
+        """Stream up to ``limit`` unflushed events through one extraction pass."""
+        with self.store.write_lock:
+            last_flushed = self.store.raw_event_flush_state(opencode_session_id)
+            return _extract(
+                self.store.iter_raw_events_since_by_seq(
+                    opencode_session_id=opencode_session_id,
+                    after_event_seq=last_flushed,
+                    limit=limit,
+                )
+            )
+
+    def catch_up(self, opencode_session_id: str) -> bool:
+        with self.store.write_lock:
+            return self.store.catch_up_raw_event_flush_state(opencode_session_id)
+
+    def open_batch(
+        self, opencode_session_id: str, start_event_seq: int, end_event_seq: int
+    ) -> tuple[int, str]:
+        with self.store.write_lock:
+            return self.store.get_or_create_raw_event_flush_batch(
+                opencode_session_id=opencode_session_id,
+                start_event_seq=start_event_seq,
+                end_event_seq=end_event_seq,
+                extractor_version=EXTRACTOR_VERSION,
+            )
+
+    def claim_batch(self, batch_id: int) -> bool:
+        with self.store.write_lock:
+            return self.store.claim_raw_event_flush_batch(batch_id)
+
+    def finish_batch(self, batch_id: int, status: str) -> None:
+        with self.store.write_lock:
+            self.store.update_raw_event_flush_batch_status(batch_id, status)
+
+    def advance(self, opencode_session_id: str, last_event_seq: int) -> None:
+        with self.store.write_lock:
+            self.store.update_raw_event_flush_state(opencode_session_id, last_event_seq)
 
 
 def flush_raw_events(
@@ -73,23 +86,16 @@ def flush_raw_events(
     started_at: str | None,
     max_events: int | None = None,
 ) -> dict[str, int]:
-    def _event_seq(value: Any, fallback: int) -> int:
-        if value is None:
-            return fallback
-        try:
-            return int(value)
-        except (TypeError, ValueError):
-            return fallback
-
-    def _event_seq_opt(value: Any) -> int | None:
-        if value is None:
-            return None
-        try:
-            return int(value)
-        except (TypeError, ValueError):
-            return None
-
-    meta = store.raw_event_session_meta(opencode_session_id)
+    """Flush a session's unflushed raw events through ingest.
+
+    With ``max_events`` set, at most one batch of that many events is flushed. Without it
+    the backlog is drained in batches of ``CODEMEM_RAW_EVENTS_FLUSH_CHUNK_EVENTS``; each
+    batch is streamed from the database into a single extraction pass, gets its own
+    ``raw_event_flush_batches`` row and advances the flush state, so a failure part way
+    through a long session resumes from the last completed batch.
+    """
+    writer = RawEventFlushWriter(store)
+    meta = writer.session_meta(opencode_session_id)
     if cwd is None:
         cwd = meta.get("cwd") or os.getcwd()
     if project is None:
@@ -97,38 +103,52 @@ def flush_raw_events(
     if started_at is None:
         started_at = meta.get("started_at")
 
-    last_flushed = store.raw_event_flush_state(opencode_session_id)
-    events = store.raw_events_since_by_seq(
-        opencode_session_id=opencode_session_id,
-        after_event_seq=last_flushed,
-        limit=max_events,
-    )
-    if not events:
-        return {"flushed": 0, "updated_state": 0}
-
-    event_seqs = [_event_seq_opt(e.get("event_seq")) for e in events]
-    event_seqs = [seq for seq in event_seqs if seq is not None]
-    if not event_seqs:
-        return {"flushed": 0, "updated_state": 0}
-
-    start_event_seq = min(event_seqs)
-    last_event_seq = max(event_seqs)
-    if last_event_seq < start_event_seq:
-        return {"flushed": 0, "updated_state": 0}
-
-    batch_id, status = store.get_or_create_raw_event_flush_batch(
-        opencode_session_id=opencode_session_id,
-        start_event_seq=start_event_seq,
-        end_event_seq=last_event_seq,
-        extractor_version=EXTRACTOR_VERSION,
-    )
+    chunk_events = max_events or flush_chunk_events()
+    flushed = 0
+    updated_state = 0
+    while True:
+        result = _flush_batch(
+            writer,
+            opencode_session_id=opencode_session_id,
+            cwd=cwd,
+            project=project,
+            started_at=started_at,
+            limit=chunk_events,
+        )
+        flushed += result["flushed"]
+        updated_state = max(updated_state, result["updated_state"])
+        if max_events is not None or not result["more"]:
+            return {"flushed": flushed, "updated_state": updated_state}
+
+
+def _flush_batch(
+    writer: RawEventFlushWriter,
+    *,
+    opencode_session_id: str,
+    cwd: str,
+    project: str | None,
+    started_at: str | None,
+    limit: int,
+) -> dict[str, int]:
+    extracted = writer.extract_pending(opencode_session_id, limit=limit)
+    if not extracted.event_count:
+        caught_up = writer.catch_up(opencode_session_id)
+        return {"flushed": 0, "updated_state": int(caught_up), "more": 0}
+
+    start_event_seq = extracted.start_event_seq
+    last_event_seq = extracted.end_event_seq
+    if start_event_seq is None or last_event_seq is None:
+        return {"flushed": 0, "updated_state": 0, "more": 0}
+    more = int(extracted.event_count >= limit)
+
+    batch_id, status = writer.open_batch(opencode_session_id, start_event_seq, last_event_seq)
     if status == "completed":
-        store.update_raw_event_flush_state(opencode_session_id, last_event_seq)
-        return {"flushed": 0, "updated_state": 1}
+        writer.advance(opencode_session_id, last_event_seq)
+        return {"flushed": 0, "updated_state": 1, "more": more}
 
-    if not store.claim_raw_event_flush_batch(batch_id):
-        return {"flushed": 0, "updated_state": 0}
-    session_context = build_session_context(events)
+    if not writer.claim_batch(batch_id):
+        return {"flushed": 0, "updated_state": 0, "more": 0}
+    session_context = extracted.session_context()
     session_context["opencode_session_id"] = opencode_session_id
     session_context["start_event_seq"] = start_event_seq
     session_context["end_event_seq"] = last_event_seq
@@ -144,14 +164,13 @@ def flush_raw_events(
         "cwd": cwd,
         "project": project,
         "started_at": started_at or dt.datetime.now(dt.UTC).isoformat(),
-        "events": events,
         "session_context": session_context,
     }
     try:
-        ingest(payload)
+        ingest(payload, store=writer.store, extracted=extracted)
     except Exception:
-        store.update_raw_event_flush_batch_status(batch_id, RAW_EVENT_QUEUE_FAILED)
+        writer.finish_batch(batch_id, RAW_EVENT_QUEUE_FAILED)
         raise
-    store.update_raw_event_flush_batch_status(batch_id, "completed")
-    store.update_raw_event_flush_state(opencode_session_id, last_event_seq)
-    return {"flushed": len(events), "updated_state": 1}
+    writer.finish_batch(batch_id, "completed")
+    writer.advance(opencode_session_id, last_event_seq)
+    return {"flushed": extracted.event_count, "updated_state": 1, "more": more}
@@ -3,10 +3,10 @@ from __future__ import annotations
 import hashlib
 import os
 import re
+import threading
+from collections import OrderedDict
 from collections.abc import Iterable
 
-import sqlite_vec
-
 
 class _FastEmbedClient:
     def __init__(self, model: str) -> None:
@@ -24,12 +24,20 @@ class _FastEmbedClient:
 
 _CLIENT: _FastEmbedClient | None = None
 
+QUERY_EMBEDDING_CACHE_SIZE = 256
+_QUERY_CACHE: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+_QUERY_CACHE_LOCK = threading.Lock()
+
+
+def embeddings_disabled() -> bool:
+    return os.getenv("CODEMEM_EMBEDDING_DISABLED", "").lower() in {"1", "true", "yes"}
+
 
 def get_embedding_client() -> _FastEmbedClient | None:
     global _CLIENT
     if _CLIENT is not None:
         return _CLIENT
-    if os.getenv("CODEMEM_EMBEDDING_DISABLED", "").lower() in {"1", "true", "yes"}:
+    if embeddings_disabled():
         return None
     model = os.getenv("CODEMEM_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
     try:
@@ -39,12 +47,56 @@ def get_embedding_client() -> _FastEmbedClient | None:
     return _CLIENT
 
 
+def _serialize_vector(vector: Iterable[float]) -> bytes:
+    import sqlite_vec
+
+    return sqlite_vec.serialize_float32(list(vector))
+
+
 def embed_texts(texts: Iterable[str]) -> list[bytes]:
     client = get_embedding_client()
     if not client:
         return []
     embeddings = client.embed(texts)
-    return [sqlite_vec.serialize_float32(list(vector)) for vector in embeddings]
+    return [_serialize_vector(vector) for vector in embeddings]
+
+
+def _normalize_query_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def embed_query(text: str) -> bytes | None:
+    """Embed a search query, reusing cached vectors keyed by (model, normalized text)."""
+    normalized = _normalize_query_text(text)
+    if not normalized:
+        return None
+    client = get_embedding_client()
+    if not client:
+        return None
+    # Clients without a model name (e.g. test doubles) get a per-instance key so their
+    # vectors never answer for another client.
+    model = getattr(client, "model", None)
+    key = (str(model) if model else f"client-{id(client)}", normalized)
+    with _QUERY_CACHE_LOCK:
+        cached = _QUERY_CACHE.get(key)
+        if cached is not None:
+            _QUERY_CACHE.move_to_end(key)
+            return cached
+    embeddings = client.embed([normalized])
+    if not embeddings:
+        return None
+    vector = _serialize_vector(embeddings[0])
+    with _QUERY_CACHE_LOCK:
+        _QUERY_CACHE[key] = vector
+        _QUERY_CACHE.move_to_end(key)
+        while len(_QUERY_CACHE) > QUERY_EMBEDDING_CACHE_SIZE:
+            _QUERY_CACHE.popitem(last=False)
+    return vector
+
+
+def clear_query_cache() -> None:
+    with _QUERY_CACHE_LOCK:
+        _QUERY_CACHE.clear()
 
 
 def chunk_text(text: str, max_chars: int = 1200) -> list[str]:
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from ..semantic import chunk_text, embed_texts, get_embedding_client, hash_text
 from ._store import MemoryStore
-from .types import MemoryResult, ReplicationClock, ReplicationOp
+from .types import MemoryRecord, MemoryResult, ReplicationClock, ReplicationOp
 
 __all__ = [
+    "MemoryRecord",
     "MemoryResult",
     "MemoryStore",
     "ReplicationClock",
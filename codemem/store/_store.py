@@ -4,9 +4,13 @@ import datetime as dt
 import hashlib
 import math
 import os
-from collections.abc import Iterable, Sequence
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, cast
 from uuid import uuid4
 
 from .. import db
@@ -21,15 +25,56 @@ from . import tags as store_tags
 from . import usage as store_usage
 from . import utils as store_utils
 from . import vectors as store_vectors
-from .types import MemoryResult, ReplicationClock, ReplicationOp
+from .types import (
+    MEMORY_RECORD_COLUMNS,
+    MemoryRecord,
+    MemoryResult,
+    ReplicationClock,
+    ReplicationOp,
+)
+
+_MEMORY_RECORD_SELECT = ", ".join(f"memory_items.{name}" for name in MEMORY_RECORD_COLUMNS)
+
+
+class _DeferredCommitConnection:
+    """Connection wrapper used inside MemoryStore.batch().
+
+    Store helpers call ``conn.commit()`` or use ``with conn:`` after each write; inside a
+    batch both become no-ops so the whole unit of work commits (or rolls back) once.
+    ``rollback()`` raises instead of discarding the whole batch behind its owner's back:
+    raise out of the ``batch()`` block to abort it.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def commit(self) -> None:
+        return None
+
+    def rollback(self) -> None:
+        raise RuntimeError("rollback() inside MemoryStore.batch(); raise to abort the batch")
+
+    def __enter__(self) -> _DeferredCommitConnection:
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, tb: object) -> bool:
+        return False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
 
 
 class MemoryStore:
     RECALL_RECENCY_DAYS = 180
     TASK_RECENCY_DAYS = 365
     FUZZY_CANDIDATE_LIMIT = 200
-    FUZZY_MIN_SCORE = 0.18
+    FUZZY_MIN_SCORE = 0.3
+    FUZZY_MAX_MATCH_TRIGRAMS = 12
     SEMANTIC_CANDIDATE_LIMIT = 200
+    HYBRID_CANDIDATE_MULTIPLIER = 4
+    USAGE_FLUSH_MAX_EVENTS = 64
+    USAGE_FLUSH_INTERVAL_S = 5.0
+    USAGE_PENDING_MAX = 4096
     STOPWORDS = {
         "a",
         "an",
@@ -88,10 +133,23 @@ class MemoryStore:
         db_path: Path | str = db.DEFAULT_DB_PATH,
         *,
         check_same_thread: bool = True,
+        role: str = "writer",
     ):
         self.db_path = Path(db_path).expanduser()
-        self.conn = db.connect(self.db_path, check_same_thread=check_same_thread)
-        db.initialize_schema(self.conn)
+        # batch() state is per thread so a store shared across threads (viewer pool writer,
+        # sweeper flush workers) never hands one thread's deferred connection to another.
+        self._batch_state = threading.local()
+        self._batch_lock = threading.RLock()
+        self.conn = db.connect(self.db_path, check_same_thread=check_same_thread, role=role)
+        db.initialize_schema(self.conn, self.db_path)
+        self._usage_lock = threading.Lock()
+        self._usage_pending: list[tuple[Any, ...]] = []
+        self._usage_last_flush = time.monotonic()
+        # Only stores shared across threads can be flushed from a timer thread; the rest
+        # flush when the buffer fills, when the interval has passed, or on close().
+        self._usage_timer_enabled = not check_same_thread
+        self._usage_timer: threading.Timer | None = None
+        self._usage_closed = False
         self.device_id = os.getenv("CODEMEM_DEVICE_ID", "")
         if not self.device_id:
             row = self.conn.execute("SELECT device_id FROM sync_device LIMIT 1").fetchone()
@@ -101,6 +159,10 @@ class MemoryStore:
         self._hybrid_retrieval_enabled = bool(cfg.hybrid_retrieval_enabled)
         self._hybrid_retrieval_shadow_log = bool(cfg.hybrid_retrieval_shadow_log)
         self._hybrid_retrieval_shadow_sample_rate = float(cfg.hybrid_retrieval_shadow_sample_rate)
+        self._hybrid_retrieval_fusion = str(cfg.hybrid_retrieval_fusion or "rrf").strip().lower()
+        self._hybrid_retrieval_rrf_k = max(1, int(cfg.hybrid_retrieval_rrf_k))
+        self._hybrid_retrieval_fts_weight = float(cfg.hybrid_retrieval_fts_weight)
+        self._hybrid_retrieval_vector_weight = float(cfg.hybrid_retrieval_vector_weight)
         self._sync_projects_include = [
             p.strip() for p in cfg.sync_projects_include if p and p.strip()
         ]
@@ -153,6 +215,61 @@ class MemoryStore:
             "last_ok_at": row["last_ok_at"],
         }
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        deferred = getattr(self._batch_state, "conn", None)
+        return cast(sqlite3.Connection, deferred) if deferred is not None else self._conn
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection) -> None:
+        self._conn = value
+
+    @property
+    def write_lock(self) -> threading.RLock:
+        """Lock held by ``batch()``; threads sharing this store take it around their writes."""
+        return self._batch_lock
+
+    @contextmanager
+    def batch(self) -> Iterator[MemoryStore]:
+        """Run a unit of work in one transaction: commit once on success, roll back on error.
+
+        Nested batches join the outermost one. Only the calling thread sees the deferred
+        connection; the batch holds the store's write lock, which ``flush_usage`` also
+        takes, so another thread sharing the store cannot commit half of it. Work queued
+        with ``after_commit`` runs once the batch has committed and released the lock.
+        """
+        if getattr(self._batch_state, "conn", None) is not None:
+            yield self
+            return
+        with self._batch_lock:
+            conn = self._conn
+            if conn.in_transaction:
+                conn.commit()
+            self._batch_state.conn = _DeferredCommitConnection(conn)
+            self._batch_state.after_commit = []
+            try:
+                yield self
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._batch_state.conn = None
+                callbacks, self._batch_state.after_commit = self._batch_state.after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` after the current batch commits, or now outside a batch.
+
+        Callbacks of a batch that rolls back are dropped.
+        """
+        if getattr(self._batch_state, "conn", None) is None:
+            callback()
+            return
+        self._batch_state.after_commit.append(callback)
+
     def set_sync_daemon_error(self, error: str, traceback_text: str) -> None:
         now = self._now_iso()
         self.conn.execute(
@@ -268,34 +385,11 @@ class MemoryStore:
         return store_maintenance.backfill_discovery_tokens(self, limit_sessions=limit_sessions)
 
     def work_investment_tokens_sum(self, project: str | None = None) -> int:
-        join = ""
-        where = ""
-        params: list[Any] = []
-        if project:
-            clause, clause_params = self._project_clause(project)
-            if clause:
-                join = " JOIN sessions ON sessions.id = memory_items.session_id"
-                where = f" WHERE {clause}"
-                params.extend(clause_params)
+        join, where, params = self._discovery_rollup_filter(project)
         row = self.conn.execute(
             f"""
-            SELECT
-                COALESCE(
-                    SUM(
-                        COALESCE(
-                            CASE
-                                WHEN json_valid(memory_items.metadata_json) = 1
-                                THEN CAST(
-                                    json_extract(memory_items.metadata_json, '$.discovery_tokens') AS INTEGER
-                                )
-                                ELSE 0
-                            END,
-                            0
-                        )
-                    ),
-                    0
-                ) AS total
-            FROM memory_items{join}{where}
+            SELECT COALESCE(SUM(memory_discovery_totals.tokens), 0) AS total
+            FROM memory_discovery_totals{join}{where}
             """,
             (*params,),
         ).fetchone()
@@ -306,56 +400,39 @@ class MemoryStore:
     def work_investment_tokens(self, project: str | None = None) -> int:
         """Additive work investment from unique discovery_group values."""
 
-        join = ""
-        where_project = ""
-        params: list[Any] = []
-        if project:
-            clause, clause_params = self._project_clause(project)
-            if clause:
-                join = " JOIN sessions ON sessions.id = memory_items.session_id"
-                where_project = f" AND {clause}"
-                params.extend(clause_params)
-
-        group_rows = self.conn.execute(
+        join, where, params = self._discovery_rollup_filter(project)
+        grouped_row = self.conn.execute(
             f"""
-            SELECT
-                json_extract(memory_items.metadata_json, '$.discovery_group') AS grp,
-                MAX(
-                    COALESCE(
-                        CAST(json_extract(memory_items.metadata_json, '$.discovery_tokens') AS INTEGER),
-                        0
-                    )
-                ) AS tokens
-            FROM memory_items{join}
-            WHERE json_valid(memory_items.metadata_json) = 1
-              AND json_extract(memory_items.metadata_json, '$.discovery_group') IS NOT NULL{where_project}
-            GROUP BY json_extract(memory_items.metadata_json, '$.discovery_group')
+            SELECT COALESCE(SUM(tokens), 0) AS tokens
+            FROM (
+                SELECT MAX(memory_discovery_groups.tokens) AS tokens
+                FROM memory_discovery_groups{join}{where}
+                GROUP BY memory_discovery_groups.discovery_group
+            )
             """,
             (*params,),
-        ).fetchall()
-        grouped_total = sum(int(row["tokens"] or 0) for row in group_rows)
+        ).fetchone()
+        grouped_total = int(grouped_row["tokens"] or 0) if grouped_row else 0
 
         ungrouped_row = self.conn.execute(
             f"""
-            SELECT
-                COALESCE(
-                    SUM(
-                        COALESCE(
-                            CAST(json_extract(memory_items.metadata_json, '$.discovery_tokens') AS INTEGER),
-                            0
-                        )
-                    ),
-                    0
-                ) AS tokens
-            FROM memory_items{join}
-            WHERE json_valid(memory_items.metadata_json) = 1
-              AND json_extract(memory_items.metadata_json, '$.discovery_group') IS NULL{where_project}
+            SELECT COALESCE(SUM(memory_discovery_totals.ungrouped_tokens), 0) AS tokens
+            FROM memory_discovery_totals{join}{where}
             """,
             (*params,),
         ).fetchone()
         ungrouped_total = int(ungrouped_row["tokens"] or 0) if ungrouped_row else 0
         return grouped_total + ungrouped_total
 
+    def _discovery_rollup_filter(self, project: str | None) -> tuple[str, str, list[Any]]:
+        """Join/where fragments restricting the discovery rollups (keyed by session) to a project."""
+        if not project:
+            return "", "", []
+        clause, params = self._project_key_clause("sessions.project_key", project)
+        if not clause:
+            return "", "", []
+        return " JOIN sessions ON sessions.id = session_id", f" WHERE {clause}", params
+
     def _ensure_session_for_replication(
         self, session_id: int | None, started_at: str | None, *, project: str | None = None
     ) -> int | None:
@@ -454,14 +531,16 @@ class MemoryStore:
         cur = self.conn.execute(
             """
             INSERT INTO sessions(
-                started_at, cwd, project, git_remote, git_branch, user, tool_version, metadata_json, import_key
+                started_at, cwd, project, project_key, git_remote, git_branch, user, tool_version,
+                metadata_json, import_key
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 now,
                 cwd,
                 project,
+                store_utils.session_project_key(project),
                 git_remote,
                 git_branch,
                 user,
@@ -621,6 +700,20 @@ class MemoryStore:
             limit=limit,
         )
 
+    def iter_raw_events_since_by_seq(
+        self,
+        *,
+        opencode_session_id: str,
+        after_event_seq: int,
+        limit: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        return store_raw_events.iter_raw_events_since_by_seq(
+            self.conn,
+            opencode_session_id=opencode_session_id,
+            after_event_seq=after_event_seq,
+            limit=limit,
+        )
+
     def raw_event_sessions_pending_idle_flush(
         self,
         *,
@@ -636,12 +729,26 @@ class MemoryStore:
     def raw_event_sessions_with_pending_queue(self, *, limit: int = 25) -> list[str]:
         return store_raw_events.raw_event_sessions_with_pending_queue(self.conn, limit=limit)
 
+    def catch_up_raw_event_flush_state(self, opencode_session_id: str) -> bool:
+        return store_raw_events.catch_up_raw_event_flush_state(self.conn, opencode_session_id)
+
     def purge_raw_events_before(self, cutoff_ts_wall_ms: int) -> int:
         return store_raw_events.purge_raw_events_before(self.conn, cutoff_ts_wall_ms)
 
     def purge_raw_events(self, max_age_ms: int) -> int:
         return store_raw_events.purge_raw_events(self.conn, max_age_ms)
 
+    def prune_raw_events(
+        self,
+        max_age_ms: int,
+        *,
+        batch_rows: int = store_raw_events.RAW_EVENT_PURGE_BATCH_ROWS,
+        vacuum_pages: int = 0,
+    ) -> dict[str, int]:
+        return store_raw_events.prune_raw_events(
+            self.conn, max_age_ms, batch_rows=batch_rows, vacuum_pages=vacuum_pages
+        )
+
     def raw_event_backlog(self, *, limit: int = 25) -> list[dict[str, Any]]:
         return store_raw_events.raw_event_backlog(self.conn, limit=limit)
 
@@ -796,9 +903,11 @@ class MemoryStore:
                 user_prompt_id,
                 deleted_at,
                 rev,
-                import_key
+                import_key,
+                created_at_epoch,
+                project_key
             )
-            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER), (SELECT project_key FROM sessions WHERE id = ?))
             """,
             (
                 session_id,
@@ -814,6 +923,8 @@ class MemoryStore:
                 None,
                 1,
                 import_key,
+                created_at,
+                session_id,
             ),
         )
         self.conn.commit()
@@ -821,7 +932,7 @@ class MemoryStore:
         if lastrowid is None:
             raise RuntimeError("Failed to create memory item")
         memory_id = int(lastrowid)
-        self._store_vectors(memory_id, title, body_text)
+        self._index_memory_vectors(memory_id, title, body_text)
         self._record_memory_item_op(memory_id, "upsert")
         return memory_id
 
@@ -909,9 +1020,11 @@ class MemoryStore:
                 user_prompt_id,
                 deleted_at,
                 rev,
-                import_key
+                import_key,
+                created_at_epoch,
+                project_key
             )
-            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER), (SELECT project_key FROM sessions WHERE id = ?))
             """,
             (
                 session_id,
@@ -934,6 +1047,8 @@ class MemoryStore:
                 None,
                 1,
                 import_key,
+                created_at,
+                session_id,
             ),
         )
         self.conn.commit()
@@ -941,7 +1056,7 @@ class MemoryStore:
         if lastrowid is None:
             raise RuntimeError("Failed to create observation")
         memory_id = int(lastrowid)
-        self._store_vectors(memory_id, title, narrative)
+        self._index_memory_vectors(memory_id, title, narrative)
         self._record_memory_item_op(memory_id, "upsert")
         return memory_id
 
@@ -972,6 +1087,8 @@ class MemoryStore:
         active_only: bool = True,
         dry_run: bool = False,
         memory_ids: list[int] | None = None,
+        batch_size: int = store_vectors.BACKFILL_EMBED_BATCH_SIZE,
+        progress: Callable[[dict[str, int]], None] | None = None,
     ) -> dict[str, int]:
         return store_vectors.backfill_vectors(
             self,
@@ -981,8 +1098,24 @@ class MemoryStore:
             memory_ids=memory_ids,
             active_only=active_only,
             dry_run=dry_run,
+            batch_size=batch_size,
+            progress=progress,
         )
 
+    def enqueue_vector_index(self, memory_ids: list[int]) -> int:
+        return store_vectors.enqueue_vector_index(self, memory_ids)
+
+    def refresh_vector_metadata(self) -> int:
+        return store_vectors.refresh_vector_metadata(self)
+
+    def index_pending_vectors(
+        self, limit: int = store_vectors.VECTOR_INDEX_BATCH_LIMIT
+    ) -> dict[str, int]:
+        return store_vectors.index_pending_vectors(self, limit=limit)
+
+    def vector_index_status(self) -> dict[str, Any]:
+        return store_vectors.vector_index_status(self)
+
     def add_user_prompt(
         self,
         session_id: int,
@@ -1165,6 +1298,11 @@ class MemoryStore:
             dry_run=dry_run,
         )
 
+    def maintain_database(
+        self, *, fts_mode: str = "merge", checkpoint: bool = True
+    ) -> list[dict[str, Any]]:
+        return store_maintenance.maintain_database(self, fts_mode=fts_mode, checkpoint=checkpoint)
+
     def forget(self, memory_id: int) -> None:
         row = self.conn.execute(
             "SELECT rev, metadata_json FROM memory_items WHERE id = ?",
@@ -1187,6 +1325,17 @@ class MemoryStore:
         self.conn.commit()
         self._record_memory_item_op(memory_id, "delete")
 
+    def _fetch_records(self, clause: str, params: Sequence[Any]) -> list[MemoryRecord]:
+        """Run ``SELECT <MEMORY_RECORD_COLUMNS> FROM memory_items <clause>`` as MemoryRecords.
+
+        Rows come back as plain tuples and go straight into the record, skipping the
+        sqlite3.Row step and leaving ``metadata_json`` undecoded until someone reads it.
+        """
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT {_MEMORY_RECORD_SELECT} FROM memory_items {clause}", params)
+        return [MemoryRecord(zip(MEMORY_RECORD_COLUMNS, row, strict=True)) for row in cursor]
+
     def get(self, memory_id: int) -> dict[str, Any] | None:
         row = self.conn.execute(
             "SELECT * FROM memory_items WHERE id = ?",
@@ -1201,18 +1350,23 @@ class MemoryStore:
         self.record_usage("get", tokens_read=tokens_read, metadata={"found": True})
         return data
 
-    def get_many(self, ids: Iterable[int]) -> list[dict[str, Any]]:
+    def get_many(self, ids: Iterable[int], *, records: bool = False) -> list[dict[str, Any]]:
         id_list = [int(mid) for mid in ids]
         if not id_list:
             return []
         placeholders = ",".join("?" for _ in id_list)
-        rows = self.conn.execute(
-            f"SELECT * FROM memory_items WHERE id IN ({placeholders})",
-            id_list,
-        ).fetchall()
-        results = db.rows_to_dicts(rows)
-        for item in results:
-            item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        if records:
+            results: list[dict[str, Any]] = list(
+                self._fetch_records(f"WHERE id IN ({placeholders})", id_list)
+            )
+        else:
+            rows = self.conn.execute(
+                f"SELECT * FROM memory_items WHERE id IN ({placeholders})",
+                id_list,
+            ).fetchall()
+            results = db.rows_to_dicts(rows)
+            for item in results:
+                item["metadata_json"] = db.from_json(item.get("metadata_json"))
         tokens_read = sum(
             self.estimate_tokens(f"{item.get('title', '')} {item.get('body_text', '')}")
             for item in results
@@ -1225,12 +1379,16 @@ class MemoryStore:
         return results
 
     def recent(
-        self, limit: int = 10, filters: dict[str, Any] | None = None
+        self,
+        limit: int = 10,
+        filters: dict[str, Any] | None = None,
+        log_usage: bool = True,
+        *,
+        records: bool = False,
     ) -> list[dict[str, Any]]:
         filters = filters or {}
         params: list[Any] = []
         where = ["active = 1"]
-        join_sessions = False
         if filters.get("kind"):
             where.append("kind = ?")
             params.append(filters["kind"])
@@ -1239,18 +1397,23 @@ class MemoryStore:
             if clause:
                 where.append(clause)
                 params.extend(clause_params)
-            join_sessions = True
         where_clause = " AND ".join(where)
-        from_clause = "memory_items"
-        if join_sessions:
-            from_clause = "memory_items JOIN sessions ON sessions.id = memory_items.session_id"
-        rows = self.conn.execute(
-            f"SELECT memory_items.* FROM {from_clause} WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
-            (*params, limit),
-        ).fetchall()
-        results = db.rows_to_dicts(rows)
-        for item in results:
-            item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        if records:
+            results: list[dict[str, Any]] = list(
+                self._fetch_records(
+                    f"WHERE {where_clause} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+                )
+            )
+        else:
+            rows = self.conn.execute(
+                f"SELECT memory_items.* FROM memory_items WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            results = db.rows_to_dicts(rows)
+            for item in results:
+                item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        if not log_usage:
+            return results
         tokens_read = sum(
             self.estimate_tokens(f"{item.get('title', '')} {item.get('body_text', '')}")
             for item in results
@@ -1272,6 +1435,9 @@ class MemoryStore:
         kinds: Iterable[str],
         limit: int = 10,
         filters: dict[str, Any] | None = None,
+        log_usage: bool = True,
+        *,
+        records: bool = False,
     ) -> list[dict[str, Any]]:
         filters = filters or {}
         kinds_list = [str(kind) for kind in kinds if kind]
@@ -1282,24 +1448,28 @@ class MemoryStore:
             "active = 1",
             "kind IN ({})".format(", ".join("?" for _ in kinds_list)),
         ]
-        join_sessions = False
         if filters.get("project"):
             clause, clause_params = self._project_clause(filters["project"])
             if clause:
                 where.append(clause)
                 params.extend(clause_params)
-            join_sessions = True
         where_clause = " AND ".join(where)
-        from_clause = "memory_items"
-        if join_sessions:
-            from_clause = "memory_items JOIN sessions ON sessions.id = memory_items.session_id"
-        rows = self.conn.execute(
-            f"SELECT memory_items.* FROM {from_clause} WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
-            (*params, limit),
-        ).fetchall()
-        results = db.rows_to_dicts(rows)
-        for item in results:
-            item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        if records:
+            results: list[dict[str, Any]] = list(
+                self._fetch_records(
+                    f"WHERE {where_clause} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+                )
+            )
+        else:
+            rows = self.conn.execute(
+                f"SELECT memory_items.* FROM memory_items WHERE {where_clause} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            results = db.rows_to_dicts(rows)
+            for item in results:
+                item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        if not log_usage:
+            return results
         tokens_read = sum(
             self.estimate_tokens(f"{item.get('title', '')} {item.get('body_text', '')}")
             for item in results
@@ -1344,6 +1514,9 @@ class MemoryStore:
     def _project_column_clause(self, column_expr: str, project: str) -> tuple[str, list[Any]]:
         return store_utils.project_column_clause(column_expr, project)
 
+    def _project_key_clause(self, column_expr: str, project: str) -> tuple[str, list[Any]]:
+        return store_utils.project_key_clause(column_expr, project)
+
     def _project_clause(self, project: str) -> tuple[str, list[Any]]:
         return store_utils.project_clause(project)
 
@@ -1425,6 +1598,9 @@ class MemoryStore:
     def _store_vectors(self, memory_id: int, title: str, body_text: str) -> None:
         store_vectors._store_vectors(self, memory_id, title, body_text)
 
+    def _index_memory_vectors(self, memory_id: int, title: str, body_text: str) -> None:
+        store_vectors.index_memory_vectors(self, memory_id, title, body_text)
+
     def _prioritize_task_results(
         self, results: list[dict[str, Any]], limit: int
     ) -> list[dict[str, Any]]:
@@ -1449,8 +1625,11 @@ class MemoryStore:
         query: str,
         limit: int,
         filters: dict[str, Any] | None,
+        vector_results: list[dict[str, Any]] | None = None,
     ) -> list[MemoryResult]:
-        return store_search._merge_ranked_results(self, results, query, limit, filters)
+        return store_search._merge_ranked_results(
+            self, results, query, limit, filters, vector_results=vector_results
+        )
 
     def _timeline_around(
         self,
@@ -1458,8 +1637,12 @@ class MemoryStore:
         depth_before: int,
         depth_after: int,
         filters: dict[str, Any] | None,
+        *,
+        records: bool = False,
     ) -> list[dict[str, Any]]:
-        return store_search._timeline_around(self, anchor, depth_before, depth_after, filters)
+        return store_search._timeline_around(
+            self, anchor, depth_before, depth_after, filters, records=records
+        )
 
     def search(
         self,
@@ -1467,8 +1650,11 @@ class MemoryStore:
         limit: int = 10,
         filters: dict[str, Any] | None = None,
         log_usage: bool = True,
+        hybrid: bool | None = None,
     ) -> list[MemoryResult]:
-        return store_search.search(self, query, limit=limit, filters=filters, log_usage=log_usage)
+        return store_search.search(
+            self, query, limit=limit, filters=filters, log_usage=log_usage, hybrid=hybrid
+        )
 
     def build_memory_pack(
         self,
@@ -1552,7 +1738,10 @@ class MemoryStore:
             )
 
     def close(self) -> None:
-        self.conn.close()
+        store_usage.close_usage(self)
+        # A timer flush that already took the write lock finishes before the close.
+        with self._batch_lock:
+            self.conn.close()
 
     @staticmethod
     def estimate_tokens(text: str) -> int:
@@ -1566,8 +1755,8 @@ class MemoryStore:
         tokens_written: int = 0,
         tokens_saved: int = 0,
         metadata: dict[str, Any] | None = None,
-    ) -> int:
-        return store_usage.record_usage(
+    ) -> None:
+        store_usage.record_usage(
             self,
             event,
             session_id=session_id,
@@ -1577,6 +1766,9 @@ class MemoryStore:
             metadata=metadata,
         )
 
+    def flush_usage(self) -> int:
+        return store_usage.flush_usage(self)
+
     def usage_summary(self, project: str | None = None) -> list[dict[str, Any]]:
         return store_usage.usage_summary(self, project=project)
 
@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import datetime as dt
 import json
-from collections.abc import Iterable
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from .. import db
 from ..summarizer import is_low_signal_observation
 from . import tags as store_tags
+from . import usage as store_usage
+from . import utils as store_utils
+from . import vectors as store_vectors
 
 if TYPE_CHECKING:
     from ._store import MemoryStore
@@ -236,7 +242,7 @@ def backfill_discovery_tokens(store: MemoryStore, *, limit_sessions: int = 50) -
             session_tokens = _session_discovery_tokens_from_transcript(store, session_id)
 
         group_tokens: dict[int | None, int] = {}
-        keys = sorted(grouped.keys(), key=lambda k: (-1 if k is None else k))
+        keys = sorted(grouped.keys(), key=lambda k: -1 if k is None else k)
         if by_prompt:
             assigned = 0
             for key in keys:
@@ -323,7 +329,6 @@ def backfill_tags_text(
 ) -> dict[str, int]:
     params: list[Any] = []
     where_clauses = ["(memory_items.tags_text IS NULL OR TRIM(memory_items.tags_text) = '')"]
-    join_sessions = False
     if active_only:
         where_clauses.append("memory_items.active = 1")
     if since:
@@ -334,13 +339,11 @@ def backfill_tags_text(
         if clause:
             where_clauses.append(clause)
             params.extend(clause_params)
-        join_sessions = True
     if memory_ids:
         placeholders = ",".join(["?"] * len(memory_ids))
         where_clauses.append(f"memory_items.id IN ({placeholders})")
         params.extend(int(memory_id) for memory_id in memory_ids)
     where = " AND ".join(where_clauses)
-    join_clause = "JOIN sessions ON sessions.id = memory_items.session_id" if join_sessions else ""
     limit_clause = "LIMIT ?" if limit else ""
     if limit:
         params.append(limit)
@@ -354,7 +357,6 @@ def backfill_tags_text(
                memory_items.files_read,
                memory_items.files_modified
         FROM memory_items
-        {join_clause}
         WHERE {where}
         ORDER BY memory_items.created_at ASC
         {limit_clause}
@@ -477,6 +479,7 @@ def normalize_projects(store: MemoryStore, *, dry_run: bool = True) -> dict[str,
     inconsistent project identifiers.
     """
 
+    store.flush_usage()
     session_rows = store.conn.execute(
         "SELECT id, cwd, project FROM sessions ORDER BY started_at DESC"
     ).fetchall()
@@ -569,20 +572,17 @@ def normalize_projects(store: MemoryStore, *, dry_run: bool = True) -> dict[str,
 
     for project, session_id in session_updates:
         store.conn.execute(
-            "UPDATE sessions SET project = ? WHERE id = ?",
-            (project, session_id),
+            "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+            (project, store_utils.session_project_key(project), session_id),
         )
     for project, opencode_session_id in raw_updates:
         store.conn.execute(
             "UPDATE raw_event_sessions SET project = ? WHERE opencode_session_id = ?",
             (project, opencode_session_id),
         )
-    for metadata_json, usage_id in usage_updates:
-        store.conn.execute(
-            "UPDATE usage_events SET metadata_json = ? WHERE id = ?",
-            (metadata_json, usage_id),
-        )
+    store_usage.update_usage_metadata(store, usage_updates)
     store.conn.commit()
+    store_vectors.refresh_vector_metadata(store)
     return preview
 
 
@@ -635,6 +635,7 @@ def rename_project(
     ).fetchall()
 
     # Usage events can embed a project filter directly in metadata_json and may have no session_id.
+    store.flush_usage()
     usage_rows = store.conn.execute("SELECT id, metadata_json FROM usage_events").fetchall()
     usage_updates: list[tuple[str, int]] = []
     for row in usage_rows:
@@ -663,17 +664,148 @@ def rename_project(
     with store.conn:
         for row in session_rows:
             store.conn.execute(
-                "UPDATE sessions SET project = ? WHERE id = ?",
-                (new_basename, int(row["id"])),
+                "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+                (new_basename, store_utils.session_project_key(new_basename), int(row["id"])),
             )
         for row in raw_rows:
             store.conn.execute(
                 "UPDATE raw_event_sessions SET project = ? WHERE opencode_session_id = ?",
                 (new_basename, str(row["opencode_session_id"])),
             )
-        for metadata_json, usage_id in usage_updates:
-            store.conn.execute(
-                "UPDATE usage_events SET metadata_json = ? WHERE id = ?",
-                (metadata_json, usage_id),
-            )
+        store_usage.update_usage_metadata(store, usage_updates)
+    store_vectors.refresh_vector_metadata(store)
     return preview
+
+
+FTS_TABLES = ("memory_fts", "memory_trigram")
+FTS_MERGE_PAGES = 500
+FTS_MODES = ("merge", "optimize")
+
+
+def _fts_segment_count(store: MemoryStore, table: str) -> int | None:
+    try:
+        row = store.conn.execute(f"SELECT COUNT(DISTINCT segid) FROM {table}_idx").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return int(row[0]) if row else 0
+
+
+def _wal_bytes(store: MemoryStore) -> int:
+    wal = Path(f"{store.db_path}-wal")
+    try:
+        return wal.stat().st_size
+    except OSError:
+        return 0
+
+
+def _timed_step(
+    name: str, run: Callable[[], Any], measure: Callable[[], int | None] | None = None
+) -> dict[str, Any]:
+    before = measure() if measure else None
+    started = time.perf_counter()
+    result = run()
+    step: dict[str, Any] = {"step": name, "seconds": time.perf_counter() - started}
+    if measure:
+        step["before"] = before
+        step["after"] = measure()
+    if result is not None:
+        step["result"] = result
+    return step
+
+
+def maintain_database(
+    store: MemoryStore, *, fts_mode: str = "merge", checkpoint: bool = True
+) -> list[dict[str, Any]]:
+    """Compact FTS indexes, refresh planner statistics and truncate the WAL.
+
+    ``fts_mode="merge"`` does a bounded incremental merge (cheap enough for the sweeper);
+    ``"optimize"`` rewrites each index into a single segment. Returns one timed entry per
+    step; FTS steps report segment counts and the checkpoint reports WAL bytes before/after.
+    """
+    if fts_mode not in FTS_MODES:
+        raise ValueError(f"fts_mode must be one of {FTS_MODES}, got {fts_mode!r}")
+    conn = store.conn
+    steps: list[dict[str, Any]] = []
+    for table in FTS_TABLES:
+        if _fts_segment_count(store, table) is None:
+            continue
+
+        def compact(table: str = table) -> None:
+            if fts_mode == "optimize":
+                conn.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+            else:
+                conn.execute(
+                    f"INSERT INTO {table}({table}, rank) VALUES('merge', ?)", (FTS_MERGE_PAGES,)
+                )
+            conn.commit()
+
+        steps.append(
+            _timed_step(
+                f"fts_{fts_mode}:{table}",
+                compact,
+                lambda table=table: _fts_segment_count(store, table),
+            )
+        )
+
+    def run_optimize() -> None:
+        conn.execute("PRAGMA optimize")
+
+    steps.append(_timed_step("optimize", run_optimize))
+    if checkpoint:
+
+        def truncate_wal() -> dict[str, int]:
+            row = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            return {"busy": int(row[0]), "log_frames": int(row[1]), "checkpointed": int(row[2])}
+
+        steps.append(_timed_step("wal_checkpoint", truncate_wal, lambda: _wal_bytes(store)))
+    return steps
+
+
+# Read probes timed by benchmark_connection_profile: the shapes of the viewer list and
+# search endpoints.
+PROFILE_PROBES = {
+    "recent": (
+        "SELECT id, title, created_at FROM memory_items WHERE active = 1 "
+        "ORDER BY created_at_epoch DESC LIMIT 200"
+    ),
+    "fts": "SELECT rowid FROM memory_fts WHERE memory_fts MATCH 'the OR code OR fix' LIMIT 200",
+    "raw_event_count": "SELECT COUNT(*) FROM raw_events",
+}
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Seconds for the fastest of ``repeat`` calls to ``fn``, after one untimed warm-up."""
+    fn()
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _time_probes(conn: sqlite3.Connection, repeat: int) -> dict[str, float]:
+    return {
+        name: _best_of(lambda sql=sql: conn.execute(sql).fetchall(), repeat)
+        for name, sql in PROFILE_PROBES.items()
+    }
+
+
+def benchmark_connection_profile(
+    db_path: Path | str, role: str, *, repeat: int = 3
+) -> dict[str, Any]:
+    """Time the read probes on a default connection and on one with the ``role`` profile.
+
+    Each side gets its own connection, one warm-up run per probe, and the best of ``repeat``.
+    """
+    results: dict[str, Any] = {"role": role}
+    for label, profile in (("before", None), ("after", role)):
+        conn = db.connect(db_path, role=profile)
+        try:
+            results[label] = {
+                "settings": db.connection_settings(conn),
+                "seconds": _time_probes(conn, repeat),
+            }
+        finally:
+            conn.close()
+    return results
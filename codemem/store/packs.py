@@ -5,6 +5,7 @@ from collections.abc import Sequence
 from typing import TYPE_CHECKING, Any
 
 from .. import db
+from .types import MemoryRecord
 
 if TYPE_CHECKING:
     from ._store import MemoryStore
@@ -12,6 +13,8 @@ if TYPE_CHECKING:
 
 
 def _get_metadata(item: MemoryResult | dict[str, Any]) -> dict[str, Any]:
+    if isinstance(item, MemoryRecord):
+        return item.metadata
     if not isinstance(item, dict):
         return item.metadata or {}
     metadata = item.get("metadata_json")
@@ -179,7 +182,8 @@ def build_memory_pack(
     telemetry_sources = {"semantic": 0, "fts": 0, "fuzzy": 0, "timeline": 0}
     telemetry_candidates = {"semantic": 0, "fts": 0, "fuzzy": 0}
 
-    semantic_matches = []
+    # Embed the query and run the vector KNN once; every later stage reuses these rows.
+    semantic_matches: list[dict[str, Any]] = []
     try:
         semantic_matches = store._semantic_search(context, limit=limit, filters=filters)
         telemetry_candidates["semantic"] = len(semantic_matches)
@@ -188,7 +192,7 @@ def build_memory_pack(
 
     if store._query_looks_like_tasks(context):
         matches = store.search(
-            store._task_query_hint(), limit=limit, filters=filters, log_usage=False
+            store._task_query_hint(), limit=limit, filters=filters, log_usage=False, hybrid=False
         )
         telemetry_candidates["fts"] = len(matches)
 
@@ -227,6 +231,7 @@ def build_memory_pack(
             limit=limit,
             filters=recall_filters,
             log_usage=False,
+            hybrid=False,
         )
         telemetry_candidates["fts"] = len(matches)
         matches = list(matches)
@@ -251,13 +256,16 @@ def build_memory_pack(
         if matches:
             depth_before = max(0, limit // 2)
             depth_after = max(0, limit - depth_before - 1)
-            timeline = store._timeline_around(matches[0], depth_before, depth_after, filters)
+            timeline = store._timeline_around(
+                matches[0], depth_before, depth_after, filters, records=True
+            )
             if timeline:
                 matches = timeline
                 telemetry_sources["timeline"] = len(timeline)
 
     else:
-        matches = store.search(context, limit=limit, filters=filters, log_usage=False)
+        # Keyword-only here: the vector rows above are fused in by _merge_ranked_results.
+        matches = store.search(context, limit=limit, filters=filters, log_usage=False, hybrid=False)
         telemetry_candidates["fts"] = len(matches)
         matches = list(matches)
 
@@ -275,7 +283,9 @@ def build_memory_pack(
     semantic_candidates = len(semantic_matches)
 
     if merge_results:
-        matches = store._merge_ranked_results(matches, context, limit, filters)
+        matches = store._merge_ranked_results(
+            matches, context, limit, filters, vector_results=semantic_matches
+        )
 
     summary_candidates = [m for m in matches if _item_kind(m) == "session_summary"]
     summary_item: MemoryResult | dict[str, Any] | None = None
@@ -284,7 +294,9 @@ def build_memory_pack(
     else:
         summary_filters = dict(filters or {})
         summary_filters["kind"] = "session_summary"
-        recent_summary = _normalize_items(store.recent(limit=1, filters=summary_filters))
+        recent_summary = _normalize_items(
+            store.recent(limit=1, filters=summary_filters, log_usage=False, records=True)
+        )
         if recent_summary:
             summary_item = recent_summary[0]
 
@@ -292,7 +304,9 @@ def build_memory_pack(
     if not timeline_candidates:
         timeline_candidates = [
             m
-            for m in _normalize_items(store.recent(limit=limit, filters=filters))
+            for m in _normalize_items(
+                store.recent(limit=limit, filters=filters, log_usage=False, records=True)
+            )
             if _item_kind(m) != "session_summary"
         ]
     if not merge_results:
@@ -316,6 +330,8 @@ def build_memory_pack(
                 observation_kinds,
                 limit=max(limit * 3, 10),
                 filters=filters,
+                log_usage=False,
+                records=True,
             )
         )
     if not observation_candidates:
@@ -475,7 +491,7 @@ def build_memory_pack(
         work_source_label = "estimate"
     semantic_hits = 0
     if merge_results:
-        semantic_ids = {item.get("id") for item in store._semantic_search(context, limit, filters)}
+        semantic_ids = {item.get("id") for item in semantic_matches}
         for item in formatted:
             if item.get("id") in semantic_ids:
                 semantic_hits += 1
@@ -3,6 +3,7 @@ from __future__ import annotations
 import datetime as dt
 import sqlite3
 import time
+from collections.abc import Iterator
 from typing import Any
 
 from .. import db
@@ -215,7 +216,7 @@ def record_raw_event(
             event_type,
             ts_wall_ms,
             ts_mono_ms,
-            db.to_json(payload),
+            db.to_json_compact(payload),
             created_at,
         ),
     )
@@ -292,17 +293,16 @@ def record_raw_events_batch(
             skipped = skipped_invalid + skipped_duplicate + skipped_conflict
             return {"inserted": 0, "skipped": skipped}
 
-        existing_ids: set[str] = set()
-        chunk_size = 500
-        for i in range(0, len(normalized), chunk_size):
-            chunk = normalized[i : i + chunk_size]
-            placeholders = ",".join("?" for _ in chunk)
-            rows = conn.execute(
-                f"SELECT event_id FROM raw_events WHERE opencode_session_id = ? AND event_id IN ({placeholders})",
-                [opencode_session_id, *[e["event_id"] for e in chunk]],
-            ).fetchall()
-            for row in rows:
-                existing_ids.add(str(row["event_id"]))
+        # One statement regardless of batch size, so sqlite3's statement cache reuses it.
+        rows = conn.execute(
+            """
+            SELECT event_id FROM raw_events
+            WHERE opencode_session_id = ?
+              AND event_id IN (SELECT value FROM json_each(?))
+            """,
+            (opencode_session_id, db.to_json_compact([e["event_id"] for e in normalized])),
+        ).fetchall()
+        existing_ids = {str(row["event_id"]) for row in rows}
 
         new_events = [event for event in normalized if event["event_id"] not in existing_ids]
         skipped_duplicate += len(normalized) - len(new_events)
@@ -332,37 +332,39 @@ def record_raw_events_batch(
         end_seq = int(row["last_received_event_seq"])
         start_seq = end_seq - len(new_events) + 1
 
-        for offset, event in enumerate(new_events):
-            try:
-                conn.execute(
-                    """
-                    INSERT INTO raw_events(
-                        opencode_session_id,
-                        event_id,
-                        event_seq,
-                        event_type,
-                        ts_wall_ms,
-                        ts_mono_ms,
-                        payload_json,
-                        created_at
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        opencode_session_id,
-                        event["event_id"],
-                        start_seq + offset,
-                        event["event_type"],
-                        event["ts_wall_ms"],
-                        event["ts_mono_ms"],
-                        db.to_json(event["payload"]),
-                        now,
-                    ),
+        # raw_events has no triggers, so the total_changes delta is exactly the rows inserted.
+        changes_before = conn.total_changes
+        conn.executemany(
+            """
+            INSERT INTO raw_events(
+                opencode_session_id,
+                event_id,
+                event_seq,
+                event_type,
+                ts_wall_ms,
+                ts_mono_ms,
+                payload_json,
+                created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+            """,
+            [
+                (
+                    opencode_session_id,
+                    event["event_id"],
+                    start_seq + offset,
+                    event["event_type"],
+                    event["ts_wall_ms"],
+                    event["ts_mono_ms"],
+                    db.to_json_compact(event["payload"]),
+                    now,
                 )
-            except sqlite3.IntegrityError:
-                skipped_conflict += 1
-                continue
-            inserted += 1
+                for offset, event in enumerate(new_events)
+            ],
+        )
+        inserted = conn.total_changes - changes_before
+        skipped_conflict += len(new_events) - inserted
         _update_raw_event_ingest_stats(
             conn,
             inserted_events=inserted,
@@ -656,11 +658,29 @@ def raw_events_since_by_seq(
     after_event_seq: int,
     limit: int | None = None,
 ) -> list[dict[str, Any]]:
+    return list(
+        iter_raw_events_since_by_seq(
+            conn,
+            opencode_session_id=opencode_session_id,
+            after_event_seq=after_event_seq,
+            limit=limit,
+        )
+    )
+
+
+def iter_raw_events_since_by_seq(
+    conn: sqlite3.Connection,
+    *,
+    opencode_session_id: str,
+    after_event_seq: int,
+    limit: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield events after ``after_event_seq`` one row at a time, decoding payloads lazily."""
     limit_clause = "LIMIT ?" if limit else ""
     params: list[Any] = [opencode_session_id, after_event_seq]
     if limit:
         params.append(limit)
-    rows = conn.execute(
+    cursor = conn.execute(
         f"""
         SELECT event_seq, event_type, ts_wall_ms, ts_mono_ms, payload_json, event_id
         FROM raw_events
@@ -669,9 +689,8 @@ def raw_events_since_by_seq(
         {limit_clause}
         """,
         params,
-    ).fetchall()
-    results: list[dict[str, Any]] = []
-    for row in rows:
+    )
+    for row in cursor:
         payload = db.from_json(row["payload_json"])
         if not isinstance(payload, dict):
             payload = {}
@@ -680,8 +699,7 @@ def raw_events_since_by_seq(
         payload["timestamp_mono_ms"] = row["ts_mono_ms"]
         payload["event_seq"] = row["event_seq"]
         payload["event_id"] = row["event_id"]
-        results.append(payload)
-    return results
+        yield payload
 
 
 def raw_event_sessions_pending_idle_flush(
@@ -690,20 +708,16 @@ def raw_event_sessions_pending_idle_flush(
     idle_before_ts_wall_ms: int,
     limit: int = 25,
 ) -> list[str]:
+    # Served by idx_raw_event_sessions_pending: cost follows the number of sessions with
+    # unflushed events, not the size of raw_events.
     rows = conn.execute(
         """
-        WITH max_events AS (
-            SELECT opencode_session_id, MAX(event_seq) AS max_seq
-            FROM raw_events
-            GROUP BY opencode_session_id
-        )
-        SELECT s.opencode_session_id
-        FROM raw_event_sessions s
-        JOIN max_events e ON e.opencode_session_id = s.opencode_session_id
-        WHERE s.last_seen_ts_wall_ms IS NOT NULL
-          AND s.last_seen_ts_wall_ms <= ?
-          AND e.max_seq > s.last_flushed_event_seq
-        ORDER BY s.last_seen_ts_wall_ms ASC
+        SELECT opencode_session_id
+        FROM raw_event_sessions
+        WHERE last_received_event_seq > last_flushed_event_seq
+          AND last_seen_ts_wall_ms IS NOT NULL
+          AND last_seen_ts_wall_ms <= ?
+        ORDER BY last_seen_ts_wall_ms ASC
         LIMIT ?
         """,
         (idle_before_ts_wall_ms, limit),
@@ -725,17 +739,11 @@ def raw_event_sessions_with_pending_queue(
             FROM raw_event_flush_batches b
             WHERE b.status IN ('pending', 'failed', 'started', 'error')
             GROUP BY b.opencode_session_id
-        ),
-        max_events AS (
-            SELECT opencode_session_id, MAX(event_seq) AS max_seq
-            FROM raw_events
-            GROUP BY opencode_session_id
         )
         SELECT b.opencode_session_id
         FROM pending_batches b
-        JOIN max_events e ON e.opencode_session_id = b.opencode_session_id
-        LEFT JOIN raw_event_sessions s ON s.opencode_session_id = b.opencode_session_id
-        WHERE e.max_seq > COALESCE(s.last_flushed_event_seq, -1)
+        JOIN raw_event_sessions s ON s.opencode_session_id = b.opencode_session_id
+        WHERE s.last_received_event_seq > s.last_flushed_event_seq
         ORDER BY b.oldest_pending_update ASC
         LIMIT ?
         """,
@@ -744,36 +752,183 @@ def raw_event_sessions_with_pending_queue(
     return [str(row["opencode_session_id"]) for row in rows if row["opencode_session_id"]]
 
 
-def purge_raw_events_before(conn: sqlite3.Connection, cutoff_ts_wall_ms: int) -> int:
+def catch_up_raw_event_flush_state(conn: sqlite3.Connection, opencode_session_id: str) -> bool:
+    """Mark a session flushed up to its received counter when no event is left to flush.
+
+    Covers seqs that never produced a row (an insert lost to a conflict) or whose rows
+    were purged before flushing; otherwise the session would stay pending forever.
+    One statement, so an event committed meanwhile keeps the session pending.
+    """
+    now = dt.datetime.now(dt.UTC).isoformat()
+    cur = conn.execute(
+        """
+        UPDATE raw_event_sessions
+        SET last_flushed_event_seq = last_received_event_seq, updated_at = ?
+        WHERE opencode_session_id = ?
+          AND last_received_event_seq > last_flushed_event_seq
+          AND NOT EXISTS (
+            SELECT 1 FROM raw_events r
+            WHERE r.opencode_session_id = raw_event_sessions.opencode_session_id
+              AND r.event_seq > raw_event_sessions.last_flushed_event_seq
+          )
+        """,
+        (now, opencode_session_id),
+    )
+    conn.commit()
+    return bool(cur.rowcount)
+
+
+RAW_EVENT_PURGE_BATCH_ROWS = 5000
+
+
+def _delete_in_batches(
+    conn: sqlite3.Connection, table: str, where: str, params: tuple[Any, ...], batch_rows: int
+) -> int:
+    # One short transaction per batch, so plugin ingest can write between batches.
+    removed = 0
+    while True:
+        cur = conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+            (*params, batch_rows),
+        )
+        conn.commit()
+        count = int(cur.rowcount or 0)
+        removed += count
+        if count < batch_rows:
+            return removed
+
+
+def _page_stats(conn: sqlite3.Connection) -> tuple[int, int]:
+    page_count = int(conn.execute("PRAGMA page_count").fetchone()[0])
+    freelist_count = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+    return page_count, freelist_count
+
+
+_PRUNE_REPORT_KEYS = (
+    "raw_events",
+    "ingest_samples",
+    "flush_batches",
+    "sessions",
+    "freed_pages",
+    "vacuumed_pages",
+    "page_count",
+    "freelist_count",
+    "auto_vacuum",
+)
+
+
+def prune_raw_events_before(
+    conn: sqlite3.Connection,
+    cutoff_ts_wall_ms: int,
+    *,
+    batch_rows: int = RAW_EVENT_PURGE_BATCH_ROWS,
+    vacuum_pages: int = 0,
+) -> dict[str, int]:
+    """Delete raw events older than the cutoff and the bookkeeping they leave behind.
+
+    Events go in batches of ``batch_rows`` per transaction via the ``ts_wall_ms`` index.
+    Completed flush batches whose events are all gone, and sessions with no events left
+    that were last seen and updated before the cutoff (with their flush batches), are removed too.
+    ``vacuum_pages > 0`` returns up to that many free pages to the filesystem when the
+    database uses ``auto_vacuum=INCREMENTAL``; otherwise freed pages stay on the freelist
+    for reuse. The report counts deleted rows and pages freed/vacuumed.
+    """
+    batch_rows = max(1, int(batch_rows))
     cutoff_iso = dt.datetime.fromtimestamp(cutoff_ts_wall_ms / 1000.0, tz=dt.UTC).isoformat()
-    conn.execute(
-        "DELETE FROM raw_event_ingest_samples WHERE created_at < ?",
-        (cutoff_iso,),
+    pages_before, freelist_before = _page_stats(conn)
+    samples = _delete_in_batches(
+        conn, "raw_event_ingest_samples", "created_at < ?", (cutoff_iso,), batch_rows
     )
-    cur = conn.execute(
-        "DELETE FROM raw_events WHERE ts_wall_ms IS NOT NULL AND ts_wall_ms < ?",
+    events = _delete_in_batches(
+        conn,
+        "raw_events",
+        "ts_wall_ms IS NOT NULL AND ts_wall_ms < ?",
         (cutoff_ts_wall_ms,),
+        batch_rows,
     )
-    conn.commit()
-    return int(cur.rowcount or 0)
+    sessions = _delete_in_batches(
+        conn,
+        "raw_event_sessions",
+        """
+        COALESCE(last_seen_ts_wall_ms, 0) < ?
+        AND updated_at < ?
+        AND NOT EXISTS (
+          SELECT 1 FROM raw_events r
+          WHERE r.opencode_session_id = raw_event_sessions.opencode_session_id
+        )
+        """,
+        (cutoff_ts_wall_ms, cutoff_iso),
+        batch_rows,
+    )
+    # A removed session restarts event_seq at 0, so none of its old batch rows may survive
+    # to match a new range as already completed.
+    flush_batches = _delete_in_batches(
+        conn,
+        "raw_event_flush_batches",
+        """
+        NOT EXISTS (
+          SELECT 1 FROM raw_event_sessions s
+          WHERE s.opencode_session_id = raw_event_flush_batches.opencode_session_id
+        )
+        OR (
+          status = ?
+          AND NOT EXISTS (
+            SELECT 1 FROM raw_events r
+            WHERE r.opencode_session_id = raw_event_flush_batches.opencode_session_id
+              AND r.event_seq BETWEEN raw_event_flush_batches.start_event_seq
+                AND raw_event_flush_batches.end_event_seq
+          )
+        )
+        """,
+        (RAW_EVENT_QUEUE_COMPLETED,),
+        batch_rows,
+    )
+    pages_after_delete, freelist_after_delete = _page_stats(conn)
+    auto_vacuum = int(conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+    if vacuum_pages > 0 and auto_vacuum == 2:
+        conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+        if conn.in_transaction:
+            conn.commit()
+    pages_after, freelist_after = _page_stats(conn)
+    return {
+        "raw_events": events,
+        "ingest_samples": samples,
+        "flush_batches": flush_batches,
+        "sessions": sessions,
+        "freed_pages": max(0, freelist_after_delete - freelist_before)
+        + max(0, pages_before - pages_after_delete),
+        "vacuumed_pages": max(0, pages_after_delete - pages_after),
+        "page_count": pages_after,
+        "freelist_count": freelist_after,
+        "auto_vacuum": auto_vacuum,
+    }
+
+
+def purge_raw_events_before(conn: sqlite3.Connection, cutoff_ts_wall_ms: int) -> int:
+    return prune_raw_events_before(conn, cutoff_ts_wall_ms)["raw_events"]
 
 
 def purge_raw_events(conn: sqlite3.Connection, max_age_ms: int) -> int:
+    return prune_raw_events(conn, max_age_ms)["raw_events"]
+
+
+def prune_raw_events(
+    conn: sqlite3.Connection,
+    max_age_ms: int,
+    *,
+    batch_rows: int = RAW_EVENT_PURGE_BATCH_ROWS,
+    vacuum_pages: int = 0,
+) -> dict[str, int]:
     if max_age_ms <= 0:
-        return 0
+        return dict.fromkeys(_PRUNE_REPORT_KEYS, 0)
     now_ms = int(time.time() * 1000)
     cutoff = now_ms - max_age_ms
-    return purge_raw_events_before(conn, cutoff)
+    return prune_raw_events_before(conn, cutoff, batch_rows=batch_rows, vacuum_pages=vacuum_pages)
 
 
 def raw_event_backlog(conn: sqlite3.Connection, *, limit: int = 25) -> list[dict[str, Any]]:
     rows = conn.execute(
         """
-        WITH max_events AS (
-            SELECT opencode_session_id, MAX(event_seq) AS max_seq
-            FROM raw_events
-            GROUP BY opencode_session_id
-        )
         SELECT
           s.opencode_session_id,
           s.project,
@@ -781,11 +936,10 @@ def raw_event_backlog(conn: sqlite3.Connection, *, limit: int = 25) -> list[dict
           s.started_at,
           s.last_seen_ts_wall_ms,
           s.last_flushed_event_seq,
-          e.max_seq,
-          (e.max_seq - s.last_flushed_event_seq) AS pending
+          s.last_received_event_seq AS max_seq,
+          (s.last_received_event_seq - s.last_flushed_event_seq) AS pending
         FROM raw_event_sessions s
-        JOIN max_events e ON e.opencode_session_id = s.opencode_session_id
-        WHERE e.max_seq > s.last_flushed_event_seq
+        WHERE s.last_received_event_seq > s.last_flushed_event_seq
         ORDER BY s.last_seen_ts_wall_ms DESC
         LIMIT ?
         """,
@@ -797,17 +951,11 @@ def raw_event_backlog(conn: sqlite3.Connection, *, limit: int = 25) -> list[dict
 def raw_event_backlog_totals(conn: sqlite3.Connection) -> dict[str, int]:
     row = conn.execute(
         """
-        WITH max_events AS (
-            SELECT opencode_session_id, MAX(event_seq) AS max_seq
-            FROM raw_events
-            GROUP BY opencode_session_id
-        )
         SELECT
           COUNT(1) AS sessions,
-          SUM(e.max_seq - s.last_flushed_event_seq) AS pending
+          SUM(s.last_received_event_seq - s.last_flushed_event_seq) AS pending
         FROM raw_event_sessions s
-        JOIN max_events e ON e.opencode_session_id = s.opencode_session_id
-        WHERE e.max_seq > s.last_flushed_event_seq
+        WHERE s.last_received_event_seq > s.last_flushed_event_seq
         """
     ).fetchone()
     if row is None:
@@ -461,7 +461,8 @@ def repair_legacy_import_keys(
                 SET session_id = ?, kind = ?, title = ?, body_text = ?, confidence = ?, tags_text = ?,
                     active = ?, created_at = ?, updated_at = ?, metadata_json = ?, subtitle = ?, facts = ?,
                     narrative = ?, concepts = ?, files_read = ?, files_modified = ?, prompt_number = ?,
-                    deleted_at = ?, rev = ?
+                    deleted_at = ?, rev = ?, created_at_epoch = CAST(strftime('%s', ?) AS INTEGER),
+                    project_key = (SELECT project_key FROM sessions WHERE id = ?)
                 WHERE id = ?
                 """,
                 (
@@ -484,6 +485,8 @@ def repair_legacy_import_keys(
                     old_row.get("prompt_number"),
                     old_row.get("deleted_at"),
                     max(int(new_row.get("rev") or 0), int(old_row.get("rev") or 0)) + 1,
+                    str(old_row.get("created_at") or now),
+                    int(old_row.get("session_id") or 0),
                     canonical_id,
                 ),
             )
@@ -780,14 +783,14 @@ def _ensure_session_for_replication(
         # Backfill project on existing sessions that lack one.
         if project and (not row["project"] or not str(row["project"]).strip()):
             store.conn.execute(
-                "UPDATE sessions SET project = ? WHERE id = ?",
-                (project, session_id),
+                "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+                (project, store_utils.session_project_key(project), session_id),
             )
         return session_id
     created_at = started_at or store._now_iso()
     store.conn.execute(
-        "INSERT INTO sessions(id, started_at, project) VALUES (?, ?, ?)",
-        (session_id, created_at, project),
+        "INSERT INTO sessions(id, started_at, project, project_key) VALUES (?, ?, ?, ?)",
+        (session_id, created_at, project, store_utils.session_project_key(project)),
     )
     return session_id
 
@@ -807,8 +810,8 @@ def _ensure_session_for_replication_by_import_key(
         session_id = int(row["id"])
         if project and (not row["project"] or not str(row["project"]).strip()):
             store.conn.execute(
-                "UPDATE sessions SET project = ? WHERE id = ?",
-                (project, session_id),
+                "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+                (project, store_utils.session_project_key(project), session_id),
             )
         return session_id
     created_at = started_at or store._now_iso()
@@ -818,6 +821,7 @@ def _ensure_session_for_replication_by_import_key(
             started_at,
             cwd,
             project,
+            project_key,
             git_remote,
             git_branch,
             user,
@@ -825,11 +829,12 @@ def _ensure_session_for_replication_by_import_key(
             metadata_json,
             import_key
         )
-        VALUES (?, NULL, ?, NULL, NULL, 'sync', 'sync_replication', ?, ?)
+        VALUES (?, NULL, ?, ?, NULL, NULL, 'sync', 'sync_replication', ?, ?)
         """,
         (
             created_at,
             project,
+            store_utils.session_project_key(project),
             db.to_json({"source": "sync", "session_import_key": session_import_key}),
             session_import_key,
         ),
@@ -1257,11 +1262,13 @@ def _apply_memory_item_upsert(store: MemoryStore, op: ReplicationOp) -> str:
                 user_prompt_id,
                 import_key,
                 deleted_at,
-                rev
+                rev,
+                created_at_epoch,
+                project_key
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER), (SELECT project_key FROM sessions WHERE id = ?))
             """,
-            values,
+            (*values, created_at, resolved_session_id),
         )
         return "inserted"
     store.conn.execute(
@@ -1287,10 +1294,12 @@ def _apply_memory_item_upsert(store: MemoryStore, op: ReplicationOp) -> str:
             user_prompt_id = ?,
             import_key = ?,
             deleted_at = ?,
-            rev = ?
+            rev = ?,
+            created_at_epoch = CAST(strftime('%s', ?) AS INTEGER),
+            project_key = (SELECT project_key FROM sessions WHERE id = ?)
         WHERE import_key = ?
         """,
-        (*values, lookup_key),
+        (*values, created_at, resolved_session_id, lookup_key),
     )
     return "updated"
 
@@ -1413,9 +1422,11 @@ def _apply_memory_item_delete(store: MemoryStore, op: ReplicationOp) -> str:
                 prompt_number,
                 import_key,
                 deleted_at,
-                rev
+                rev,
+                created_at_epoch,
+                project_key
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', ?) AS INTEGER), (SELECT project_key FROM sessions WHERE id = ?))
             """,
             (
                 resolved_session_id,
@@ -1438,6 +1449,8 @@ def _apply_memory_item_delete(store: MemoryStore, op: ReplicationOp) -> str:
                 import_key,
                 deleted_at,
                 rev,
+                created_at,
+                resolved_session_id,
             ),
         )
         return "inserted"
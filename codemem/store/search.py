@@ -1,19 +1,24 @@
 from __future__ import annotations
 
 import datetime as dt
-import difflib
+import logging
 import random
 import re
+import sqlite3
+import time
 from collections.abc import Sequence
 from typing import TYPE_CHECKING, Any, cast
 
 from .. import db
-from ..semantic import embed_texts
+from ..semantic import embed_query
+from . import utils as store_utils
 from .types import MemoryResult
 
 if TYPE_CHECKING:
     from ._store import MemoryStore
 
+logger = logging.getLogger(__name__)
+
 
 def search_index(
     store: MemoryStore,
@@ -169,7 +174,7 @@ def _task_fallback_recent(
     store: MemoryStore, limit: int, filters: dict[str, Any] | None
 ) -> list[dict[str, Any]]:
     expanded_limit = max(limit * 3, limit)
-    results = store.recent(limit=expanded_limit, filters=filters)
+    results = store.recent(limit=expanded_limit, filters=filters, log_usage=False, records=True)
     return _prioritize_task_results(results, limit)
 
 
@@ -178,11 +183,11 @@ def _recall_fallback_recent(
 ) -> list[dict[str, Any]]:
     summary_filters = dict(filters or {})
     summary_filters["kind"] = "session_summary"
-    summaries = store.recent(limit=limit, filters=summary_filters)
+    summaries = store.recent(limit=limit, filters=summary_filters, log_usage=False, records=True)
     if len(summaries) >= limit:
         return summaries[:limit]
     expanded_limit = max(limit * 3, limit)
-    recent_all = store.recent(limit=expanded_limit, filters=filters)
+    recent_all = store.recent(limit=expanded_limit, filters=filters, log_usage=False, records=True)
     summary_ids = {item.get("id") for item in summaries}
     remainder = [item for item in recent_all if item.get("id") not in summary_ids]
     remainder = _prioritize_task_results(remainder, limit - len(summaries))
@@ -207,37 +212,60 @@ def _parse_created_at(value: str) -> dt.datetime | None:
     return parsed
 
 
+def _created_epoch_for(item: MemoryResult | dict[str, Any]) -> int | None:
+    """Unix seconds for an item, preferring the stored created_at_epoch column."""
+    if isinstance(item, MemoryResult):
+        epoch = item.created_at_epoch
+    else:
+        epoch = item.get("created_at_epoch")
+    if epoch is not None:
+        return int(epoch)
+    parsed = _parse_created_at(_created_at_for(item))
+    return int(parsed.timestamp()) if parsed else None
+
+
+def _recency_from_epoch(epoch: int | None, now: float) -> float:
+    if epoch is None:
+        return 0.0
+    days_ago = (now - epoch) // 86400
+    return 1.0 / (1.0 + (days_ago / 7.0))
+
+
 def _recency_score(created_at: str) -> float:
     parsed = _parse_created_at(created_at)
     if not parsed:
         return 0.0
-    days_ago = (dt.datetime.now(dt.UTC) - parsed).days
-    return 1.0 / (1.0 + (days_ago / 7.0))
+    return _recency_from_epoch(int(parsed.timestamp()), time.time())
+
+
+KIND_BONUS = {
+    "session_summary": 0.25,
+    "decision": 0.2,
+    "note": 0.15,
+    "observation": 0.1,
+    "entities": 0.05,
+}
+
+
+# Weights of normalized fused relevance and recency in the hybrid rerank score; the
+# kind bonus is added unweighted.
+HYBRID_RELEVANCE_WEIGHT = 1.2
+HYBRID_RECENCY_WEIGHT = 0.8
 
 
 def _kind_bonus(kind: str | None) -> float:
-    if kind == "session_summary":
-        return 0.25
-    if kind == "decision":
-        return 0.2
-    if kind == "note":
-        return 0.15
-    if kind == "observation":
-        return 0.1
-    if kind == "entities":
-        return 0.05
-    return 0.0
+    return KIND_BONUS.get(kind or "", 0.0)
 
 
 def _filter_recent_results(
     results: Sequence[MemoryResult | dict[str, Any]],
     days: int,
 ) -> list[MemoryResult | dict[str, Any]]:
-    cutoff = dt.datetime.now(dt.UTC) - dt.timedelta(days=days)
+    cutoff = time.time() - days * 86400
     filtered: list[MemoryResult | dict[str, Any]] = []
     for item in results:
-        created_at = _parse_created_at(_created_at_for(item))
-        if created_at and created_at >= cutoff:
+        epoch = _created_epoch_for(item)
+        if epoch is not None and epoch >= cutoff:
             filtered.append(item)
     return filtered
 
@@ -247,16 +275,95 @@ def _tokenize_query(query: str, stopwords: set[str]) -> list[str]:
     return [token for token in tokens if token not in stopwords]
 
 
+def _word_trigrams(word: str) -> frozenset[str]:
+    padded = f"  {word} "
+    return frozenset(padded[index : index + 3] for index in range(len(padded) - 2))
+
+
 def _fuzzy_score(query_tokens: list[str], query: str, text: str) -> float:
-    text_lower = text.lower()
-    if not text_lower.strip():
+    """Mean over query words of their best trigram Dice similarity to any word in text.
+
+    Scoring word against word keeps long texts from collecting partial credit for a query
+    word spread over several unrelated words; each comparison is on small trigram sets.
+    """
+    tokens = query_tokens or _tokenize_query(query, set())
+    if not tokens:
         return 0.0
-    match_tokens = set(re.findall(r"[A-Za-z0-9_]+", text_lower))
-    overlap = 0.0
-    if query_tokens:
-        overlap = len(set(query_tokens) & match_tokens) / max(len(query_tokens), 1)
-    ratio = difflib.SequenceMatcher(None, query.lower(), text_lower).ratio()
-    return max(overlap, ratio)
+    text_words = {_word_trigrams(word) for word in set(re.findall(r"[A-Za-z0-9_]+", text.lower()))}
+    if not text_words:
+        return 0.0
+    total = 0.0
+    for token in set(tokens):
+        token_trigrams = _word_trigrams(token)
+        best = 0.0
+        for word_trigrams in text_words:
+            shared = len(token_trigrams & word_trigrams)
+            if shared:
+                best = max(best, 2 * shared / (len(token_trigrams) + len(word_trigrams)))
+        total += best
+    return total / len(set(tokens))
+
+
+def _trigram_match_query(query_tokens: Sequence[str], max_trigrams: int) -> str:
+    """OR of up to ``max_trigrams`` query trigrams, taken round-robin across the words.
+
+    Every word gets represented before any word gets a second trigram, and the cap keeps
+    the MATCH from touching most of the corpus for long queries; bm25 then ranks rows by
+    how many (and how rare) trigrams they share.
+    """
+    per_token = [
+        [token[index : index + 3] for index in range(len(token) - 2)] for token in query_tokens
+    ]
+    trigrams: list[str] = []
+    for position in range(max((len(items) for items in per_token), default=0)):
+        for items in per_token:
+            if position < len(items) and items[position] not in trigrams:
+                trigrams.append(items[position])
+            if len(trigrams) >= max_trigrams:
+                break
+        if len(trigrams) >= max_trigrams:
+            break
+    return " OR ".join(f'"{trigram}"' for trigram in trigrams)
+
+
+def _fuzzy_candidates(
+    store: MemoryStore,
+    query_tokens: Sequence[str],
+    limit: int,
+    filters: dict[str, Any] | None,
+    *,
+    use_index: bool = True,
+) -> list[Any]:
+    where_clauses, params = _filter_clauses(store, filters)
+    match_query = (
+        _trigram_match_query(query_tokens, store.FUZZY_MAX_MATCH_TRIGRAMS) if use_index else ""
+    )
+    if match_query:
+        where = " AND ".join([*where_clauses, "memory_trigram MATCH ?"])
+        return store.conn.execute(
+            f"""
+            SELECT memory_items.id, memory_items.title, memory_items.body_text
+            FROM memory_trigram
+            JOIN memory_items ON memory_items.id = memory_trigram.rowid
+            WHERE {where}
+            ORDER BY bm25(memory_trigram)
+            LIMIT ?
+            """,
+            (*params, match_query, limit),
+        ).fetchall()
+    # No usable trigram match (old SQLite, short tokens, or typos inside short words):
+    # score the most recent rows instead.
+    where = " AND ".join(where_clauses)
+    return store.conn.execute(
+        f"""
+        SELECT memory_items.id, memory_items.title, memory_items.body_text
+        FROM memory_items
+        WHERE {where}
+        ORDER BY memory_items.created_at DESC
+        LIMIT ?
+        """,
+        (*params, limit),
+    ).fetchall()
 
 
 def _fuzzy_search(
@@ -269,63 +376,287 @@ def _fuzzy_search(
     if not query_tokens:
         return []
     candidate_limit = max(store.FUZZY_CANDIDATE_LIMIT, limit * 10)
-    candidates = store.recent(limit=candidate_limit, filters=filters)
-    scored: list[tuple[float, dict[str, Any]]] = []
-    for item in candidates:
-        text = f"{item.get('title', '')} {item.get('body_text', '')}"
-        score = _fuzzy_score(query_tokens, query, text)
-        if score >= store.FUZZY_MIN_SCORE:
-            scored.append((score, item))
+    scored: list[tuple[float, int]] = []
+    passes = (True, False) if db.trigram_index_available(store.conn) else (False,)
+    for use_index in passes:
+        for row in _fuzzy_candidates(
+            store, query_tokens, candidate_limit, filters, use_index=use_index
+        ):
+            text = f"{row['title'] or ''} {row['body_text'] or ''}"
+            score = _fuzzy_score(query_tokens, query, text)
+            if score >= store.FUZZY_MIN_SCORE:
+                scored.append((score, int(row["id"])))
+        if scored:
+            break
     scored.sort(key=lambda pair: pair[0], reverse=True)
-    return [item for _, item in scored[:limit]]
+    top_ids = [memory_id for _, memory_id in scored[:limit]]
+    if not top_ids:
+        return []
+    placeholders = ",".join(["?"] * len(top_ids))
+    rows = store.conn.execute(
+        f"SELECT * FROM memory_items WHERE id IN ({placeholders})", top_ids
+    ).fetchall()
+    by_id = {int(item["id"]): item for item in db.rows_to_dicts(rows)}
+    results: list[dict[str, Any]] = []
+    for memory_id in top_ids:
+        item = by_id.get(memory_id)
+        if item is None:
+            continue
+        item["metadata_json"] = db.from_json(item.get("metadata_json"))
+        results.append(item)
+    return results
 
 
-def _semantic_search(
+def _filter_clauses(
+    store: MemoryStore, filters: dict[str, Any] | None
+) -> tuple[list[str], list[Any]]:
+    where_clauses = ["memory_items.active = 1"]
+    params: list[Any] = []
+    filters = filters or {}
+    if filters.get("kind"):
+        where_clauses.append("memory_items.kind = ?")
+        params.append(filters["kind"])
+    if filters.get("session_id"):
+        where_clauses.append("memory_items.session_id = ?")
+        params.append(filters["session_id"])
+    if filters.get("since"):
+        where_clauses.append("memory_items.created_at >= ?")
+        params.append(filters["since"])
+    if filters.get("project"):
+        clause, clause_params = store._project_clause(filters["project"])
+        if clause:
+            where_clauses.append(clause)
+            params.extend(clause_params)
+    return where_clauses, params
+
+
+def _fts_candidates(
     store: MemoryStore,
     query: str,
     limit: int,
     filters: dict[str, Any] | None,
-) -> list[dict[str, Any]]:
-    if len(query.strip()) < 3:
+) -> list[tuple[int, float]]:
+    """Return (memory_id, bm25 score) for the top FTS matches without loading row bodies."""
+    expanded_query = _expand_query(query)
+    if not expanded_query:
         return []
-    embeddings = embed_texts([query])
-    if not embeddings:
+    where_clauses, filter_params = _filter_clauses(store, filters)
+    where = " AND ".join([*where_clauses, "memory_fts MATCH ?"])
+    rows = store.conn.execute(
+        f"""
+        SELECT memory_items.id, -bm25(memory_fts, 1.0, 1.0, 0.25) AS score,
+            (1.0 / (1.0 + ((strftime('%s', 'now') - memory_items.created_at_epoch) / 604800.0)))
+                AS recency
+        FROM memory_fts
+        JOIN memory_items ON memory_items.id = memory_fts.rowid
+        WHERE {where}
+        ORDER BY (score * 1.5 + recency) DESC
+        LIMIT ?
+        """,
+        (*filter_params, expanded_query, limit),
+    ).fetchall()
+    return [(int(row["id"]), float(row["score"])) for row in rows]
+
+
+# sqlite-vec rejects KNN queries with k above this.
+VECTOR_KNN_MAX_K = 4096
+# Growth factor for k when filters or chunk duplicates leave too few memories.
+VECTOR_KNN_GROWTH = 4
+
+
+def _vector_candidates(
+    store: MemoryStore,
+    query: str,
+    limit: int,
+    filters: dict[str, Any] | None,
+) -> list[tuple[int, float]]:
+    """Return (memory_id, similarity) for the nearest memories, best chunk per memory.
+
+    Project and kind filters run inside the KNN via memory_vectors metadata columns. The
+    remaining filters (active, session, since) are checked against memory_items, and k is
+    widened until ``limit`` memories survive or the index has no more matches.
+    """
+    if len(query.strip()) < 3 or limit <= 0:
         return []
-    query_embedding = embeddings[0]
-    params: list[Any] = [query_embedding, limit]
-    where_clauses = ["memory_items.active = 1"]
-    join_sessions = False
-    if filters:
-        if filters.get("kind"):
-            where_clauses.append("memory_items.kind = ?")
-            params.append(filters["kind"])
-        if filters.get("session_id"):
-            where_clauses.append("memory_items.session_id = ?")
-            params.append(filters["session_id"])
-        if filters.get("since"):
-            where_clauses.append("memory_items.created_at >= ?")
-            params.append(filters["since"])
-        if filters.get("project"):
-            clause, clause_params = store._project_clause(filters["project"])
-            if clause:
-                where_clauses.append(clause)
-                params.extend(clause_params)
-            join_sessions = True
+    query_embedding = embed_query(query)
+    if not query_embedding:
+        return []
+    filters = filters or {}
+    knn_clauses: list[str] = []
+    knn_params: list[Any] = []
+    if filters.get("project"):
+        key = store_utils.project_key(str(filters["project"]))
+        if key:
+            knn_clauses.append("project_key = ?")
+            knn_params.append(key)
+    if filters.get("kind"):
+        knn_clauses.append("kind = ?")
+        knn_params.append(filters["kind"])
+    knn_where = "".join(f" AND {clause}" for clause in knn_clauses)
+    where_clauses, filter_params = _filter_clauses(store, filters)
     where = " AND ".join(where_clauses)
-    join_clause = "JOIN sessions ON sessions.id = memory_items.session_id" if join_sessions else ""
-    sql = f"""
-        SELECT memory_items.*, memory_vectors.distance
-        FROM memory_vectors
-        JOIN memory_items ON memory_items.id = memory_vectors.memory_id
-        {join_clause}
-        WHERE memory_vectors.embedding MATCH ?
-          AND k = ?
-          AND {where}
-        ORDER BY memory_vectors.distance ASC
+
+    k = min(max(limit, 1) * 2, VECTOR_KNN_MAX_K)
+    while True:
+        rows = store.conn.execute(
+            f"""
+            SELECT memory_id, distance
+            FROM memory_vectors
+            WHERE embedding MATCH ? AND k = ?{knn_where}
+            ORDER BY distance ASC
+            """,
+            (query_embedding, k, *knn_params),
+        ).fetchall()
+        best: dict[int, float] = {}
+        for row in rows:
+            best.setdefault(int(row["memory_id"]), float(row["distance"]))
+        allowed: set[int] = set()
+        if best:
+            placeholders = ",".join(["?"] * len(best))
+            allowed = {
+                int(row["id"])
+                for row in store.conn.execute(
+                    f"SELECT id FROM memory_items WHERE id IN ({placeholders}) AND {where}",
+                    (*best, *filter_params),
+                ).fetchall()
+            }
+        candidates = [
+            (memory_id, 1.0 / (1.0 + distance))
+            for memory_id, distance in best.items()
+            if memory_id in allowed
+        ]
+        exhausted = len(rows) < k
+        if len(candidates) >= limit or exhausted or k >= VECTOR_KNN_MAX_K:
+            return candidates[:limit]
+        k = min(k * VECTOR_KNN_GROWTH, VECTOR_KNN_MAX_K)
+
+
+def _fuse_candidates(
+    sources: Sequence[tuple[Sequence[tuple[int, float]], float]],
+    *,
+    mode: str = "rrf",
+    rrf_k: int = 60,
+) -> list[tuple[int, float]]:
+    """Fuse ranked (memory_id, score) lists, each paired with a source weight.
+
+    ``rrf`` sums ``weight / (rrf_k + rank)`` and ignores raw scores, which are not comparable
+    across bm25 and vector distance. ``weighted`` sums ``weight * score`` after min-max
+    normalizing each source's scores to [0, 1].
     """
-    rows = store.conn.execute(sql, params).fetchall()
+    fused: dict[int, float] = {}
+    for candidates, weight in sources:
+        if not candidates or weight <= 0:
+            continue
+        if mode == "weighted":
+            scores = [score for _, score in candidates]
+            low, high = min(scores), max(scores)
+            span = high - low
+            for memory_id, score in candidates:
+                normalized = (score - low) / span if span > 0 else 1.0
+                fused[memory_id] = fused.get(memory_id, 0.0) + weight * normalized
+            continue
+        for rank, (memory_id, _) in enumerate(candidates, start=1):
+            fused[memory_id] = fused.get(memory_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def _hydrate_rows(store: MemoryStore, memory_ids: Sequence[int]) -> dict[int, Any]:
+    if not memory_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(memory_ids))
+    rows = store.conn.execute(
+        f"""
+        SELECT id, kind, title, body_text, confidence, tags_text, metadata_json,
+            created_at, created_at_epoch, updated_at, session_id
+        FROM memory_items
+        WHERE id IN ({placeholders})
+        """,
+        list(memory_ids),
+    ).fetchall()
+    return {int(row["id"]): row for row in rows}
+
+
+def _hydrate_results(
+    store: MemoryStore, scored_ids: Sequence[tuple[int, float]]
+) -> list[MemoryResult]:
+    rows_by_id = _hydrate_rows(store, [memory_id for memory_id, _ in scored_ids])
+    results: list[MemoryResult] = []
+    for memory_id, score in scored_ids:
+        row = rows_by_id.get(memory_id)
+        if row is None:
+            continue
+        results.append(
+            MemoryResult(
+                id=row["id"],
+                kind=row["kind"],
+                title=row["title"],
+                body_text=row["body_text"],
+                confidence=row["confidence"],
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                tags_text=row["tags_text"],
+                score=float(score),
+                session_id=row["session_id"],
+                metadata=db.from_json(row["metadata_json"]),
+                created_at_epoch=row["created_at_epoch"],
+            )
+        )
+    return results
+
+
+def _vector_search_unavailable(exc: Exception) -> bool:
+    """True when the vector path failed because embeddings are not set up here.
+
+    That is sqlite-vec not being importable or loaded, or no memory_vectors table; hybrid
+    search then quietly degrades to FTS-only. Anything else is logged.
+    """
+    if isinstance(exc, ImportError):
+        return True
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return "memory_vectors" in message or "vec0" in message
+
+
+def hybrid_search(
+    store: MemoryStore,
+    query: str,
+    limit: int = 10,
+    filters: dict[str, Any] | None = None,
+) -> list[MemoryResult]:
+    """Fuse FTS and vector candidate pools, then load only the final page of rows."""
+    pool_size = max(limit, limit * store.HYBRID_CANDIDATE_MULTIPLIER)
+    fts = _fts_candidates(store, query, pool_size, filters)
+    try:
+        vectors = _vector_candidates(store, query, pool_size, filters)
+    except Exception as exc:
+        if not _vector_search_unavailable(exc):
+            logger.exception("hybrid search vector lookup failed; using FTS results only")
+        vectors = []
+    fused = _fuse_candidates(
+        [
+            (fts, store._hybrid_retrieval_fts_weight),
+            (vectors, store._hybrid_retrieval_vector_weight),
+        ],
+        mode=store._hybrid_retrieval_fusion,
+        rrf_k=store._hybrid_retrieval_rrf_k,
+    )
+    return _hydrate_results(store, fused[:limit])
+
+
+def _semantic_search(
+    store: MemoryStore,
+    query: str,
+    limit: int,
+    filters: dict[str, Any] | None,
+) -> list[dict[str, Any]]:
+    candidates = _vector_candidates(store, query, limit, filters)
+    rows_by_id = _hydrate_rows(store, [memory_id for memory_id, _ in candidates])
     results = []
-    for row in rows:
+    for memory_id, score in candidates:
+        row = rows_by_id.get(memory_id)
+        if row is None:
+            continue
         results.append(
             {
                 "id": row["id"],
@@ -336,9 +667,10 @@ def _semantic_search(
                 "tags_text": row["tags_text"],
                 "metadata_json": row["metadata_json"],
                 "created_at": row["created_at"],
+                "created_at_epoch": row["created_at_epoch"],
                 "updated_at": row["updated_at"],
                 "session_id": row["session_id"],
-                "score": 1.0 / (1.0 + float(row["distance"])),
+                "score": score,
             }
         )
     return results
@@ -396,35 +728,61 @@ def _rerank_results(
         if recent_results:
             results = cast(list[MemoryResult], list(recent_results))
 
+    now = time.time()
+
     def score(item: MemoryResult) -> float:
-        return (item.score * 1.5) + _recency_score(item.created_at) + _kind_bonus(item.kind)
+        recency = _recency_from_epoch(_created_epoch_for(item), now)
+        return (item.score * 1.5) + recency + _kind_bonus(item.kind)
 
     ordered = sorted(results, key=score, reverse=True)
     return ordered[:limit]
 
 
 def _rerank_results_hybrid(
+    store: MemoryStore,
     results: list[MemoryResult],
     *,
     limit: int,
-    semantic_ids: set[int],
+    fts_ids: set[int],
+    vector_results: Sequence[dict[str, Any]],
     recency_days: int | None = None,
 ) -> list[MemoryResult]:
     if recency_days:
         recent_results = _filter_recent_results(results, recency_days)
         if recent_results:
             results = cast(list[MemoryResult], list(recent_results))
+    by_id = {item.id: item for item in results}
+    keyword_ranked = [(item.id, item.score) for item in results if item.id in fts_ids]
+    vector_ranked = [
+        (int(item["id"]), float(item.get("score") or 0.0))
+        for item in vector_results
+        if item.get("id") in by_id
+    ]
+    fused = dict(
+        _fuse_candidates(
+            [
+                (keyword_ranked, store._hybrid_retrieval_fts_weight),
+                (vector_ranked, store._hybrid_retrieval_vector_weight),
+            ],
+            mode=store._hybrid_retrieval_fusion,
+            rrf_k=store._hybrid_retrieval_rrf_k,
+        )
+    )
+
+    now = time.time()
+    # Fused scores are on the fusion mode's scale (tiny for RRF); normalize to [0, 1] so
+    # they weigh against recency and kind the way relevance does in the keyword rerank.
+    top = max(fused.values(), default=0.0) or 1.0
 
     def score(item: MemoryResult) -> float:
-        semantic_boost = 0.35 if item.id in semantic_ids else 0.0
+        recency = _recency_from_epoch(_created_epoch_for(item), now)
         return (
-            (item.score * 1.2)
-            + (_recency_score(item.created_at) * 0.8)
+            (fused.get(item.id, 0.0) / top) * HYBRID_RELEVANCE_WEIGHT
+            + recency * HYBRID_RECENCY_WEIGHT
             + _kind_bonus(item.kind)
-            + semantic_boost
         )
 
-    ordered = sorted(results, key=score, reverse=True)
+    ordered = sorted(by_id.values(), key=score, reverse=True)
     return ordered[:limit]
 
 
@@ -486,22 +844,23 @@ def _merge_ranked_results(
     query: str,
     limit: int,
     filters: dict[str, Any] | None,
+    vector_results: list[dict[str, Any]] | None = None,
 ) -> list[MemoryResult]:
     fts_ids = {
         item.id if isinstance(item, MemoryResult) else item.get("id")
         for item in results
         if item is not None
     }
-    vector_results = _semantic_search(store, query, limit=limit, filters=filters)
-    semantic_ids: set[int] = set()
-    for item in vector_results:
-        memory_id = item.get("id")
+    if vector_results is None:
+        vector_results = _semantic_search(store, query, limit=limit, filters=filters)
+    keyword_ids: set[int] = set()
+    for memory_id in fts_ids:
         if memory_id is None or isinstance(memory_id, bool):
             continue
         if not isinstance(memory_id, (int, float, str)):
             continue
         try:
-            semantic_ids.add(int(memory_id))
+            keyword_ids.add(int(memory_id))
         except (TypeError, ValueError):
             continue
     merged: list[MemoryResult | dict[str, Any]] = list(results)
@@ -543,6 +902,7 @@ def _merge_ranked_results(
                 score=float(item.get("score") or 0.0),
                 session_id=int(session_id),
                 metadata=metadata,
+                created_at_epoch=item.get("created_at_epoch"),
             )
         )
     baseline = _rerank_results(reranked, limit=limit, recency_days=store.RECALL_RECENCY_DAYS)
@@ -552,9 +912,11 @@ def _merge_ranked_results(
     if not store._hybrid_retrieval_enabled and not should_shadow:
         return baseline
     hybrid = _rerank_results_hybrid(
+        store,
         reranked,
         limit=limit,
-        semantic_ids=semantic_ids,
+        fts_ids=keyword_ids,
+        vector_results=vector_results,
         recency_days=store.RECALL_RECENCY_DAYS,
     )
     if should_shadow:
@@ -578,6 +940,8 @@ def _timeline_around(
     depth_before: int,
     depth_after: int,
     filters: dict[str, Any] | None,
+    *,
+    records: bool = False,
 ) -> list[dict[str, Any]]:
     anchor_id = anchor.id if isinstance(anchor, MemoryResult) else anchor.get("id")
     anchor_created_at = (
@@ -590,25 +954,39 @@ def _timeline_around(
         return []
     filters = filters or {}
     params: list[Any] = []
-    join_sessions = False
     where_base = ["memory_items.active = 1"]
     if filters.get("project"):
         clause, clause_params = store._project_clause(filters["project"])
         if clause:
             where_base.append(clause)
             params.extend(clause_params)
-        join_sessions = True
     if anchor_session_id:
         where_base.append("memory_items.session_id = ?")
         params.append(anchor_session_id)
     where_clause = " AND ".join(where_base)
-    join_clause = "JOIN sessions ON sessions.id = memory_items.session_id" if join_sessions else ""
+
+    if records:
+        before = store._fetch_records(
+            f"WHERE {where_clause} AND memory_items.created_at < ? "
+            "ORDER BY memory_items.created_at DESC LIMIT ?",
+            (*params, anchor_created_at, depth_before),
+        )
+        after = store._fetch_records(
+            f"WHERE {where_clause} AND memory_items.created_at > ? "
+            "ORDER BY memory_items.created_at ASC LIMIT ?",
+            (*params, anchor_created_at, depth_after),
+        )
+        anchor_record = store._fetch_records(
+            "WHERE memory_items.id = ? AND memory_items.active = 1", (anchor_id,)
+        )
+        results: list[dict[str, Any]] = [*reversed(before), *anchor_record, *after]
+        _attach_prompt_links(store, results)
+        return results
 
     before_rows = store.conn.execute(
         f"""
         SELECT memory_items.*
         FROM memory_items
-        {join_clause}
         WHERE {where_clause} AND memory_items.created_at < ?
         ORDER BY memory_items.created_at DESC
         LIMIT ?
@@ -619,7 +997,6 @@ def _timeline_around(
         f"""
         SELECT memory_items.*
         FROM memory_items
-        {join_clause}
         WHERE {where_clause} AND memory_items.created_at > ?
         ORDER BY memory_items.created_at ASC
         LIMIT ?
@@ -684,37 +1061,27 @@ def search(
     limit: int = 10,
     filters: dict[str, Any] | None = None,
     log_usage: bool = True,
+    hybrid: bool | None = None,
 ) -> list[MemoryResult]:
     filters = filters or {}
+    use_hybrid = store._hybrid_retrieval_enabled if hybrid is None else hybrid
+    if use_hybrid:
+        results = hybrid_search(store, query, limit=limit, filters=filters)
+        if log_usage:
+            _record_search_usage(store, results, limit=limit, filters=filters)
+        return results
     expanded_query = _expand_query(query)
     if not expanded_query:
         return []
-    params: list[Any] = [expanded_query]
-    where_clauses = ["memory_items.active = 1", "memory_fts MATCH ?"]
-    join_sessions = False
-    if filters.get("kind"):
-        where_clauses.append("memory_items.kind = ?")
-        params.append(filters["kind"])
-    if filters.get("session_id"):
-        where_clauses.append("memory_items.session_id = ?")
-        params.append(filters["session_id"])
-    if filters.get("since"):
-        where_clauses.append("memory_items.created_at >= ?")
-        params.append(filters["since"])
-    if filters.get("project"):
-        clause, clause_params = store._project_clause(filters["project"])
-        if clause:
-            where_clauses.append(clause)
-            params.extend(clause_params)
-        join_sessions = True
-    where = " AND ".join(where_clauses)
-    join_clause = "JOIN sessions ON sessions.id = memory_items.session_id" if join_sessions else ""
+    where_clauses, params = _filter_clauses(store, filters)
+    where = " AND ".join([*where_clauses, "memory_fts MATCH ?"])
+    params.append(expanded_query)
     sql = f"""
         SELECT memory_items.*, -bm25(memory_fts, 1.0, 1.0, 0.25) AS score,
-            (1.0 / (1.0 + ((julianday('now') - julianday(memory_items.created_at)) / 7.0))) AS recency
+            (1.0 / (1.0 + ((strftime('%s', 'now') - memory_items.created_at_epoch) / 604800.0)))
+                AS recency
         FROM memory_fts
         JOIN memory_items ON memory_items.id = memory_fts.rowid
-        {join_clause}
         WHERE {where}
         ORDER BY (score * 1.5 + recency) DESC
         LIMIT ?
@@ -737,20 +1104,29 @@ def search(
                 score=float(row["score"]),
                 session_id=row["session_id"],
                 metadata=metadata,
+                created_at_epoch=row["created_at_epoch"],
             )
         )
     if log_usage:
-        tokens_read = sum(
-            store.estimate_tokens(f"{item.title} {item.body_text}") for item in results
-        )
-        store.record_usage(
-            "search",
-            tokens_read=tokens_read,
-            metadata={
-                "limit": limit,
-                "results": len(results),
-                "kind": filters.get("kind"),
-                "project": filters.get("project"),
-            },
-        )
+        _record_search_usage(store, results, limit=limit, filters=filters)
     return results
+
+
+def _record_search_usage(
+    store: MemoryStore,
+    results: list[MemoryResult],
+    *,
+    limit: int,
+    filters: dict[str, Any],
+) -> None:
+    tokens_read = sum(store.estimate_tokens(f"{item.title} {item.body_text}") for item in results)
+    store.record_usage(
+        "search",
+        tokens_read=tokens_read,
+        metadata={
+            "limit": limit,
+            "results": len(results),
+            "kind": filters.get("kind"),
+            "project": filters.get("project"),
+        },
+    )
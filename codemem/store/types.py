@@ -1,8 +1,28 @@
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass
 from typing import Any, TypedDict
 
+# Columns the pack/search read paths use; heavier text columns (facts, narrative,
+# files_*) and sync bookkeeping are left out of MemoryRecord queries.
+MEMORY_RECORD_COLUMNS = (
+    "id",
+    "session_id",
+    "kind",
+    "title",
+    "body_text",
+    "confidence",
+    "tags_text",
+    "active",
+    "created_at",
+    "updated_at",
+    "created_at_epoch",
+    "user_prompt_id",
+    "project_key",
+    "metadata_json",
+)
+
 
 @dataclass
 class MemoryResult:
@@ -17,6 +37,43 @@ class MemoryResult:
     score: float
     session_id: int
     metadata: dict[str, Any]
+    created_at_epoch: int | None = None
+
+
+class MemoryRecord(dict):
+    """memory_items row from a column-projected query.
+
+    ``metadata_json`` keeps the raw JSON text; ``metadata`` parses it on first access
+    and caches the result, so rows whose metadata is never read skip ``json.loads``.
+    ``to_dict()`` returns the shape of ``MemoryStore.recent()`` (metadata decoded).
+    """
+
+    __slots__ = ("_metadata",)
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        try:
+            return self._metadata
+        except AttributeError:
+            pass
+        metadata: dict[str, Any] = {}
+        text = self.get("metadata_json")
+        if isinstance(text, dict):
+            metadata = text
+        elif text:
+            try:
+                decoded = json.loads(text)
+            except json.JSONDecodeError:
+                decoded = None
+            if isinstance(decoded, dict):
+                metadata = decoded
+        self._metadata = metadata
+        return metadata
+
+    def to_dict(self) -> dict[str, Any]:
+        data = dict(self)
+        data["metadata_json"] = self.metadata
+        return data
 
 
 class ReplicationClock(TypedDict):
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import datetime as dt
+import logging
+import sqlite3
+import threading
+import time
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from .. import db
+from . import utils as store_utils
 
 if TYPE_CHECKING:
     from ._store import MemoryStore
 
+logger = logging.getLogger(__name__)
+
 
 def record_usage(
     store: MemoryStore,
@@ -18,99 +25,188 @@ def record_usage(
     tokens_written: int = 0,
     tokens_saved: int = 0,
     metadata: dict[str, Any] | None = None,
-) -> int:
+) -> None:
+    """Buffer a usage event; rows are written in batches by ``flush_usage``.
+
+    Read paths call this on every request, so committing per event would take the WAL
+    write lock (and an fsync) for what is otherwise a read-only query. The buffer is
+    flushed when it fills, on ``close()``, and (for stores shared across threads) by a
+    timer ``USAGE_FLUSH_INTERVAL_S`` after the first buffered event, so an idle store does
+    not sit on unwritten rows.
+    """
     created_at = dt.datetime.now(dt.UTC).isoformat()
-    cur = store.conn.execute(
-        """
-        INSERT INTO usage_events(session_id, event, tokens_read, tokens_written, tokens_saved, created_at, metadata_json)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+    project, key = _usage_project(metadata)
+    row = (
+        session_id,
+        event,
+        int(tokens_read),
+        int(tokens_written),
+        int(tokens_saved),
+        created_at,
+        db.to_json(metadata),
+        project,
+        key,
+        session_id,
+    )
+    with store._usage_lock:
+        if store._usage_closed:
+            return
+        store._usage_pending.append(row)
+        pending = len(store._usage_pending)
+        _arm_usage_timer_locked(store)
+    due = time.monotonic() - store._usage_last_flush >= store.USAGE_FLUSH_INTERVAL_S
+    if pending >= store.USAGE_FLUSH_MAX_EVENTS or due:
+        flush_usage(store)
+
+
+def flush_usage(store: MemoryStore) -> int:
+    """Write buffered usage events in one transaction. Returns the number of rows written.
+
+    If the insert fails the rows go back into the buffer (bounded by
+    ``USAGE_PENDING_MAX``) and the error is raised; once the store is closing they are
+    dropped instead.
+    """
+    with store._usage_lock:
+        rows = store._usage_pending
+        store._usage_pending = []
+        store._usage_last_flush = time.monotonic()
+        _cancel_usage_timer_locked(store)
+    if not rows:
+        return 0
+    try:
+        with store._batch_lock:
+            _insert_usage_rows(store, rows)
+    except sqlite3.Error:
+        with store._usage_lock:
+            if not store._usage_closed:
+                store._usage_pending = (rows + store._usage_pending)[-store.USAGE_PENDING_MAX :]
+                _arm_usage_timer_locked(store)
+        raise
+    return len(rows)
+
+
+def close_usage(store: MemoryStore) -> None:
+    """Stop the flush timer for good and write what is buffered, dropping it on failure."""
+    with store._usage_lock:
+        store._usage_closed = True
+        _cancel_usage_timer_locked(store)
+        pending = len(store._usage_pending)
+    try:
+        flush_usage(store)
+    except sqlite3.Error:
+        logger.warning("dropping %d buffered usage events on close", pending, exc_info=True)
+
+
+def _insert_usage_rows(store: MemoryStore, rows: list[tuple[Any, ...]]) -> None:
+    try:
+        store.conn.executemany(
+            f"""
+            INSERT INTO usage_events(
+                session_id, event, tokens_read, tokens_written, tokens_saved, created_at,
+                metadata_json, project, project_key
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, {_USAGE_PROJECT_KEY_SQL.format(session_id="?")})
+            """,
+            rows,
+        )
+        store.conn.commit()
+    except sqlite3.Error:
+        # Outside a batch nothing else is pending on the connection, so drop the partial
+        # insert; inside one, batch() rolls back when the error reaches it.
+        if getattr(store._batch_state, "conn", None) is None and store.conn.in_transaction:
+            store.conn.rollback()
+        raise
+
+
+def _arm_usage_timer_locked(store: MemoryStore) -> None:
+    if store._usage_closed or not store._usage_timer_enabled or store._usage_timer is not None:
+        return
+    timer = threading.Timer(store.USAGE_FLUSH_INTERVAL_S, _flush_usage_on_timer, args=(store,))
+    timer.daemon = True
+    store._usage_timer = timer
+    timer.start()
+
+
+def _cancel_usage_timer_locked(store: MemoryStore) -> None:
+    timer, store._usage_timer = store._usage_timer, None
+    if timer is not None:
+        timer.cancel()
+
+
+def _flush_usage_on_timer(store: MemoryStore) -> None:
+    try:
+        flush_usage(store)
+    except sqlite3.Error:
+        logger.warning("usage flush failed; events stay buffered", exc_info=True)
+
+
+# usage_events.project_key: the event's own project key, else its session's, else ''.
+# A NULL project_key would mean "not counted" to the rollup triggers (see db.py).
+_USAGE_PROJECT_KEY_SQL = (
+    "COALESCE(?, (SELECT project_key FROM sessions WHERE sessions.id = {session_id}), '')"
+)
+
+
+def _usage_project(metadata: dict[str, Any] | None) -> tuple[str | None, str | None]:
+    """The metadata project of a usage event and its project_key (None when unset)."""
+    project = metadata.get("project") if isinstance(metadata, dict) else None
+    if not isinstance(project, str):
+        return None, None
+    return project, store_utils.project_key(project) or None
+
+
+def update_usage_metadata(store: MemoryStore, updates: list[tuple[str, int]]) -> None:
+    """Rewrite usage_events.metadata_json, keeping project/project_key in step with it."""
+    params = []
+    for metadata_json, usage_id in updates:
+        project, key = _usage_project(db.from_json(metadata_json))
+        params.append((metadata_json, project, key, usage_id))
+    store.conn.executemany(
+        f"""
+        UPDATE usage_events
+        SET metadata_json = ?,
+            project = ?,
+            project_key = {_USAGE_PROJECT_KEY_SQL.format(session_id="usage_events.session_id")}
+        WHERE id = ?
         """,
-        (
-            session_id,
-            event,
-            int(tokens_read),
-            int(tokens_written),
-            int(tokens_saved),
-            created_at,
-            db.to_json(metadata),
-        ),
+        params,
     )
-    store.conn.commit()
-    lastrowid = cur.lastrowid
-    if lastrowid is None:
-        raise RuntimeError("Failed to record usage")
-    return int(lastrowid)
 
 
-def usage_summary(store: MemoryStore, project: str | None = None) -> list[dict[str, Any]]:
+def _rollup_project_clause(store: MemoryStore, project: str | None) -> tuple[str, list[Any]]:
     if not project:
-        rows = store.conn.execute(
-            """
-            SELECT event,
-                   COUNT(*) AS count,
-                   COALESCE(SUM(tokens_read), 0) AS tokens_read,
-                   COALESCE(SUM(tokens_written), 0) AS tokens_written,
-                   COALESCE(SUM(tokens_saved), 0) AS tokens_saved
-            FROM usage_events
-            GROUP BY event
-            ORDER BY event
-            """
-        ).fetchall()
-        return db.rows_to_dicts(rows)
+        return "", []
+    return store._project_key_clause("project_key", project)
 
-    session_clause, session_params = store._project_column_clause("sessions.project", project)
-    meta_project_expr = (
-        "CASE WHEN json_valid(usage_events.metadata_json) = 1 "
-        "THEN json_extract(usage_events.metadata_json, '$.project') ELSE NULL END"
-    )
-    meta_clause, meta_params = store._project_column_clause(meta_project_expr, project)
-    if not session_clause and not meta_clause:
+
+def usage_summary(store: MemoryStore, project: str | None = None) -> list[dict[str, Any]]:
+    flush_usage(store)
+    clause, params = _rollup_project_clause(store, project)
+    if project and not clause:
         return []
+    where = f"WHERE {clause}" if clause else ""
     rows = store.conn.execute(
         f"""
-        SELECT usage_events.event AS event,
-               COUNT(*) AS count,
-               COALESCE(SUM(usage_events.tokens_read), 0) AS tokens_read,
-               COALESCE(SUM(usage_events.tokens_written), 0) AS tokens_written,
-               COALESCE(SUM(usage_events.tokens_saved), 0) AS tokens_saved
-        FROM usage_events
-        LEFT JOIN sessions ON sessions.id = usage_events.session_id
-        WHERE ({session_clause} OR {meta_clause})
-        GROUP BY usage_events.event
-        ORDER BY usage_events.event
+        SELECT event,
+               SUM(events) AS count,
+               COALESCE(SUM(tokens_read), 0) AS tokens_read,
+               COALESCE(SUM(tokens_written), 0) AS tokens_written,
+               COALESCE(SUM(tokens_saved), 0) AS tokens_saved
+        FROM usage_event_rollups
+        {where}
+        GROUP BY event
+        HAVING SUM(events) > 0
+        ORDER BY event
         """,
-        (*session_params, *meta_params),
+        params,
     ).fetchall()
     return db.rows_to_dicts(rows)
 
 
 def usage_totals(store: MemoryStore, project: str | None = None) -> dict[str, Any]:
-    if not project:
-        row = store.conn.execute(
-            """
-            SELECT COUNT(*) as count,
-                   COALESCE(SUM(tokens_read), 0) as tokens_read,
-                   COALESCE(SUM(tokens_written), 0) as tokens_written,
-                   COALESCE(SUM(tokens_saved), 0) as tokens_saved
-            FROM usage_events
-            """
-        ).fetchone()
-        return {
-            "events": int(row["count"] or 0) if row else 0,
-            "tokens_read": int(row["tokens_read"] or 0) if row else 0,
-            "tokens_written": int(row["tokens_written"] or 0) if row else 0,
-            "tokens_saved": int(row["tokens_saved"] or 0) if row else 0,
-            "work_investment_tokens": store.work_investment_tokens(),
-            "work_investment_tokens_sum": store.work_investment_tokens_sum(),
-        }
-
-    session_clause, session_params = store._project_column_clause("sessions.project", project)
-    meta_project_expr = (
-        "CASE WHEN json_valid(usage_events.metadata_json) = 1 "
-        "THEN json_extract(usage_events.metadata_json, '$.project') ELSE NULL END"
-    )
-    meta_clause, meta_params = store._project_column_clause(meta_project_expr, project)
-    if not session_clause and not meta_clause:
+    flush_usage(store)
+    clause, params = _rollup_project_clause(store, project)
+    if project and not clause:
         return {
             "events": 0,
             "tokens_read": 0,
@@ -119,17 +215,17 @@ def usage_totals(store: MemoryStore, project: str | None = None) -> dict[str, An
             "work_investment_tokens": 0,
             "work_investment_tokens_sum": 0,
         }
+    where = f"WHERE {clause}" if clause else ""
     row = store.conn.execute(
         f"""
-        SELECT COUNT(*) as count,
-               COALESCE(SUM(usage_events.tokens_read), 0) as tokens_read,
-               COALESCE(SUM(usage_events.tokens_written), 0) as tokens_written,
-               COALESCE(SUM(usage_events.tokens_saved), 0) as tokens_saved
-        FROM usage_events
-        LEFT JOIN sessions ON sessions.id = usage_events.session_id
-        WHERE ({session_clause} OR {meta_clause})
+        SELECT COALESCE(SUM(events), 0) as count,
+               COALESCE(SUM(tokens_read), 0) as tokens_read,
+               COALESCE(SUM(tokens_written), 0) as tokens_written,
+               COALESCE(SUM(tokens_saved), 0) as tokens_saved
+        FROM usage_event_rollups
+        {where}
         """,
-        (*session_params, *meta_params),
+        params,
     ).fetchone()
     return {
         "events": int(row["count"] or 0) if row else 0,
@@ -144,28 +240,21 @@ def usage_totals(store: MemoryStore, project: str | None = None) -> dict[str, An
 def recent_pack_events(
     store: MemoryStore, limit: int = 10, project: str | None = None
 ) -> list[dict[str, Any]]:
+    flush_usage(store)
     if project:
-        session_clause, session_params = store._project_column_clause("sessions.project", project)
-        meta_project_expr = (
-            "CASE WHEN json_valid(usage_events.metadata_json) = 1 "
-            "THEN json_extract(usage_events.metadata_json, '$.project') ELSE NULL END"
-        )
-        meta_clause, meta_params = store._project_column_clause(meta_project_expr, project)
-        if not session_clause and not meta_clause:
+        clause, params = store._project_key_clause("project_key", project)
+        if not clause:
             return []
         rows = store.conn.execute(
             f"""
-            SELECT usage_events.id, usage_events.session_id, usage_events.event,
-                   usage_events.tokens_read, usage_events.tokens_written, usage_events.tokens_saved,
-                   usage_events.created_at, usage_events.metadata_json
+            SELECT id, session_id, event, tokens_read, tokens_written, tokens_saved,
+                   created_at, metadata_json
             FROM usage_events
-            LEFT JOIN sessions ON sessions.id = usage_events.session_id
-            WHERE event = 'pack'
-              AND ({session_clause} OR {meta_clause})
-            ORDER BY usage_events.created_at DESC
+            WHERE event = 'pack' AND {clause}
+            ORDER BY created_at DESC
             LIMIT ?
             """,
-            (*session_params, *meta_params, limit),
+            (*params, limit),
         ).fetchall()
     else:
         rows = store.conn.execute(
@@ -187,19 +276,18 @@ def recent_pack_events(
 
 def latest_pack_per_project(store: MemoryStore) -> list[dict[str, Any]]:
     """Return the most recent pack event for each project."""
+    flush_usage(store)
     rows = store.conn.execute(
         """
         SELECT id, session_id, event, tokens_read, tokens_written, tokens_saved,
                created_at, metadata_json
         FROM usage_events
-        WHERE event = 'pack'
-          AND id IN (
-              SELECT MAX(id)
-              FROM usage_events
-              WHERE event = 'pack'
-                AND json_extract(metadata_json, '$.project') IS NOT NULL
-              GROUP BY json_extract(metadata_json, '$.project')
-          )
+        WHERE id IN (
+            SELECT MAX(id)
+            FROM usage_events
+            WHERE event = 'pack' AND project IS NOT NULL
+            GROUP BY project
+        )
         ORDER BY created_at DESC
         """
     ).fetchall()
@@ -210,6 +298,7 @@ def latest_pack_per_project(store: MemoryStore) -> list[dict[str, Any]]:
 
 
 def stats(store: MemoryStore) -> dict[str, Any]:
+    flush_usage(store)
     total_memories = store.conn.execute("SELECT COUNT(*) FROM memory_items").fetchone()[0]
     active_memories = store.conn.execute(
         "SELECT COUNT(*) FROM memory_items WHERE active = 1"
@@ -236,10 +325,11 @@ def stats(store: MemoryStore) -> dict[str, Any]:
 
     usage_rows = store.conn.execute(
         """
-        SELECT event, COUNT(*) as count, SUM(tokens_read) as tokens_read,
+        SELECT event, SUM(events) as count, SUM(tokens_read) as tokens_read,
                SUM(tokens_written) as tokens_written, SUM(tokens_saved) as tokens_saved
-        FROM usage_events
+        FROM usage_event_rollups
         GROUP BY event
+        HAVING SUM(events) > 0
         ORDER BY count DESC
         """
     ).fetchall()
@@ -268,6 +358,7 @@ def stats(store: MemoryStore) -> dict[str, Any]:
             "tags_filled": tags_filled,
             "tags_coverage": tags_coverage,
             "raw_events": raw_events,
+            "vector_index": store.vector_index_status(),
         },
         "usage": usage,
         "reliability": store.raw_event_reliability_metrics(),
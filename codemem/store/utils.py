@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 import datetime as dt
+import string
 from typing import Any
 
+# Whitespace trimmed from project values; db._project_key_sql trims the same characters.
+PROJECT_KEY_WHITESPACE = " \t\n\r\f\v"
+# SQLite's lower() and LIKE only fold ASCII, so keys fold exactly that much on both sides.
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
 
 def compute_cursor(created_at: str, op_id: str) -> str:
     return f"{created_at}|{op_id}"
@@ -57,5 +63,26 @@ def project_column_clause(column_expr: str, project: str) -> tuple[str, list[Any
     )
 
 
+def project_key(project: str) -> str:
+    """Normalized project identity stored in ``project_key`` columns (see db._project_key_sql).
+
+    The basename of the trimmed value, ASCII-lowercased so project filters stay as
+    case-insensitive as the suffix LIKE they replaced.
+    """
+    return project_basename(project.strip(PROJECT_KEY_WHITESPACE)).translate(_ASCII_LOWER)
+
+
+def session_project_key(project: str | None) -> str | None:
+    """sessions.project_key for a session project; written with every project write."""
+    return None if project is None else project_key(project)
+
+
+def project_key_clause(column_expr: str, project: str) -> tuple[str, list[Any]]:
+    key = project_key(project)
+    if not key:
+        return "", []
+    return f"{column_expr} = ?", [key]
+
+
 def project_clause(project: str) -> tuple[str, list[Any]]:
-    return project_column_clause("sessions.project", project)
+    return project_key_clause("memory_items.project_key", project)
@@ -1,13 +1,51 @@
 from __future__ import annotations
 
+import datetime as dt
+import os
+from collections.abc import Callable
 from typing import TYPE_CHECKING, Any
 
-from ..semantic import chunk_text, embed_texts, get_embedding_client, hash_text
+from ..semantic import (
+    chunk_text,
+    embed_texts,
+    embeddings_disabled,
+    get_embedding_client,
+    hash_text,
+)
 
 if TYPE_CHECKING:
     from ._store import MemoryStore
 
 
+# Chunks per embedding call; matches fastembed's default inference batch size.
+BACKFILL_EMBED_BATCH_SIZE = 256
+# Memories per existing-hash prefetch (kept under SQLite's bound-parameter limit).
+BACKFILL_PREFETCH_SIZE = 500
+# Memories taken from vector_index_queue per indexing pass.
+VECTOR_INDEX_BATCH_LIMIT = 200
+# Queue rows that failed this many times are left for `codemem embed` to retry.
+VECTOR_INDEX_MAX_ATTEMPTS = 5
+
+
+def _existing_vector_hashes(
+    store: MemoryStore, memory_ids: list[int], model: str
+) -> set[tuple[int, str]]:
+    if not memory_ids:
+        return set()
+    placeholders = ",".join(["?"] * len(memory_ids))
+    rows = store.conn.execute(
+        f"""
+        SELECT memory_id, content_hash
+        FROM memory_vectors
+        WHERE model = ? AND memory_id IN ({placeholders})
+        """,
+        (model, *memory_ids),
+    ).fetchall()
+    return {
+        (int(row["memory_id"]), str(row["content_hash"])) for row in rows if row["content_hash"]
+    }
+
+
 def backfill_vectors(
     store: MemoryStore,
     limit: int | None = None,
@@ -16,13 +54,21 @@ def backfill_vectors(
     active_only: bool = True,
     dry_run: bool = False,
     memory_ids: list[int] | None = None,
+    batch_size: int = BACKFILL_EMBED_BATCH_SIZE,
+    progress: Callable[[dict[str, int]], None] | None = None,
 ) -> dict[str, int]:
+    """Embed missing chunks for matching memories.
+
+    Chunks from many memories are embedded together in batches of ``batch_size`` and each
+    batch is written in its own transaction, so an interrupted run resumes where it left
+    off: chunks whose (memory_id, content_hash) already exist for the model are skipped.
+    ``progress`` receives the running counts (plus ``total`` memories) after every batch.
+    """
     client = get_embedding_client()
     if not client:
         return {"checked": 0, "embedded": 0, "inserted": 0, "skipped": 0}
     params: list[Any] = []
     where_clauses = []
-    join_sessions = False
     if active_only:
         where_clauses.append("memory_items.active = 1")
     if since:
@@ -33,87 +79,90 @@ def backfill_vectors(
         if clause:
             where_clauses.append(clause)
             params.extend(clause_params)
-        join_sessions = True
     if memory_ids:
         placeholders = ",".join(["?"] * len(memory_ids))
         where_clauses.append(f"memory_items.id IN ({placeholders})")
         params.extend(int(memory_id) for memory_id in memory_ids)
     where = " AND ".join(where_clauses) if where_clauses else "1=1"
-    join_clause = "JOIN sessions ON sessions.id = memory_items.session_id" if join_sessions else ""
     limit_clause = "LIMIT ?" if limit else ""
     if limit:
         params.append(limit)
     rows = store.conn.execute(
         f"""
-        SELECT memory_items.id, memory_items.title, memory_items.body_text
+        SELECT memory_items.id, memory_items.title, memory_items.body_text,
+            memory_items.kind, memory_items.project_key
         FROM memory_items
-        {join_clause}
         WHERE {where}
-        ORDER BY memory_items.created_at ASC
+        ORDER BY memory_items.created_at ASC, memory_items.id ASC
         {limit_clause}
         """,
         params,
     ).fetchall()
-    checked = 0
-    embedded = 0
-    inserted = 0
-    skipped = 0
-    model = client.model
-    for row in rows:
-        checked += 1
-        memory_id = int(row["id"])
-        title = row["title"] or ""
-        body_text = row["body_text"] or ""
-        text = f"{title}\n{body_text}".strip()
-        chunks = chunk_text(text)
-        if not chunks:
-            continue
-        existing = store.conn.execute(
-            """
-            SELECT content_hash
-            FROM memory_vectors
-            WHERE memory_id = ? AND model = ?
-            """,
-            (memory_id, model),
-        ).fetchall()
-        existing_hashes = {row["content_hash"] for row in existing if row["content_hash"]}
-        pending_chunks: list[str] = []
-        pending_hashes: list[str] = []
-        for chunk in chunks:
-            content_hash = hash_text(chunk)
-            if content_hash in existing_hashes:
-                skipped += 1
-                continue
-            pending_chunks.append(chunk)
-            pending_hashes.append(content_hash)
-        if not pending_chunks:
-            continue
-        embeddings = embed_texts(pending_chunks)
-        if not embeddings:
-            continue
-        embedded += len(embeddings)
+    model = getattr(client, "model", "unknown")
+    batch_size = max(1, batch_size)
+    counts = {"checked": 0, "embedded": 0, "inserted": 0, "skipped": 0}
+    # (memory_id, chunk_index, content_hash, chunk) waiting for the next embedding call.
+    pending: list[tuple[int, int, str, str]] = []
+    metadata_by_id = {int(row["id"]): (row["project_key"] or "", row["kind"] or "") for row in rows}
+
+    def write_pending() -> None:
         if dry_run:
-            inserted += len(embeddings)
-            continue
-        for index, (vector, content_hash) in enumerate(
-            zip(embeddings, pending_hashes, strict=False)
-        ):
-            store.conn.execute(
+            counts["embedded"] += len(pending)
+            counts["inserted"] += len(pending)
+            return
+        embeddings = embed_texts([chunk for _, _, _, chunk in pending])
+        counts["embedded"] += len(embeddings)
+        values = [
+            (vector, *metadata_by_id[memory_id], memory_id, chunk_index, content_hash, model)
+            # strict: an embedder that returns fewer vectors than chunks must fail loudly
+            # rather than silently leave chunks unindexed.
+            for (memory_id, chunk_index, content_hash, _), vector in zip(
+                pending, embeddings, strict=True
+            )
+            if vector
+        ]
+        if not values:
+            return
+        with store.conn:
+            store.conn.executemany(
                 """
-                INSERT INTO memory_vectors(embedding, memory_id, chunk_index, content_hash, model)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO memory_vectors(
+                    embedding, project_key, kind, memory_id, chunk_index, content_hash, model
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                (vector, memory_id, index, content_hash, model),
+                values,
             )
-            inserted += 1
-    if not dry_run:
-        store.conn.commit()
-    return {
-        "checked": checked,
-        "embedded": embedded,
-        "inserted": inserted,
-        "skipped": skipped,
-    }
+        counts["inserted"] += len(values)
+
+    def flush(final: bool = False) -> None:
+        if not pending and not final:
+            return
+        if pending:
+            write_pending()
+            pending.clear()
+        if progress is not None:
+            progress({**counts, "total": len(rows)})
+
+    for page_start in range(0, len(rows), BACKFILL_PREFETCH_SIZE):
+        page = rows[page_start : page_start + BACKFILL_PREFETCH_SIZE]
+        existing = _existing_vector_hashes(store, [int(row["id"]) for row in page], model)
+        for row in page:
+            counts["checked"] += 1
+            memory_id = int(row["id"])
+            text = f"{row['title'] or ''}\n{row['body_text'] or ''}".strip()
+            for chunk_index, chunk in enumerate(chunk_text(text)):
+                content_hash = hash_text(chunk)
+                if (memory_id, content_hash) in existing:
+                    counts["skipped"] += 1
+                    continue
+                # Guards against identical chunks within one memory being embedded twice.
+                existing.add((memory_id, content_hash))
+                pending.append((memory_id, chunk_index, content_hash, chunk))
+                if len(pending) >= batch_size:
+                    flush()
+    flush(final=True)
+    return counts
 
 
 def _store_vectors(store: MemoryStore, memory_id: int, title: str, body_text: str) -> None:
@@ -128,14 +177,205 @@ def _store_vectors(store: MemoryStore, memory_id: int, title: str, body_text: st
     if not embeddings:
         return
     model = getattr(client, "model", "unknown")
-    for index, (chunk, vector) in enumerate(zip(chunks, embeddings, strict=False)):
+    project_key, kind = _vector_metadata(store, [memory_id]).get(memory_id, ("", ""))
+    for index, (chunk, vector) in enumerate(zip(chunks, embeddings, strict=True)):
         if not vector:
             continue
         store.conn.execute(
             """
-            INSERT INTO memory_vectors(embedding, memory_id, chunk_index, content_hash, model)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO memory_vectors(
+                embedding, project_key, kind, memory_id, chunk_index, content_hash, model
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (vector, project_key, kind, memory_id, index, hash_text(chunk), model),
+        )
+    store.conn.commit()
+
+
+def _vector_metadata(store: MemoryStore, memory_ids: list[int]) -> dict[int, tuple[str, str]]:
+    """(project_key, kind) per memory, as stored on memory_vectors ('' when unknown)."""
+    if not memory_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(memory_ids))
+    rows = store.conn.execute(
+        f"SELECT id, project_key, kind FROM memory_items WHERE id IN ({placeholders})",
+        memory_ids,
+    ).fetchall()
+    return {int(row["id"]): (row["project_key"] or "", row["kind"] or "") for row in rows}
+
+
+def refresh_vector_metadata(store: MemoryStore) -> int:
+    """Copy current project_key/kind onto vectors of memories in vector_metadata_queue.
+
+    Vector search re-checks filters against memory_items, so stale metadata only costs
+    recall; this keeps the in-KNN filters accurate after project renames or synced edits.
+    Only memories whose key or kind actually changed are queued (by trigger), since finding
+    a memory's vectors is a full memory_vectors scan. Returns vector rows updated.
+    """
+    if embeddings_disabled():
+        return 0
+    updated = 0
+    while True:
+        page = [
+            int(row["memory_id"])
+            for row in store.conn.execute(
+                "SELECT memory_id FROM vector_metadata_queue ORDER BY memory_id LIMIT ?",
+                (BACKFILL_PREFETCH_SIZE,),
+            )
+        ]
+        if not page:
+            return updated
+        current = _vector_metadata(store, page)
+        placeholders = ",".join(["?"] * len(page))
+        rows = store.conn.execute(
+            f"""
+            SELECT rowid, memory_id, project_key, kind
+            FROM memory_vectors
+            WHERE memory_id IN ({placeholders})
             """,
-            (vector, memory_id, index, hash_text(chunk), model),
+            page,
+        ).fetchall()
+        updates: list[tuple[str, str, int]] = []
+        for row in rows:
+            expected = current.get(int(row["memory_id"]))
+            if expected is None or (row["project_key"], row["kind"]) == expected:
+                continue
+            updates.append((*expected, int(row["rowid"])))
+        with store.conn:
+            store.conn.executemany(
+                "UPDATE memory_vectors SET project_key = ?, kind = ? WHERE rowid = ?", updates
+            )
+            store.conn.execute(
+                f"DELETE FROM vector_metadata_queue WHERE memory_id IN ({placeholders})", page
+            )
+        updated += len(updates)
+
+
+# Only a process that drains vector_index_queue (the viewer's VectorIndexWorker) queues
+# by default; the MCP server and CLI embed once the write commits so nothing waits on an
+# absent drainer.
+_VECTOR_INDEX_ASYNC_DEFAULT = False
+
+
+def set_vector_index_async_default(enabled: bool) -> None:
+    global _VECTOR_INDEX_ASYNC_DEFAULT
+    _VECTOR_INDEX_ASYNC_DEFAULT = enabled
+
+
+def vector_index_async_override() -> bool | None:
+    """CODEMEM_VECTOR_INDEX_ASYNC when set explicitly, else None."""
+    value = (os.environ.get("CODEMEM_VECTOR_INDEX_ASYNC") or "").strip().lower()
+    if not value:
+        return None
+    return value not in {"0", "false", "off"}
+
+
+def vector_index_async() -> bool:
+    override = vector_index_async_override()
+    return _VECTOR_INDEX_ASYNC_DEFAULT if override is None else override
+
+
+def enqueue_vector_index(store: MemoryStore, memory_ids: list[int]) -> int:
+    """Queue memories for the background vector indexer; returns rows queued or re-queued.
+
+    Re-queuing an already queued memory bumps ``enqueued_at`` so an indexing pass that
+    picked up the older request does not delete the newer one.
+    """
+    if not memory_ids or embeddings_disabled():
+        return 0
+    now = dt.datetime.now(dt.UTC).isoformat()
+    before = store.conn.total_changes
+    store.conn.executemany(
+        """
+        INSERT INTO vector_index_queue(memory_id, enqueued_at)
+        VALUES (?, ?)
+        ON CONFLICT(memory_id) DO UPDATE SET
+            enqueued_at = excluded.enqueued_at,
+            attempts = 0,
+            last_error = NULL
+        """,
+        [(int(memory_id), now) for memory_id in memory_ids],
+    )
+    store.conn.commit()
+    return store.conn.total_changes - before
+
+
+def index_memory_vectors(store: MemoryStore, memory_id: int, title: str, body_text: str) -> None:
+    if vector_index_async():
+        enqueue_vector_index(store, [memory_id])
+        return
+    # Embedding is slow; never run it inside a batch's write transaction.
+    store.after_commit(lambda: _store_vectors(store, memory_id, title, body_text))
+
+
+def index_pending_vectors(
+    store: MemoryStore, limit: int = VECTOR_INDEX_BATCH_LIMIT
+) -> dict[str, int]:
+    """Embed the oldest queued memories and remove them from vector_index_queue."""
+    rows = store.conn.execute(
+        """
+        SELECT memory_id, enqueued_at
+        FROM vector_index_queue
+        WHERE attempts < ?
+        ORDER BY enqueued_at ASC, memory_id ASC
+        LIMIT ?
+        """,
+        (VECTOR_INDEX_MAX_ATTEMPTS, limit),
+    ).fetchall()
+    memory_ids = [int(row["memory_id"]) for row in rows]
+    if not get_embedding_client():
+        return {"indexed": 0, "inserted": 0}
+    # Synced edits and renames may leave existing chunks with an old project/kind.
+    refresh_vector_metadata(store)
+    if not memory_ids:
+        return {"indexed": 0, "inserted": 0}
+    placeholders = ",".join(["?"] * len(memory_ids))
+    try:
+        result = backfill_vectors(store, memory_ids=memory_ids, active_only=True)
+    except Exception as exc:
+        store.conn.execute(
+            f"""
+            UPDATE vector_index_queue
+            SET attempts = attempts + 1, last_error = ?
+            WHERE memory_id IN ({placeholders})
+            """,
+            (str(exc)[:500], *memory_ids),
         )
+        store.conn.commit()
+        raise
+    # Keep requests re-queued while we were embedding; they carry a newer enqueued_at.
+    store.conn.executemany(
+        "DELETE FROM vector_index_queue WHERE memory_id = ? AND enqueued_at <= ?",
+        [(int(row["memory_id"]), row["enqueued_at"]) for row in rows],
+    )
     store.conn.commit()
+    return {"indexed": len(memory_ids), "inserted": result["inserted"]}
+
+
+def vector_index_status(store: MemoryStore) -> dict[str, Any]:
+    row = store.conn.execute(
+        """
+        SELECT
+            COUNT(*) AS pending,
+            SUM(CASE WHEN attempts >= ? THEN 1 ELSE 0 END) AS failed,
+            MIN(enqueued_at) AS oldest_enqueued_at
+        FROM vector_index_queue
+        """,
+        (VECTOR_INDEX_MAX_ATTEMPTS,),
+    ).fetchone()
+    oldest = row["oldest_enqueued_at"] if row else None
+    lag_s = 0.0
+    if oldest:
+        try:
+            lag_s = max(
+                0.0, (dt.datetime.now(dt.UTC) - dt.datetime.fromisoformat(oldest)).total_seconds()
+            )
+        except ValueError:
+            lag_s = 0.0
+    return {
+        "pending": int(row["pending"] or 0) if row else 0,
+        "failed": int(row["failed"] or 0) if row else 0,
+        "oldest_enqueued_at": oldest,
+        "lag_s": lag_s,
+    }
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+import tempfile
+from collections.abc import Callable, Iterable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from . import db
+from .store import raw_events as store_raw_events
+from .store.maintenance import _best_of
+
+# Queries the raw-event sweeper runs on every tick, timed by benchmark_sweeper_queries.
+SWEEPER_PROBES: dict[str, Callable[[sqlite3.Connection], Any]] = {
+    "pending_idle": lambda conn: store_raw_events.raw_event_sessions_pending_idle_flush(
+        conn, idle_before_ts_wall_ms=2**62, limit=25
+    ),
+    "pending_queue": lambda conn: store_raw_events.raw_event_sessions_with_pending_queue(
+        conn, limit=25
+    ),
+    "backlog_totals": store_raw_events.raw_event_backlog_totals,
+}
+
+
+def _seed_raw_events(
+    conn: sqlite3.Connection, *, events: int, sessions: int, pending_sessions: int
+) -> None:
+    now = dt.datetime.now(dt.UTC).isoformat()
+    per_session = max(1, events // sessions)
+    with conn:
+        for index in range(sessions):
+            session_id = f"bench-{index}"
+            last_seq = per_session - 1
+            flushed = last_seq - 1 if index < pending_sessions else last_seq
+            conn.execute(
+                """
+                INSERT INTO raw_event_sessions(
+                    opencode_session_id, last_seen_ts_wall_ms, last_received_event_seq,
+                    last_flushed_event_seq, updated_at
+                ) VALUES (?, ?, ?, ?, ?)
+                """,
+                (session_id, index, last_seq, flushed, now),
+            )
+            conn.executemany(
+                """
+                INSERT INTO raw_events(
+                    opencode_session_id, event_id, event_seq, event_type, ts_wall_ms,
+                    payload_json, created_at
+                ) VALUES (?, ?, ?, 'tool.execute.after', ?, '{}', ?)
+                """,
+                ((session_id, f"e{seq}", seq, seq, now) for seq in range(per_session)),
+            )
+            if index < pending_sessions:
+                conn.execute(
+                    """
+                    INSERT INTO raw_event_flush_batches(
+                        opencode_session_id, start_event_seq, end_event_seq,
+                        extractor_version, status, created_at, updated_at
+                    ) VALUES (?, ?, ?, 'bench', 'pending', ?, ?)
+                    """,
+                    (session_id, last_seq, last_seq, now, now),
+                )
+
+
+def benchmark_sweeper_queries(
+    event_counts: Iterable[int],
+    *,
+    sessions: int = 100,
+    pending_sessions: int = 5,
+    repeat: int = 5,
+) -> list[dict[str, Any]]:
+    """Time the sweeper's per-tick queries on scratch databases of growing raw_events size.
+
+    Each size gets a fresh temporary database with ``sessions`` sessions, of which
+    ``pending_sessions`` have unflushed events. Reports the best of ``repeat`` per query.
+    """
+    results: list[dict[str, Any]] = []
+    for count in event_counts:
+        with tempfile.TemporaryDirectory(prefix="codemem-sweeper-bench-") as tmp:
+            path = Path(tmp) / "bench.sqlite"
+            conn = db.connect(path)
+            try:
+                db.initialize_schema(conn, path)
+                _seed_raw_events(
+                    conn, events=count, sessions=sessions, pending_sessions=pending_sessions
+                )
+                conn.execute("ANALYZE")
+                timings = {
+                    name: _best_of(partial(probe, conn), repeat)
+                    for name, probe in SWEEPER_PROBES.items()
+                }
+            finally:
+                conn.close()
+        results.append({"events": count, "seconds": timings})
+    return results
@@ -8,6 +8,7 @@ from typing import Any, cast
 from urllib.parse import urlencode
 
 from ..store import MemoryStore, ReplicationOp
+from ..store.vectors import vector_index_async
 from ..sync_api import MAX_SYNC_BODY_BYTES
 from ..sync_auth import build_auth_headers
 from ..sync_identity import ensure_device_identity
@@ -57,7 +58,12 @@ def _backfill_derived_fields_for_applied_ops(
         return
     memory_ids = [int(row["id"]) for row in rows]
     store.backfill_tags_text(memory_ids=memory_ids, active_only=True)
-    store.backfill_vectors(memory_ids=memory_ids, active_only=True)
+    if vector_index_async():
+        # Leave embedding to the background indexer so large sync bursts don't block the pass.
+        store.enqueue_vector_index(memory_ids)
+    else:
+        store.backfill_vectors(memory_ids=memory_ids, active_only=True)
+        store.refresh_vector_metadata()
 
 
 def _cursor_advances(current: str | None, candidate: str | None) -> bool:
@@ -5,6 +5,7 @@ from pathlib import Path
 from .fs_paths import ensure_path, find_agent_notes  # noqa: F401
 from .git_info import (  # noqa: F401
     LOCKFILE_PATTERNS,  # noqa: F401
+    cached_git_info,
     detect_git_info,
     filter_lockfiles_from_diff,
     filter_lockfiles_from_list,
@@ -4,17 +4,25 @@ import os
 import re
 import socket
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
 from urllib.parse import urlparse
 
-from . import viewer_assets, viewer_raw_events
+from . import (
+    viewer_assets,
+    viewer_raw_events,
+    viewer_store_pool,
+    viewer_vector_index,
+)
 from .config import load_config  # noqa: F401
 from .db import DEFAULT_DB_PATH
 from .observer import _load_opencode_config
 from .raw_event_flush import flush_raw_events  # noqa: F401
+from .semantic import get_embedding_client
 from .store import MemoryStore
 from .viewer_http import (
+    DEFAULT_VIEWER_HOST,
+    DEFAULT_VIEWER_PORT,
     MissingOriginPolicy,
     read_json_body,
     reject_cross_origin,
@@ -27,8 +35,6 @@ from .viewer_routes import raw_events as viewer_routes_raw_events
 from .viewer_routes import stats as viewer_routes_stats
 from .viewer_routes import sync as viewer_routes_sync
 
-DEFAULT_VIEWER_HOST = "127.0.0.1"
-DEFAULT_VIEWER_PORT = 38888
 DEFAULT_PROVIDER_OPTIONS = ("openai", "anthropic")
 
 
@@ -48,10 +54,21 @@ def _strip_private_obj(value: Any) -> Any:
     return value
 
 
+def _warm_embedding_client() -> None:
+    try:
+        get_embedding_client()
+    except Exception:  # pragma: no cover
+        return
+
+
 RawEventAutoFlusher = viewer_raw_events.RawEventAutoFlusher
 RawEventSweeper = viewer_raw_events.RawEventSweeper
 RAW_EVENT_FLUSHER = viewer_raw_events.RAW_EVENT_FLUSHER
 RAW_EVENT_SWEEPER = viewer_raw_events.RAW_EVENT_SWEEPER
+VECTOR_INDEX_WORKER = viewer_vector_index.VECTOR_INDEX_WORKER
+VIEWER_STORE_POOL = viewer_store_pool.ViewerStorePool(
+    lambda db_path, role: MemoryStore(db_path, check_same_thread=False, role=role)
+)
 
 
 def _load_provider_options() -> list[str]:
@@ -81,11 +98,15 @@ class ViewerHandler(BaseHTTPRequestHandler):
         try:
             body, content_type = viewer_assets.get_static_asset_bytes(asset_path)
         except (FileNotFoundError, ValueError):
-            self.send_response(404)
-            self.end_headers()
+            self._send_empty(404)
             return
         send_bytes_response(self, body, content_type=content_type)
 
+    def _send_empty(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
     def _read_json(self) -> dict[str, Any] | None:
         return read_json_body(self)
 
@@ -107,25 +128,36 @@ class ViewerHandler(BaseHTTPRequestHandler):
             return
 
         is_api = parsed.path.startswith("/api/")
-        store: MemoryStore | None = None
         try:
-            store = MemoryStore(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
-            if viewer_routes_stats.handle_get(self, store, parsed.path, parsed.query):
-                return
-            if viewer_routes_raw_events.handle_get(self, store, parsed.path, parsed.query):
-                return
-            if viewer_routes_memory.handle_get(self, store, parsed.path, parsed.query):
-                return
-            if viewer_routes_config.handle_get(
+            if viewer_routes_stats.handle_snapshot_get(
                 self,
-                path=parsed.path,
-                load_provider_options=_load_provider_options,
+                parsed.path,
+                db_path=os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH,
+                open_store=VIEWER_STORE_POOL.reader,
             ):
                 return
-            if viewer_routes_sync.handle_get(self, store, parsed.path, parsed.query):
-                return
-            self.send_response(404)
-            self.end_headers()
+            with VIEWER_STORE_POOL.reader() as store:
+                if viewer_routes_stats.handle_get(self, store, parsed.path, parsed.query):
+                    return
+                if viewer_routes_raw_events.handle_get(
+                    self,
+                    store,
+                    parsed.path,
+                    parsed.query,
+                    flush_metrics=RAW_EVENT_SWEEPER.flush_metrics,
+                ):
+                    return
+                if viewer_routes_memory.handle_get(self, store, parsed.path, parsed.query):
+                    return
+                if viewer_routes_config.handle_get(
+                    self,
+                    path=parsed.path,
+                    load_provider_options=_load_provider_options,
+                ):
+                    return
+                if viewer_routes_sync.handle_get(self, store, parsed.path, parsed.query):
+                    return
+            self._send_empty(404)
         except Exception as exc:  # pragma: no cover
             if is_api:
                 payload: dict[str, Any] = {"error": "internal server error"}
@@ -133,11 +165,7 @@ class ViewerHandler(BaseHTTPRequestHandler):
                     payload["detail"] = str(exc)
                 self._send_json(payload, status=500)
                 return
-            self.send_response(500)
-            self.end_headers()
-        finally:
-            if store is not None:
-                store.close()
+            self._send_empty(500)
 
     def do_POST(self) -> None:  # noqa: N802
         parsed = urlparse(self.path)
@@ -146,25 +174,28 @@ class ViewerHandler(BaseHTTPRequestHandler):
             "/api/sync/actions/sync-now",
             "/api/sync/run",
         }
+        # Only raw-event ingest is kept alive; other routes may answer before reading the body.
+        if parsed.path != "/api/raw-events":
+            self.close_connection = True
         if parsed.path in strict_paths:
-            if self._reject_cross_origin(missing_origin_policy="reject"):
-                return
-        elif self._reject_cross_origin(missing_origin_policy="reject_if_unsafe"):
+            rejected = self._reject_cross_origin(missing_origin_policy="reject")
+        else:
+            rejected = self._reject_cross_origin(missing_origin_policy="reject_if_unsafe")
+        if rejected:
+            self.close_connection = True
             return
         if parsed.path in strict_paths:
             payload = self._read_json()
             if parsed.path == "/api/sync/actions/sync-now" and payload is None:
                 payload = {}
-            store = MemoryStore(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
-            try:
+            # Sync runs are network-bound; keep them off the writer so ingest is not blocked.
+            with VIEWER_STORE_POOL.reader() as store:
                 if viewer_routes_sync.handle_post(self, store, parsed.path, payload):
                     return
-            finally:
-                store.close()
         if viewer_routes_raw_events.handle_post(
             self,
             path=parsed.path,
-            store_factory=MemoryStore,
+            store_factory=VIEWER_STORE_POOL.writer_lease,
             default_db_path=str(DEFAULT_DB_PATH),
             flusher=RAW_EVENT_FLUSHER,
             strip_private_obj=_strip_private_obj,
@@ -176,28 +207,34 @@ class ViewerHandler(BaseHTTPRequestHandler):
             path=parsed.path,
             load_provider_options=_load_provider_options,
         ):
+            # Pooled stores read config once at open; pick up the new settings.
+            VIEWER_STORE_POOL.reset()
             return
 
-        self.send_response(404)
-        self.end_headers()
+        self._send_empty(404)
 
     def do_DELETE(self) -> None:  # noqa: N802
         parsed = urlparse(self.path)
+        self.close_connection = True
         if self._reject_cross_origin(missing_origin_policy="reject"):
             return
-        store = MemoryStore(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
-        try:
+        with VIEWER_STORE_POOL.writer() as store:
             if viewer_routes_sync.handle_delete(self, store, parsed.path):
                 return
-            self.send_response(404)
-            self.end_headers()
-        finally:
-            store.close()
+        self._send_empty(404)
+
+
+class _KeepAliveViewerHandler(ViewerHandler):
+    # HTTP/1.1 lets the plugin keep its raw-event connection open between batches. Only
+    # safe behind the threading server: an idle kept-alive socket would otherwise stall it.
+    protocol_version = "HTTP/1.1"
 
 
 def _serve(host: str, port: int) -> None:
     RAW_EVENT_SWEEPER.start()
-    server = HTTPServer((host, port), ViewerHandler)
+    VECTOR_INDEX_WORKER.start()
+    threading.Thread(target=_warm_embedding_client, daemon=True).start()
+    server = ThreadingHTTPServer((host, port), _KeepAliveViewerHandler)
     server.serve_forever()
 
 
@@ -6,6 +6,9 @@ from http.server import BaseHTTPRequestHandler
 from typing import Any, Literal
 from urllib.parse import urlparse
 
+DEFAULT_VIEWER_HOST = "127.0.0.1"
+DEFAULT_VIEWER_PORT = 38888
+
 _ALLOWED_ORIGIN_HOSTS = {"127.0.0.1", "localhost", "::1"}
 
 
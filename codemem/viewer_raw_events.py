@@ -6,13 +6,20 @@ import os
 import sys
 import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
 
+from .config import load_config
 from .db import DEFAULT_DB_PATH
 from .raw_event_flush import flush_raw_events
 from .store import MemoryStore
 
 logger = logging.getLogger(__name__)
 
+# Recent samples kept per RawEventFlushPool timing.
+TIMING_SAMPLES = 256
+
 
 class RawEventAutoFlusher:
     def __init__(self) -> None:
@@ -79,10 +86,125 @@ class RawEventAutoFlusher:
 RAW_EVENT_FLUSHER = RawEventAutoFlusher()
 
 
+class RawEventFlushPool:
+    """Bounded thread pool for raw-event flushes.
+
+    At most ``workers`` flushes run at once and at most one per session; submitting a
+    session that is already in flight is a no-op. With ``rate_per_minute`` set, flush
+    starts for the same observer provider are spaced ``60 / rate_per_minute`` seconds
+    apart. ``metrics()`` reports queue wait (submit to start, rate-limit wait included)
+    and flush duration.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        *,
+        rate_per_minute: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._workers = max(1, workers)
+        self._rate_per_minute = max(0, rate_per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="codemem-flush"
+        )
+        self._lock = threading.Lock()
+        self._in_flight: set[str] = set()
+        self._next_start: dict[str, float] = {}
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "skipped_in_flight": 0}
+        self._timings: dict[str, list[float]] = {"queue_wait": [], "flush": []}
+
+    def submit(
+        self, opencode_session_id: str, provider: str, flush: Callable[[], Any]
+    ) -> Future[Any] | None:
+        with self._lock:
+            if opencode_session_id in self._in_flight:
+                self._counts["skipped_in_flight"] += 1
+                return None
+            self._in_flight.add(opencode_session_id)
+            self._counts["submitted"] += 1
+        return self._executor.submit(self._run, opencode_session_id, provider, flush, self._clock())
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "rate_per_minute": self._rate_per_minute,
+                "in_flight": len(self._in_flight),
+                **self._counts,
+                "queue_wait_ms": _timing_summary(self._timings["queue_wait"]),
+                "flush_ms": _timing_summary(self._timings["flush"]),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _run(
+        self, opencode_session_id: str, provider: str, flush: Callable[[], Any], queued_at: float
+    ) -> Any:
+        try:
+            self._wait_for_provider(provider)
+            started = self._clock()
+            self._observe("queue_wait", started - queued_at)
+            try:
+                result = flush()
+            except BaseException:
+                self._observe("flush", self._clock() - started, outcome="failed")
+                raise
+            self._observe("flush", self._clock() - started, outcome="completed")
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.discard(opencode_session_id)
+
+    def _wait_for_provider(self, provider: str) -> None:
+        if self._rate_per_minute <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_start.get(provider, now))
+            self._next_start[provider] = start + 60.0 / self._rate_per_minute
+        if start > now:
+            self._sleep(start - now)
+
+    def _observe(self, name: str, seconds: float, *, outcome: str | None = None) -> None:
+        with self._lock:
+            samples = self._timings[name]
+            samples.append(seconds * 1000)
+            del samples[:-TIMING_SAMPLES]
+            if outcome is not None:
+                self._counts[outcome] += 1
+
+
+def _timing_summary(samples: list[float]) -> dict[str, float | int]:
+    if not samples:
+        return {"count": 0, "last": 0.0, "avg": 0.0, "max": 0.0}
+    return {
+        "count": len(samples),
+        "last": round(samples[-1], 1),
+        "avg": round(sum(samples) / len(samples), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+def _observer_provider() -> str:
+    try:
+        provider = load_config().observer_provider
+    except Exception:
+        provider = None
+    return (provider or "default").strip().lower()
+
+
 class RawEventSweeper:
     def __init__(self) -> None:
         self._thread: threading.Thread | None = None
         self._stop = threading.Event()
+        self._last_maintenance = time.monotonic()
+        self._pool: RawEventFlushPool | None = None
+        self._pool_lock = threading.Lock()
 
     def enabled(self) -> bool:
         value = (os.environ.get("CODEMEM_RAW_EVENTS_SWEEPER") or "1").strip().lower()
@@ -119,6 +241,32 @@ class RawEventSweeper:
             return None
         return parsed
 
+    def workers(self) -> int:
+        value = os.environ.get("CODEMEM_RAW_EVENTS_SWEEPER_WORKERS", "4")
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 4
+
+    def provider_rate_per_minute(self) -> int:
+        value = os.environ.get("CODEMEM_RAW_EVENTS_PROVIDER_RATE_PER_MINUTE", "0")
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return 0
+
+    def flush_pool(self) -> RawEventFlushPool:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = RawEventFlushPool(
+                    self.workers(), rate_per_minute=self.provider_rate_per_minute()
+                )
+            return self._pool
+
+    def flush_metrics(self) -> dict[str, Any] | None:
+        with self._pool_lock:
+            return self._pool.metrics() if self._pool is not None else None
+
     def retention_ms(self) -> int:
         value = os.environ.get("CODEMEM_RAW_EVENTS_RETENTION_MS", "0")
         try:
@@ -126,6 +274,20 @@ class RawEventSweeper:
         except (TypeError, ValueError):
             return 0
 
+    def purge_batch_rows(self) -> int:
+        value = os.environ.get("CODEMEM_RAW_EVENTS_PURGE_BATCH_ROWS", "5000")
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 5000
+
+    def purge_vacuum_pages(self) -> int:
+        value = os.environ.get("CODEMEM_RAW_EVENTS_PURGE_VACUUM_PAGES", "0")
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            return 0
+
     def stuck_batch_ms(self) -> int:
         value = os.environ.get("CODEMEM_RAW_EVENTS_STUCK_BATCH_MS", "300000")
         try:
@@ -133,16 +295,106 @@ class RawEventSweeper:
         except (TypeError, ValueError):
             return 300000
 
+    def maintenance_interval_ms(self) -> int:
+        value = os.environ.get("CODEMEM_DB_MAINTENANCE_INTERVAL_MS", "3600000")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 3600000
+
+    def _maintain_if_idle(self, store: MemoryStore) -> None:
+        # Only on ticks with no flush work, so the WAL checkpoint does not compete with ingest.
+        interval_ms = self.maintenance_interval_ms()
+        if interval_ms <= 0:
+            return
+        if (time.monotonic() - self._last_maintenance) * 1000 < interval_ms:
+            return
+        self._last_maintenance = time.monotonic()
+        try:
+            steps = store.maintain_database(fts_mode="merge")
+        except Exception as exc:
+            logger.exception("database maintenance failed", exc_info=exc)
+            if not logging.getLogger().hasHandlers():
+                print(f"codemem: database maintenance failed: {exc}", file=sys.stderr)
+            return
+        logger.info(
+            "database maintenance: %s",
+            ", ".join(f"{step['step']} {step['seconds'] * 1000:.0f}ms" for step in steps),
+        )
+
+    def _flush_sessions(
+        self,
+        store: MemoryStore,
+        session_ids: list[str],
+        *,
+        max_events: int | None,
+        label: str,
+    ) -> set[str]:
+        """Flush sessions on the worker pool and wait; returns the ones that succeeded."""
+        pool = self.flush_pool()
+        provider = _observer_provider()
+        futures: list[tuple[str, Future[Any]]] = []
+        for opencode_session_id in session_ids:
+            future = pool.submit(
+                opencode_session_id,
+                provider,
+                lambda session_id=opencode_session_id: flush_raw_events(
+                    store,
+                    opencode_session_id=session_id,
+                    cwd=None,
+                    project=None,
+                    started_at=None,
+                    max_events=max_events,
+                ),
+            )
+            if future is not None:
+                futures.append((opencode_session_id, future))
+        flushed: set[str] = set()
+        for opencode_session_id, future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                # Never silently swallow flush failures: they can cause the backlog to grow
+                # indefinitely and mask observer/auth issues.
+                logger.exception(
+                    "%s flush failed",
+                    label,
+                    extra={"opencode_session_id": opencode_session_id},
+                    exc_info=exc,
+                )
+                if not logging.getLogger().hasHandlers():
+                    print(
+                        f"codemem: {label} flush failed for {opencode_session_id}: {exc}",
+                        file=sys.stderr,
+                    )
+                continue
+            flushed.add(opencode_session_id)
+        return flushed
+
     def tick(self) -> None:
         if not self.enabled():
             return
         now_ms = int(time.time() * 1000)
         idle_before = now_ms - self.idle_ms()
-        store = MemoryStore(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
+        # One writer connection for the whole tick. Flush workers share it through
+        # flush_raw_events' RawEventFlushWriter; the tick's own queries run while no
+        # worker is busy, since _flush_sessions waits for its flushes.
+        store = MemoryStore(
+            os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH, check_same_thread=False
+        )
         try:
             retention_ms = self.retention_ms()
             if retention_ms > 0:
-                store.purge_raw_events(retention_ms)
+                pruned = store.prune_raw_events(
+                    retention_ms,
+                    batch_rows=self.purge_batch_rows(),
+                    vacuum_pages=self.purge_vacuum_pages(),
+                )
+                if pruned.get("raw_events"):
+                    logger.info(
+                        "raw event retention purge: %s",
+                        ", ".join(f"{key} {value}" for key, value in pruned.items()),
+                    )
 
             stuck_ms = self.stuck_batch_ms()
             if stuck_ms > 0:
@@ -153,62 +405,27 @@ class RawEventSweeper:
                 )
 
             max_events = self.worker_max_events()
-            drained: set[str] = set()
             queue_session_ids = store.raw_event_sessions_with_pending_queue(limit=self.limit())
-            for opencode_session_id in queue_session_ids:
-                try:
-                    flush_raw_events(
-                        store,
-                        opencode_session_id=opencode_session_id,
-                        cwd=None,
-                        project=None,
-                        started_at=None,
-                        max_events=max_events,
-                    )
-                    drained.add(opencode_session_id)
-                except Exception as exc:
-                    logger.exception(
-                        "raw event queue worker flush failed",
-                        extra={"opencode_session_id": opencode_session_id},
-                        exc_info=exc,
-                    )
-                    if not logging.getLogger().hasHandlers():
-                        print(
-                            f"codemem: raw event queue worker flush failed for {opencode_session_id}: {exc}",
-                            file=sys.stderr,
-                        )
-                    continue
+            drained = self._flush_sessions(
+                store,
+                queue_session_ids,
+                max_events=max_events,
+                label="raw event queue worker",
+            )
 
             session_ids = store.raw_event_sessions_pending_idle_flush(
                 idle_before_ts_wall_ms=idle_before,
                 limit=self.limit(),
             )
-            for opencode_session_id in session_ids:
-                if opencode_session_id in drained:
-                    continue
-                try:
-                    flush_raw_events(
-                        store,
-                        opencode_session_id=opencode_session_id,
-                        cwd=None,
-                        project=None,
-                        started_at=None,
-                        max_events=max_events,
-                    )
-                except Exception as exc:
-                    # Never silently swallow flush failures: they can cause the backlog to grow
-                    # indefinitely and mask observer/auth issues.
-                    logger.exception(
-                        "raw event sweeper flush failed",
-                        extra={"opencode_session_id": opencode_session_id},
-                        exc_info=exc,
-                    )
-                    if not logging.getLogger().hasHandlers():
-                        print(
-                            f"codemem: raw event sweeper flush failed for {opencode_session_id}: {exc}",
-                            file=sys.stderr,
-                        )
-                    continue
+            self._flush_sessions(
+                store,
+                [session_id for session_id in session_ids if session_id not in drained],
+                max_events=max_events,
+                label="raw event sweeper",
+            )
+
+            if not queue_session_ids and not session_ids:
+                self._maintain_if_idle(store)
         finally:
             store.close()
 
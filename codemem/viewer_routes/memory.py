@@ -6,6 +6,7 @@ from urllib.parse import parse_qs
 from ..config import load_config
 from ..db import from_json
 from ..store import MemoryStore
+from ..utils import resolve_project
 
 
 class _ViewerHandler(Protocol):
@@ -194,6 +195,9 @@ def handle_get(handler: _ViewerHandler, store: MemoryStore, path: str, query: st
                 handler._send_json({"error": "token_budget must be int"}, status=400)
                 return True
         project = params.get("project", [None])[0]
+        cwd = params.get("cwd", [None])[0]
+        if not project and cwd:
+            project = resolve_project(cwd)
         pack_filters = {"project": project} if project else None
         pack = store.build_memory_pack(
             context=context,
@@ -26,6 +26,7 @@ logger = logging.getLogger(__name__)
 class _ViewerHandler(Protocol):
     headers: Any
     rfile: Any
+    close_connection: bool
 
     def _send_json(self, payload: dict[str, Any], status: int = 200) -> None: ...
 
@@ -58,7 +59,14 @@ class _Store(Protocol):
     def close(self) -> None: ...
 
 
-def handle_get(handler: Any, store: Any, path: str, query: str) -> bool:
+def handle_get(
+    handler: Any,
+    store: Any,
+    path: str,
+    query: str,
+    *,
+    flush_metrics: Callable[[], dict[str, Any] | None] | None = None,
+) -> bool:
     if path != "/api/raw-events":
         if path != "/api/raw-events/status":
             return False
@@ -68,17 +76,19 @@ def handle_get(handler: Any, store: Any, path: str, query: str) -> bool:
         except (TypeError, ValueError):
             handler._send_json({"error": "limit must be int"}, status=400)
             return True
-        handler._send_json(
-            {
-                "items": store.raw_event_backlog(limit=limit),
-                "totals": store.raw_event_backlog_totals(),
-                "ingest": {
-                    "available": True,
-                    "mode": "stream_queue",
-                    "max_body_bytes": MAX_RAW_EVENTS_BODY_BYTES,
-                },
-            }
-        )
+        payload: dict[str, Any] = {
+            "items": store.raw_event_backlog(limit=limit),
+            "totals": store.raw_event_backlog_totals(),
+            "ingest": {
+                "available": True,
+                "mode": "stream_queue",
+                "max_body_bytes": MAX_RAW_EVENTS_BODY_BYTES,
+            },
+        }
+        pool_metrics = flush_metrics() if flush_metrics is not None else None
+        if pool_metrics is not None:
+            payload["flush_pool"] = pool_metrics
+        handler._send_json(payload)
         return True
     # Compatibility endpoint used by the web UI stats panel.
     _ = parse_qs(query)
@@ -101,12 +111,16 @@ def handle_post(
     try:
         length = int(handler.headers.get("Content-Length", "0") or 0)
     except (TypeError, ValueError):
+        handler.close_connection = True
         handler._send_json({"error": "invalid content-length"}, status=400)
         return True
     if length < 0:
+        handler.close_connection = True
         handler._send_json({"error": "invalid content-length"}, status=400)
         return True
     if length > MAX_RAW_EVENTS_BODY_BYTES:
+        # The body is left unread, so the connection cannot be reused.
+        handler.close_connection = True
         handler._send_json(
             {
                 "error": "payload too large",
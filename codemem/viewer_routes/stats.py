@@ -1,20 +1,28 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import Any, Protocol
 from urllib.parse import parse_qs
 
 from ..store import MemoryStore
+from ..viewer_stats import STATS_SNAPSHOT, StoreOpener
 
 
 class _ViewerHandler(Protocol):
     def _send_json(self, payload: dict[str, Any], status: int = 200) -> None: ...
 
 
-def handle_get(handler: _ViewerHandler, store: MemoryStore, path: str, query: str) -> bool:
+def handle_snapshot_get(
+    handler: _ViewerHandler, path: str, *, db_path: Path | str, open_store: StoreOpener
+) -> bool:
+    """Serve routes answered from a cached snapshot, before any store is checked out."""
     if path == "/api/stats":
-        handler._send_json(store.stats())
+        handler._send_json(STATS_SNAPSHOT.get(db_path, open_store))
         return True
+    return False
 
+
+def handle_get(handler: _ViewerHandler, store: MemoryStore, path: str, query: str) -> bool:
     if path == "/api/usage":
         params = parse_qs(query)
         project_filter = params.get("project", [None])[0]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from pathlib import Path
+from typing import Any
+
+from .store import MemoryStore
+
+StoreOpener = Callable[[], AbstractContextManager[MemoryStore]]
+
+logger = logging.getLogger(__name__)
+
+
+class StatsSnapshot:
+    """Serves /api/stats from a cached snapshot that refreshes in the background.
+
+    The first request for a database computes stats inline; afterwards a snapshot older
+    than the TTL is still served while a worker thread recomputes it, so viewer polls never
+    wait on the full-table counts. ``open_store`` is only entered when stats are computed,
+    so a cached request never checks out a store.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, tuple[dict[str, Any], float]] = {}
+        self._refreshing: set[str] = set()
+
+    def ttl_s(self) -> float:
+        value = os.environ.get("CODEMEM_STATS_TTL_S", "10")
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 10.0
+
+    def get(self, db_path: Path | str, open_store: StoreOpener) -> dict[str, Any]:
+        key = str(Path(db_path).expanduser())
+        ttl_s = self.ttl_s()
+        with self._lock:
+            cached = self._snapshots.get(key)
+        if cached is None or ttl_s <= 0:
+            return self._compute(key, open_store)
+        payload, computed_at = cached
+        if time.monotonic() - computed_at >= ttl_s:
+            self._refresh_in_background(key, open_store)
+        return payload
+
+    def _compute(self, key: str, open_store: StoreOpener) -> dict[str, Any]:
+        with open_store() as store:
+            payload = store.stats()
+        payload["as_of"] = dt.datetime.now(dt.UTC).isoformat()
+        with self._lock:
+            self._snapshots[key] = (payload, time.monotonic())
+        return payload
+
+    def _refresh_in_background(self, key: str, open_store: StoreOpener) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, open_store), daemon=True).start()
+
+    def _refresh(self, key: str, open_store: StoreOpener) -> None:
+        try:
+            self._compute(key, open_store)
+        except Exception as exc:
+            logger.exception("stats snapshot refresh failed", exc_info=exc)
+            if not logging.getLogger().hasHandlers():
+                print(f"codemem: stats snapshot refresh failed: {exc}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+STATS_SNAPSHOT = StatsSnapshot()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from .db import DEFAULT_DB_PATH
+from .store import MemoryStore
+
+
+def _pool_size() -> int:
+    value = os.environ.get("CODEMEM_VIEWER_READ_POOL_SIZE", "4")
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 4
+
+
+def _open_store(db_path: str, role: str) -> MemoryStore:
+    return MemoryStore(db_path, check_same_thread=False, role=role)
+
+
+class _StoreLease:
+    """MemoryStore stand-in whose close() hands the store back to the pool."""
+
+    def __init__(self, store: MemoryStore, release: Any) -> None:
+        self._store = store
+        self._release = release
+
+    def close(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._store, name)
+
+
+class ViewerStorePool:
+    """Pre-initialized MemoryStores shared by the viewer's request threads.
+
+    Request handlers check out one of up to ``CODEMEM_VIEWER_READ_POOL_SIZE`` reader stores
+    instead of opening (and migrating) a fresh database per request. Raw-event ingest goes
+    through a single writer store behind a lock, so plugin POSTs never queue behind a slow
+    read. ``store_factory(db_path, role)`` opens readers with the ``"reader"`` connection
+    profile and the writer with ``"writer"``. Stores are rebuilt when ``CODEMEM_DB`` changes
+    or after ``reset()``.
+    """
+
+    def __init__(
+        self,
+        store_factory: Callable[[str, str], MemoryStore] | None = None,
+        *,
+        size: int | None = None,
+    ) -> None:
+        self._store_factory = store_factory or _open_store
+        self._size = size or _pool_size()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._size)
+        self._writer_lock = threading.Lock()
+        self._db_path: str | None = None
+        self._generation = 0
+        self._idle: list[MemoryStore] = []
+        self._writer: MemoryStore | None = None
+        self._writer_generation = -1
+
+    @contextmanager
+    def reader(self) -> Iterator[MemoryStore]:
+        db_path = str(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
+        with self._slots:
+            with self._lock:
+                self._use_db_path_locked(db_path)
+                generation = self._generation
+                store = self._idle.pop() if self._idle else None
+            if store is None:
+                store = self._store_factory(db_path, "reader")
+            try:
+                yield store
+            finally:
+                self._return_reader(store, generation)
+
+    @contextmanager
+    def writer(self) -> Iterator[MemoryStore]:
+        store = self.acquire_writer()
+        try:
+            yield store
+        finally:
+            self.release_writer()
+
+    def acquire_writer(self) -> MemoryStore:
+        db_path = str(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
+        self._writer_lock.acquire()
+        try:
+            with self._lock:
+                self._use_db_path_locked(db_path)
+                generation = self._generation
+            if self._writer is None or self._writer_generation != generation:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+                self._writer = self._store_factory(db_path, "writer")
+                self._writer_generation = generation
+            return self._writer
+        except BaseException:
+            self._writer_lock.release()
+            raise
+
+    def release_writer(self) -> None:
+        try:
+            if self._writer is not None:
+                self._settle(self._writer)
+        except sqlite3.Error:
+            self._writer.close()
+            self._writer = None
+        finally:
+            self._writer_lock.release()
+
+    def writer_lease(self, _db_path: str | None = None) -> _StoreLease:
+        """Store factory for routes that close() the store they are given."""
+        return _StoreLease(self.acquire_writer(), self.release_writer)
+
+    def reset(self) -> None:
+        """Drop pooled stores so the next request reopens them (e.g. after a config change)."""
+        with self._lock:
+            self._generation += 1
+            self._close_idle_locked()
+
+    def close(self) -> None:
+        self.reset()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+
+    def _use_db_path_locked(self, db_path: str) -> None:
+        if self._db_path != db_path:
+            self._db_path = db_path
+            self._generation += 1
+            self._close_idle_locked()
+
+    def _close_idle_locked(self) -> None:
+        idle, self._idle = self._idle, []
+        for store in idle:
+            store.close()
+
+    def _return_reader(self, store: MemoryStore, generation: int) -> None:
+        try:
+            self._settle(store)
+        except sqlite3.Error:
+            store.close()
+            return
+        with self._lock:
+            if generation == self._generation and len(self._idle) < self._size:
+                self._idle.append(store)
+                return
+        store.close()
+
+    @staticmethod
+    def _settle(store: MemoryStore) -> None:
+        # Hand the store back clean: no half-finished transaction, no buffered usage rows.
+        if store.conn.in_transaction:
+            store.conn.rollback()
+        store.flush_usage()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+
+from .db import DEFAULT_DB_PATH
+from .semantic import embeddings_disabled
+from .store import MemoryStore
+from .store.vectors import set_vector_index_async_default, vector_index_async_override
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndexWorker:
+    """Drains vector_index_queue so memory writes never wait on embedding."""
+
+    def __init__(self) -> None:
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def enabled(self) -> bool:
+        if embeddings_disabled() or vector_index_async_override() is False:
+            return False
+        value = (os.environ.get("CODEMEM_VECTOR_INDEXER") or "1").strip().lower()
+        return value not in {"0", "false", "off"}
+
+    def interval_ms(self) -> int:
+        value = os.environ.get("CODEMEM_VECTOR_INDEXER_INTERVAL_MS", "2000")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 2000
+
+    def limit(self) -> int:
+        value = os.environ.get("CODEMEM_VECTOR_INDEXER_LIMIT", "200")
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 200
+
+    def tick(self) -> int:
+        if not self.enabled():
+            return 0
+        limit = self.limit()
+        indexed = 0
+        store = MemoryStore(os.environ.get("CODEMEM_DB") or DEFAULT_DB_PATH)
+        try:
+            while not self._stop.is_set():
+                result = store.index_pending_vectors(limit=limit)
+                indexed += result["indexed"]
+                if result["indexed"] < limit:
+                    break
+        except Exception as exc:
+            logger.exception("vector index worker failed", exc_info=exc)
+            if not logging.getLogger().hasHandlers():
+                print(f"codemem: vector index worker failed: {exc}", file=sys.stderr)
+        finally:
+            store.close()
+        return indexed
+
+    def start(self) -> None:
+        if not self.enabled():
+            return
+        if self._thread is not None:
+            return
+        # This process now drains the queue, so its writes can stop embedding inline.
+        set_vector_index_async_default(True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        interval_ms = max(250, self.interval_ms())
+        while not self._stop.wait(interval_ms / 1000.0):
+            self.tick()
+
+
+VECTOR_INDEX_WORKER = VectorIndexWorker()
@@ -4,8 +4,22 @@ from pathlib import Path
 
 import pytest
 
+from codemem import semantic
+from codemem.store import vectors
+
 
 @pytest.fixture(autouse=True)
 def _isolate_sync_keys_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
     keys_dir = tmp_path / "keys"
     monkeypatch.setenv("CODEMEM_KEYS_DIR", str(keys_dir))
+
+
+@pytest.fixture(autouse=True)
+def _isolate_query_embedding_cache() -> None:
+    semantic.clear_query_cache()
+
+
+@pytest.fixture(autouse=True)
+def _isolate_vector_index_async_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    # A viewer started by one test flips the process-wide default to queued indexing.
+    monkeypatch.setattr(vectors, "_VECTOR_INDEX_ASYNC_DEFAULT", False)
@@ -1,3 +1,7 @@
+import subprocess
+import sys
+import time
+
 from typer.testing import CliRunner
 
 from codemem.cli import app
@@ -27,3 +31,42 @@ def test_db_help_shows_prune_commands() -> None:
     assert "prune-observations" in result.stdout
     assert "prune-memories" in result.stdout
     assert "normalize-projects" in result.stdout
+
+
+# Modules that `codemem version` must not load; commands import them on demand.
+HEAVY_CLI_MODULES = (
+    "codemem.store",
+    "codemem.viewer",
+    "codemem.summarizer",
+    "codemem.sync.sync_pass",
+    "sqlite_vec",
+    "numpy",
+    "fastembed",
+    "openai",
+    "mcp",
+    "zeroconf",
+)
+# Generous wall-clock ceiling for a full `codemem version` process (seconds).
+CLI_VERSION_BUDGET_S = 5.0
+
+
+def test_cli_version_startup_stays_lightweight() -> None:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "codemem.cli", "version"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed_s = time.perf_counter() - started
+    imported: set[str] = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        imported.add(line.rsplit("|", 1)[1].strip())
+    assert result.stdout.strip()
+    assert "codemem.cli_app" in imported
+    assert [name for name in HEAVY_CLI_MODULES if name in imported] == []
+    # `version` lives in cli_app itself; command modules load only when dispatched to.
+    assert sorted(name for name in imported if name.startswith("codemem.commands.")) == []
+    assert elapsed_s < CLI_VERSION_BUDGET_S
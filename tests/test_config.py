@@ -240,3 +240,18 @@ def test_load_config_clamps_hybrid_shadow_sample_rate(
     cfg = load_config(config_path)
 
     assert cfg.hybrid_retrieval_shadow_sample_rate == 1.0
+
+
+def test_load_config_rejects_unknown_hybrid_fusion(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    config_path = tmp_path / "config.json"
+    config_path.write_text('{"hybrid_retrieval_fusion": "Weighted"}\n')
+
+    assert load_config(config_path).hybrid_retrieval_fusion == "weighted"
+
+    monkeypatch.setenv("CODEMEM_HYBRID_RETRIEVAL_FUSION", "borda")
+    with pytest.warns(RuntimeWarning, match="hybrid_retrieval_fusion"):
+        cfg = load_config(config_path)
+
+    assert cfg.hybrid_retrieval_fusion == "weighted"
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import datetime as dt
+import sqlite3
 from pathlib import Path
 
+import pytest
+
 from codemem import db
+from codemem.store import MemoryStore
+from codemem.store import usage as store_usage
+from codemem.store.utils import project_key
 
 
 def test_initialize_schema_sets_user_version(monkeypatch, tmp_path: Path) -> None:
@@ -34,9 +41,7 @@ def test_initialize_schema_sets_user_version(monkeypatch, tmp_path: Path) -> Non
     assert attempt_column is not None
 
 
-def test_initialize_schema_skips_reinit_but_keeps_kind_normalization(
-    monkeypatch, tmp_path: Path
-) -> None:
+def test_initialize_schema_runs_only_pending_migrations(monkeypatch, tmp_path: Path) -> None:
     monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
     conn = db.connect(tmp_path / "mem.sqlite")
     try:
@@ -57,6 +62,8 @@ def test_initialize_schema_skips_reinit_but_keeps_kind_normalization(
             """,
             (session_id, "project", "t", "b", "2026-01-01T00:00:00Z", "2026-01-01T00:00:00Z"),
         )
+        # Databases from before numbered migrations are all at version 1.
+        conn.execute("PRAGMA user_version = 1")
         conn.commit()
 
         def _unexpected_reinit(_conn):
@@ -64,11 +71,456 @@ def test_initialize_schema_skips_reinit_but_keeps_kind_normalization(
                 "initialize_schema should not rerun full migration at current version"
             )
 
-        monkeypatch.setattr(db, "_initialize_schema_v1", _unexpected_reinit)
+        monkeypatch.setattr(db, "MIGRATIONS", (_unexpected_reinit, *db.MIGRATIONS[1:]))
         db.initialize_schema(conn)
 
         kind = conn.execute("SELECT kind FROM memory_items LIMIT 1").fetchone()[0]
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
     finally:
         conn.close()
 
     assert kind == "decision"
+    assert version == db.SCHEMA_VERSION
+
+
+def test_migration_that_fails_halfway_is_redone_whole(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    conn = db.connect(tmp_path / "mem.sqlite")
+    try:
+        db.initialize_schema(conn)
+        conn.execute(
+            """
+            INSERT INTO sessions(started_at, cwd, project, user, tool_version)
+            VALUES ('2026-01-01T00:00:00Z', '/tmp', 'proj', 'me', 'test')
+            """
+        )
+        conn.commit()
+        interrupt = True
+
+        def add_and_backfill(conn) -> None:
+            db._ensure_column(conn, "sessions", "backfilled", "INTEGER")
+            if interrupt:
+                raise sqlite3.OperationalError("database is locked")
+            conn.execute("UPDATE sessions SET backfilled = 1")
+
+        monkeypatch.setattr(db, "MIGRATIONS", (*db.MIGRATIONS, add_and_backfill))
+        with pytest.raises(sqlite3.OperationalError):
+            db._run_migrations(conn)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        assert "backfilled" not in columns
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+        interrupt = False
+        db._run_migrations(conn)
+        backfilled = conn.execute("SELECT backfilled FROM sessions").fetchone()[0]
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+    assert backfilled == 1
+    assert version == db.SCHEMA_VERSION + 1
+
+
+def test_initialize_schema_reads_only_user_version_once_verified(
+    monkeypatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    db_path = tmp_path / "mem.sqlite"
+    MemoryStore(db_path).close()
+    conn = db.connect(db_path)
+    statements: list[str] = []
+    try:
+        conn.set_trace_callback(statements.append)
+        db.initialize_schema(conn, db_path)
+    finally:
+        conn.close()
+
+    assert statements == ["PRAGMA user_version"]
+
+
+def test_created_at_epoch_is_written_on_insert_and_backfilled(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session_id = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="me",
+            tool_version="test",
+            project="proj",
+        )
+        memory_id = store.remember(session_id, kind="note", title="t", body_text="b")
+        created_at = store.conn.execute(
+            "SELECT created_at FROM memory_items WHERE id = ?", (memory_id,)
+        ).fetchone()[0]
+        inserted = store.conn.execute(
+            "SELECT created_at_epoch FROM memory_items WHERE id = ?", (memory_id,)
+        ).fetchone()[0]
+        epoch_triggers = store.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%epoch%'"
+        ).fetchall()
+
+        # Simulate a database created before the column existed.
+        store.conn.execute("UPDATE memory_items SET created_at = ?", ("2026-01-02T00:00:00Z",))
+        store.conn.execute("DROP INDEX idx_memory_items_active_kind_epoch")
+        store.conn.execute("ALTER TABLE memory_items DROP COLUMN created_at_epoch")
+        store.conn.execute("PRAGMA user_version = 1")
+        store.conn.commit()
+        db.initialize_schema(store.conn)
+        backfilled = store.conn.execute("SELECT created_at_epoch FROM memory_items").fetchone()[0]
+        index = store.conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'idx_memory_items_active_kind_epoch'"
+        ).fetchone()
+    finally:
+        store.close()
+
+    assert inserted == int(dt.datetime.fromisoformat(created_at).timestamp())
+    assert epoch_triggers == []
+    assert backfilled == 1767312000
+    assert index is not None
+
+
+def test_project_key_tracks_session_project(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        projects = [
+            "/home/me/CodeMem",
+            "C:\\work\\codemem",
+            "\tCodemem \n",
+            "/srv/codemem/\t",
+            None,
+        ]
+        session_ids = [
+            store.start_session(
+                cwd="/tmp",
+                git_remote=None,
+                git_branch="main",
+                user="me",
+                tool_version="test",
+                project=project,
+            )
+            for project in projects
+        ]
+        memory_id = store.remember(session_ids[0], kind="note", title="t", body_text="body")
+        keys = [
+            row[0] for row in store.conn.execute("SELECT project_key FROM sessions ORDER BY id")
+        ]
+        sql_keys = [
+            row[0]
+            for row in store.conn.execute(
+                f"SELECT {db._project_key_sql('project')} FROM sessions ORDER BY id"
+            )
+        ]
+        inserted = store.conn.execute("SELECT project_key FROM memory_items").fetchone()[0]
+        filtered = [
+            item["id"] for item in store.recent(limit=5, filters={"project": " /x/CODEMEM\t"})
+        ]
+        same_row_triggers = store.conn.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'trigger' AND name LIKE '%project_key%' AND name NOT LIKE '%propagate'
+            """
+        ).fetchall()
+
+        store.conn.execute(
+            "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+            ("/home/me/Other", project_key("/home/me/Other"), session_ids[0]),
+        )
+        renamed = store.conn.execute("SELECT project_key FROM memory_items").fetchone()[0]
+    finally:
+        store.close()
+
+    assert keys == ["codemem", "codemem", "codemem", "codemem", None]
+    assert sql_keys == keys
+    assert inserted == "codemem"
+    assert filtered == [memory_id]
+    assert same_row_triggers == []
+    assert renamed == "other"
+
+
+def test_project_keys_are_case_folded_for_older_databases(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session_id = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="me",
+            tool_version="test",
+            project="/home/me/CodeMem",
+        )
+        store.remember(session_id, kind="note", title="t", body_text="body")
+        # Simulate keys written by the case-sensitive triggers of older databases.
+        store.conn.execute("UPDATE sessions SET project_key = 'CodeMem'")
+        store.conn.execute(
+            """
+            CREATE TRIGGER sessions_project_key_ai AFTER INSERT ON sessions BEGIN
+                SELECT 1;
+            END
+            """
+        )
+        store.conn.execute("PRAGMA user_version = 1")
+        store.conn.commit()
+        db.initialize_schema(store.conn)
+        session_key = store.conn.execute("SELECT project_key FROM sessions").fetchone()[0]
+        memory_key = store.conn.execute("SELECT project_key FROM memory_items").fetchone()[0]
+        legacy = store.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sessions_project_key_ai'"
+        ).fetchone()
+    finally:
+        store.close()
+
+    assert session_key == "codemem"
+    assert memory_key == "codemem"
+    assert legacy is None
+
+
+def test_usage_rollups_track_usage_event_writes(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    conn = store.conn
+
+    def rollups() -> list[tuple]:
+        return [
+            tuple(row)
+            for row in conn.execute(
+                """
+                SELECT event, project_key, events, tokens_read
+                FROM usage_event_rollups WHERE events > 0 ORDER BY event, project_key
+                """
+            )
+        ]
+
+    try:
+        session_id = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="me",
+            tool_version="test",
+            project="/home/me/codemem",
+        )
+        store.record_usage("search", session_id=session_id, tokens_read=10)
+        store.record_usage(
+            "pack", session_id=session_id, tokens_read=5, metadata={"project": "/srv/dotfiles"}
+        )
+        store.record_usage("pack", tokens_read=7)
+        store.flush_usage()
+        lifted = [
+            tuple(row)
+            for row in conn.execute("SELECT project, project_key FROM usage_events ORDER BY id")
+        ]
+        inserted = rollups()
+        same_row_triggers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'usage_events_project_%'"
+        ).fetchall()
+
+        conn.execute(
+            "UPDATE sessions SET project = ?, project_key = ? WHERE id = ?",
+            ("/home/me/renamed", "renamed", session_id),
+        )
+        pack_id = conn.execute(
+            "SELECT id FROM usage_events WHERE event = 'pack' AND session_id = ?", (session_id,)
+        ).fetchone()[0]
+        store_usage.update_usage_metadata(store, [('{"project": "codemem"}', pack_id)])
+        conn.execute("UPDATE usage_events SET tokens_read = 12 WHERE event = 'search'")
+        conn.execute("DELETE FROM usage_events WHERE session_id IS NULL")
+        updated = rollups()
+
+        # Simulate a database created before the rollups existed.
+        conn.execute("DROP TABLE usage_event_rollups")
+        for name in (
+            "usage_events_rollup_ai",
+            "usage_events_rollup_au",
+            "usage_events_rollup_ad",
+            "sessions_usage_project_key_propagate",
+        ):
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP INDEX idx_usage_events_event_project_key_created")
+        conn.execute("DROP INDEX idx_usage_events_event_project")
+        conn.execute("ALTER TABLE usage_events DROP COLUMN project_key")
+        conn.execute("ALTER TABLE usage_events DROP COLUMN project")
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        db.initialize_schema(conn)
+        backfilled = rollups()
+    finally:
+        store.close()
+
+    assert lifted == [(None, "codemem"), ("/srv/dotfiles", "dotfiles"), (None, "")]
+    assert inserted == [
+        ("pack", "", 1, 7),
+        ("pack", "dotfiles", 1, 5),
+        ("search", "codemem", 1, 10),
+    ]
+    assert same_row_triggers == []
+    assert updated == [("pack", "codemem", 1, 5), ("search", "renamed", 1, 12)]
+    assert backfilled == updated
+
+
+def test_discovery_rollups_track_memory_metadata(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    conn = db.connect(tmp_path / "mem.sqlite")
+
+    def snapshot() -> tuple[list[tuple], list[tuple]]:
+        totals = [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT session_id, tokens, ungrouped_tokens FROM memory_discovery_totals"
+            )
+        ]
+        groups = [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT session_id, discovery_group, tokens FROM memory_discovery_groups"
+            )
+        ]
+        return totals, groups
+
+    try:
+        db.initialize_schema(conn)
+        conn.execute("INSERT INTO sessions(id, started_at) VALUES (1, '2026-01-01T00:00:00Z')")
+        insert = """
+            INSERT INTO memory_items(session_id, kind, title, body_text, created_at, updated_at,
+                                     metadata_json)
+            VALUES (1, 'note', 't', 'b', '2026-01-01T00:00:00Z', '2026-01-01T00:00:00Z', ?)
+        """
+        conn.execute(insert, ('{"discovery_group": "g1", "discovery_tokens": 300}',))
+        conn.execute(insert, ('{"discovery_group": "g1", "discovery_tokens": 500}',))
+        conn.execute(insert, ('{"discovery_tokens": 40}',))
+        conn.execute(insert, ("not json",))
+        inserted = snapshot()
+
+        top_id = conn.execute(
+            "SELECT id FROM memory_items WHERE metadata_json LIKE '%500%'"
+        ).fetchone()[0]
+        conn.execute(
+            "UPDATE memory_items SET metadata_json = ? WHERE id = ?",
+            ('{"discovery_group": "g1", "discovery_tokens": 100}', top_id),
+        )
+        shrunk = snapshot()
+
+        conn.execute("DELETE FROM memory_items WHERE metadata_json LIKE '%300%'")
+        deleted = snapshot()
+    finally:
+        conn.close()
+
+    assert inserted == ([(1, 840, 40)], [(1, "g1", 500)])
+    assert shrunk == ([(1, 440, 40)], [(1, "g1", 300)])
+    assert deleted == ([(1, 140, 40)], [(1, "g1", 100)])
+
+
+def test_connect_applies_the_role_profile(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_SQLITE_MMAP_SIZE", "0")
+    defaults = db.connect(tmp_path / "mem.sqlite", role=None)
+    bulk = db.connect(tmp_path / "mem.sqlite", role="bulk")
+    try:
+        default_settings = db.connection_settings(defaults)
+        bulk_settings = db.connection_settings(bulk)
+    finally:
+        defaults.close()
+        bulk.close()
+
+    assert bulk_settings == db.connection_profile("bulk")
+    assert bulk_settings["mmap_size"] == 0
+    assert default_settings["cache_size"] != bulk_settings["cache_size"]
+
+
+def test_maintain_database_reports_fts_segments_and_wal(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session_id = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="me",
+            tool_version="test",
+            project="proj",
+        )
+        for index in range(5):
+            store.remember(session_id, kind="note", title=f"t{index}", body_text="body")
+        steps = {step["step"]: step for step in store.maintain_database(fts_mode="optimize")}
+    finally:
+        store.close()
+
+    fts = steps["fts_optimize:memory_fts"]
+    assert fts["before"] > 1
+    assert fts["after"] == 1
+    assert "optimize" in steps
+    assert steps["wal_checkpoint"]["after"] == 0
+
+
+def test_raw_event_session_counters_are_backfilled_and_indexed(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        # Simulate events stored before server-assigned seqs: no counter, no session row.
+        for seq in range(3):
+            store.conn.execute(
+                """
+                INSERT INTO raw_events(
+                    opencode_session_id, event_id, event_seq, event_type, ts_wall_ms,
+                    payload_json, created_at
+                ) VALUES ('legacy', ?, ?, 'user_prompt', 1, '{}', '2026-01-01T00:00:00Z')
+                """,
+                (f"evt-{seq}", seq),
+            )
+        store.conn.execute("DROP INDEX idx_raw_event_sessions_pending")
+        store.conn.execute("PRAGMA user_version = 1")
+        store.conn.commit()
+        db.initialize_schema(store.conn)
+
+        counter = store.conn.execute(
+            "SELECT last_received_event_seq FROM raw_event_sessions WHERE opencode_session_id = ?",
+            ("legacy",),
+        ).fetchone()[0]
+        pending = store.raw_event_backlog_totals()
+        plan = " ".join(
+            row[3]
+            for row in store.conn.execute(
+                """
+                EXPLAIN QUERY PLAN
+                SELECT opencode_session_id FROM raw_event_sessions
+                WHERE last_received_event_seq > last_flushed_event_seq
+                  AND last_seen_ts_wall_ms IS NOT NULL AND last_seen_ts_wall_ms <= ?
+                ORDER BY last_seen_ts_wall_ms ASC LIMIT ?
+                """,
+                (0, 25),
+            )
+        )
+    finally:
+        store.close()
+
+    assert counter == 2
+    assert pending == {"sessions": 1, "pending": 3}
+    assert "idx_raw_event_sessions_pending" in plan
+    assert "raw_events" not in plan.replace("raw_event_sessions", "")
+
+
+def test_raw_event_retention_purge_uses_wall_clock_index(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_EMBEDDING_DISABLED", "1")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        store.conn.execute("DROP INDEX idx_raw_events_ts_wall_ms")
+        store.conn.execute("PRAGMA user_version = 1")
+        store.conn.commit()
+        db.initialize_schema(store.conn)
+        plan = " ".join(
+            row[3]
+            for row in store.conn.execute(
+                """
+                EXPLAIN QUERY PLAN
+                SELECT rowid FROM raw_events
+                WHERE ts_wall_ms IS NOT NULL AND ts_wall_ms < ? LIMIT ?
+                """,
+                (0, 100),
+            )
+        )
+    finally:
+        store.close()
+
+    assert "idx_raw_events_ts_wall_ms" in plan
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from codemem.ingest.events import event_to_tool_event
+from codemem.ingest.extract import extract_events
+from codemem.ingest_sanitize import _strip_private
 
 
 def test_event_to_tool_event_handles_non_dict_args() -> None:
@@ -26,3 +28,53 @@ def test_event_to_tool_event_uses_cwd_from_dict_args() -> None:
     tool_event = event_to_tool_event(event, max_chars=200)
     assert tool_event is not None
     assert tool_event.cwd == "/tmp/work"
+
+
+def test_extract_events_collects_everything_in_one_pass() -> None:
+    events = [
+        {"type": "user_prompt", "prompt_text": " Fix it ", "prompt_number": 1, "event_seq": 4},
+        {
+            "type": "tool.execute.after",
+            "tool": "read",
+            "args": {"filePath": "a.py"},
+            "result": "x",
+            "timestamp_wall_ms": 300,
+            "event_seq": 5,
+        },
+        {"type": "tool.execute.after", "tool": "edit", "args": {"path": "b.py"}, "result": "ok"},
+        {"type": "tool.execute.after", "tool": "todowrite", "args": "nope"},
+        {"type": "assistant_message", "assistant_text": "Done <private>k</private>"},
+        {"type": "assistant_usage", "usage": {"input_tokens": 3, "output_tokens": 4}},
+        {"type": "assistant_usage", "usage": {}},
+        {"type": "user_prompt", "prompt_text": "", "timestamp_wall_ms": 100, "event_seq": 9},
+    ]
+
+    extracted = extract_events(iter(events), max_chars=200, strip_private=_strip_private)
+
+    assert extracted.event_count == len(events)
+    assert extracted.prompts == [{"prompt_text": "Fix it", "prompt_number": 1, "timestamp": None}]
+    # Low-signal tools (todowrite) are dropped; their events still count toward the session.
+    assert [(event.tool_name, event.tool_input) for event in extracted.tool_events] == [
+        ("read", {"filePath": "a.py"}),
+        ("edit", {"path": "b.py"}),
+    ]
+    assert extracted.assistant_messages == ["Done <private>k</private>"]
+    assert extracted.assistant_usage == [
+        {
+            "input_tokens": 3,
+            "output_tokens": 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "total_tokens": 7,
+        }
+    ]
+    assert extracted.transcript == "User: Fix it\n\nAssistant: Done"
+    assert extracted.session_context() == {
+        "first_prompt": "Fix it",
+        "prompt_count": 2,
+        "tool_count": 3,
+        "duration_ms": 200,
+        "files_modified": ["b.py"],
+        "files_read": ["a.py"],
+    }
+    assert (extracted.start_event_seq, extracted.end_event_seq) == (4, 9)
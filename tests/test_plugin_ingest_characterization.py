@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from types import SimpleNamespace
 from typing import Any
 from unittest.mock import MagicMock
 
+import pytest
+
 import codemem.plugin_ingest as plugin_ingest
 
 
@@ -14,6 +18,12 @@ class FakeStore:
         self.usage: list[dict[str, Any]] = []
         self.ended: list[dict[str, Any]] = []
         self.closed = False
+        self.batches = 0
+
+    @contextmanager
+    def batch(self) -> Iterator[FakeStore]:
+        self.batches += 1
+        yield self
 
     def get_or_create_opencode_session(self, *_args: Any, **_kwargs: Any) -> int:
         return 1
@@ -114,6 +124,38 @@ def test_ingest_builds_transcript_and_persists_artifacts(monkeypatch: Any) -> No
     assert store.artifacts == [
         {"kind": "transcript", "path": "transcript.md", "content_text": "body", "metadata": None}
     ]
+    assert store.batches == 1
+
+
+def test_ingest_writes_nothing_when_raw_event_observer_fails(monkeypatch: Any) -> None:
+    store = FakeStore()
+    observer = SimpleNamespace(observe=lambda _ctx: _make_response())
+
+    _set_common_patches(monkeypatch, store)
+    monkeypatch.setattr(plugin_ingest, "build_artifact_bundle", lambda *_args: [])
+    monkeypatch.setattr(plugin_ingest, "OBSERVER", observer)
+
+    payload = {
+        "cwd": "/tmp",
+        "project": "demo",
+        "session_context": {"flusher": "raw_events", "opencode_session_id": "sess-1"},
+        "events": [
+            {
+                "type": "user_prompt",
+                "prompt_text": "Fix the flaky sync test",
+                "prompt_number": 1,
+                "timestamp": "2026-01-28T00:00:01Z",
+            }
+        ],
+    }
+
+    with pytest.raises(RuntimeError):
+        plugin_ingest.ingest(payload)
+
+    assert store.batches == 0
+    assert store.prompts == []
+    assert store.ended == []
+    assert store.closed
 
 
 def test_ingest_filters_and_budgets_tool_events(monkeypatch: Any) -> None:
@@ -216,3 +258,29 @@ def test_ingest_early_exit_on_trivial_request(monkeypatch: Any) -> None:
     assert not plugin_ingest.build_artifact_bundle.called
     assert store.ended
     assert store.closed
+
+
+def test_ingest_uses_injected_store_without_closing_it(monkeypatch: Any) -> None:
+    store = FakeStore()
+
+    _set_common_patches(monkeypatch, store)
+    monkeypatch.setattr(plugin_ingest, "MemoryStore", MagicMock(side_effect=AssertionError))
+    monkeypatch.setattr(plugin_ingest, "build_artifact_bundle", MagicMock())
+    monkeypatch.setattr(plugin_ingest, "OBSERVER", MagicMock())
+
+    payload = {
+        "cwd": "/tmp",
+        "events": [
+            {
+                "type": "user_prompt",
+                "prompt_text": "ok",
+                "prompt_number": 1,
+                "timestamp": "2026-01-28T00:00:01Z",
+            }
+        ],
+    }
+
+    plugin_ingest.ingest(payload, store=store)  # type: ignore[arg-type]
+
+    assert store.ended
+    assert not store.closed
@@ -3,6 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+from codemem.ingest.extract import ExtractedEvents
 from codemem.raw_event_flush import EXTRACTOR_VERSION, flush_raw_events
 from codemem.store import MemoryStore
 from codemem.xml_parser import ParsedSummary
@@ -142,8 +143,11 @@ def test_flush_raw_events_handles_ts_mono_reordering(tmp_path: Path) -> None:
 
     captured: dict[str, object] = {}
 
-    def fake_ingest(payload: dict[str, object]) -> None:
-        captured["events"] = payload.get("events")
+    def fake_ingest(
+        payload: dict[str, object], *, store: object = None, extracted: object = None
+    ) -> None:
+        captured["extracted"] = extracted
+        captured["store"] = store
 
     with patch("codemem.raw_event_flush.ingest", fake_ingest):
         result = flush_raw_events(
@@ -157,10 +161,12 @@ def test_flush_raw_events_handles_ts_mono_reordering(tmp_path: Path) -> None:
 
     assert result["flushed"] == 3
     assert store.raw_event_flush_state("sess") == 2
+    assert captured["store"] is store
 
-    ingested_events = captured.get("events")
-    assert isinstance(ingested_events, list)
-    assert [int(e.get("event_seq")) for e in ingested_events] == [0, 1, 2]
+    extracted = captured.get("extracted")
+    assert isinstance(extracted, ExtractedEvents)
+    assert (extracted.start_event_seq, extracted.end_event_seq) == (0, 2)
+    assert extracted.session_context()["files_read"] == ["a", "b"]
 
 
 def test_flush_raw_events_marks_batch_error_when_observer_fails(tmp_path: Path) -> None:
@@ -233,10 +239,11 @@ def test_flush_raw_events_chunked_resume_uses_checkpoint(tmp_path: Path) -> None
 
         captured: list[int] = []
 
-        def fake_ingest(payload: dict[str, object]) -> None:
-            events = payload.get("events")
-            assert isinstance(events, list)
-            captured.append(len(events))
+        def fake_ingest(
+            payload: dict[str, object], *, store: object = None, extracted: object = None
+        ) -> None:
+            assert isinstance(extracted, ExtractedEvents)
+            captured.append(extracted.event_count)
 
         with patch("codemem.raw_event_flush.ingest", fake_ingest):
             result1 = flush_raw_events(
@@ -319,12 +326,11 @@ def test_flush_raw_events_chunking_does_not_skip_out_of_order_timestamps(tmp_pat
 
         captured: list[list[int]] = []
 
-        def fake_ingest(payload: dict[str, object]) -> None:
-            events = payload.get("events")
-            assert isinstance(events, list)
-            captured.append(
-                [int(event["event_seq"]) for event in events if isinstance(event, dict)]
-            )
+        def fake_ingest(
+            payload: dict[str, object], *, store: object = None, extracted: object = None
+        ) -> None:
+            assert isinstance(extracted, ExtractedEvents)
+            captured.append([extracted.start_event_seq, extracted.end_event_seq])
 
         with patch("codemem.raw_event_flush.ingest", fake_ingest):
             assert flush_raw_events(
@@ -357,6 +363,120 @@ def test_flush_raw_events_chunking_does_not_skip_out_of_order_timestamps(tmp_pat
             ) == {"flushed": 1, "updated_state": 1}
             assert store.raw_event_flush_state("sess-order") == 2
 
-        assert captured == [[0], [1], [2]]
+        assert captured == [[0, 0], [1, 1], [2, 2]]
+    finally:
+        store.close()
+
+
+def test_flush_raw_events_catches_up_when_pending_events_were_purged(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        for i in range(2):
+            store.record_raw_event(
+                opencode_session_id="sess-purged",
+                event_id=f"evt-{i}",
+                event_type="user_prompt",
+                payload={"type": "user_prompt", "prompt_text": f"P{i}"},
+                ts_wall_ms=100 + i,
+                ts_mono_ms=1.0 + i,
+            )
+        store.purge_raw_events_before(1_000)
+        assert store.raw_event_backlog_totals()["sessions"] == 1
+
+        result = flush_raw_events(
+            store,
+            opencode_session_id="sess-purged",
+            cwd=str(tmp_path),
+            project="test",
+            started_at="2026-01-01T00:00:00Z",
+        )
+
+        assert result == {"flushed": 0, "updated_state": 1}
+        assert store.raw_event_flush_state("sess-purged") == 1
+        assert store.raw_event_backlog_totals() == {"sessions": 0, "pending": 0}
+    finally:
+        store.close()
+
+
+def test_flush_raw_events_drains_long_session_in_resumable_batches(
+    monkeypatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("CODEMEM_RAW_EVENTS_FLUSH_CHUNK_EVENTS", "2")
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        store.record_raw_events_batch(
+            opencode_session_id="sess-long",
+            events=[
+                {
+                    "event_id": f"evt-{i}",
+                    "event_type": "user_prompt",
+                    "payload": {"type": "user_prompt", "prompt_text": f"P{i}"},
+                    "ts_wall_ms": 100 + i,
+                    "ts_mono_ms": float(i),
+                }
+                for i in range(5)
+            ],
+        )
+        captured: list[tuple[int | None, int | None, int]] = []
+
+        def fake_ingest(
+            payload: dict[str, object], *, store: object = None, extracted: object = None
+        ) -> None:
+            assert isinstance(extracted, ExtractedEvents)
+            if extracted.start_event_seq == 2:
+                raise RuntimeError("observer failed")
+            captured.append(
+                (extracted.start_event_seq, extracted.end_event_seq, extracted.prompt_count)
+            )
+
+        with patch("codemem.raw_event_flush.ingest", fake_ingest):
+            try:
+                flush_raw_events(
+                    store,
+                    opencode_session_id="sess-long",
+                    cwd=str(tmp_path),
+                    project="test",
+                    started_at="2026-01-01T00:00:00Z",
+                )
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("Expected flush_raw_events to raise")
+        # The first batch stays flushed; the failed one is retried from its checkpoint.
+        assert captured == [(0, 1, 2)]
+        assert store.raw_event_flush_state("sess-long") == 1
+
+        def resumed_ingest(
+            payload: dict[str, object], *, store: object = None, extracted: object = None
+        ) -> None:
+            assert isinstance(extracted, ExtractedEvents)
+            captured.append(
+                (extracted.start_event_seq, extracted.end_event_seq, extracted.prompt_count)
+            )
+
+        with patch("codemem.raw_event_flush.ingest", resumed_ingest):
+            result = flush_raw_events(
+                store,
+                opencode_session_id="sess-long",
+                cwd=str(tmp_path),
+                project="test",
+                started_at="2026-01-01T00:00:00Z",
+            )
+
+        assert result == {"flushed": 3, "updated_state": 1}
+        assert captured == [(0, 1, 2), (2, 3, 2), (4, 4, 1)]
+        assert store.raw_event_flush_state("sess-long") == 4
+        statuses = store.conn.execute(
+            """
+            SELECT start_event_seq, end_event_seq, status FROM raw_event_flush_batches
+            WHERE opencode_session_id = ? ORDER BY start_event_seq
+            """,
+            ("sess-long",),
+        ).fetchall()
+        assert [tuple(row) for row in statuses] == [
+            (0, 1, "completed"),
+            (2, 3, "completed"),
+            (4, 4, "completed"),
+        ]
     finally:
         store.close()
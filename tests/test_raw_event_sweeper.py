@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import threading
 import time
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from codemem.raw_event_flush import flush_raw_events
 from codemem.store import MemoryStore
+from codemem.store import raw_events as store_raw_events
 from codemem.viewer import RawEventSweeper
+from codemem.viewer_raw_events import RawEventFlushPool
+from codemem.xml_parser import ParsedSummary
 
 
 def test_raw_event_sweeper_flushes_idle_sessions(monkeypatch, tmp_path: Path) -> None:
@@ -278,3 +283,247 @@ def test_raw_event_sweeper_skips_stale_queue_sessions_without_backlog(
     kwargs = flush.call_args.kwargs
     assert kwargs["opencode_session_id"] == "sess-real"
     assert kwargs["max_events"] == 7
+
+
+def test_raw_event_sweeper_runs_maintenance_only_on_idle_ticks(monkeypatch, tmp_path: Path) -> None:
+    db_path = tmp_path / "mem.sqlite"
+    monkeypatch.setenv("CODEMEM_DB", str(db_path))
+    monkeypatch.setenv("CODEMEM_RAW_EVENTS_SWEEPER", "1")
+    monkeypatch.setenv("CODEMEM_DB_MAINTENANCE_INTERVAL_MS", "1")
+    MemoryStore(db_path).close()
+
+    sweeper = RawEventSweeper()
+    time.sleep(0.01)
+    with patch.object(MemoryStore, "maintain_database", return_value=[]) as maintain:
+        with (
+            patch.object(
+                MemoryStore, "raw_event_sessions_with_pending_queue", return_value=["sess-busy"]
+            ),
+            patch("codemem.viewer_raw_events.flush_raw_events"),
+        ):
+            sweeper.tick()
+        maintain.assert_not_called()
+
+        sweeper.tick()
+        maintain.assert_called_once_with(fts_mode="merge")
+
+
+def test_flush_pool_runs_sessions_in_parallel_once_each() -> None:
+    pool = RawEventFlushPool(2)
+    started = threading.Barrier(3, timeout=5)
+    release = threading.Event()
+
+    def flush() -> str:
+        started.wait()
+        release.wait(5)
+        return "ok"
+
+    try:
+        first = pool.submit("sess-a", "openai", flush)
+        second = pool.submit("sess-b", "openai", flush)
+        assert first is not None and second is not None
+        # Both flushes reach the barrier together, so neither waits for the other.
+        started.wait()
+        assert pool.submit("sess-a", "openai", flush) is None
+        release.set()
+        assert first.result(timeout=5) == "ok"
+        assert second.result(timeout=5) == "ok"
+    finally:
+        release.set()
+        pool.shutdown()
+
+    metrics = pool.metrics()
+    assert metrics["in_flight"] == 0
+    assert metrics["completed"] == 2
+    assert metrics["skipped_in_flight"] == 1
+    assert metrics["flush_ms"]["count"] == 2
+    assert metrics["queue_wait_ms"]["count"] == 2
+
+
+def test_flush_pool_spaces_flush_starts_per_provider() -> None:
+    now = [100.0]
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    pool = RawEventFlushPool(1, rate_per_minute=30, clock=lambda: now[0], sleep=sleep)
+    try:
+        for session_id, provider in [("a", "openai"), ("b", "openai"), ("c", "anthropic")]:
+            future = pool.submit(session_id, provider, lambda: None)
+            assert future is not None
+            future.result(timeout=5)
+    finally:
+        pool.shutdown()
+
+    # 30/min means 2s between openai starts; anthropic has its own budget.
+    assert sleeps == [2.0]
+    assert pool.metrics()["failed"] == 0
+
+
+def test_raw_event_sweeper_flushes_on_worker_threads(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "mem.sqlite"))
+    monkeypatch.setenv("CODEMEM_RAW_EVENTS_SWEEPER_WORKERS", "3")
+    monkeypatch.setenv("CODEMEM_DB_MAINTENANCE_INTERVAL_MS", "0")
+    sessions = ["sess-1", "sess-2", "sess-3"]
+    threads: set[str] = set()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_flush(store: object, **kwargs: object) -> dict[str, int]:
+        threads.add(threading.current_thread().name)
+        barrier.wait()
+        return {"flushed": 1, "updated_state": 1}
+
+    sweeper = RawEventSweeper()
+    with (
+        patch.object(MemoryStore, "raw_event_sessions_with_pending_queue", return_value=sessions),
+        patch.object(MemoryStore, "raw_event_sessions_pending_idle_flush", return_value=sessions),
+        patch("codemem.viewer_raw_events.flush_raw_events", side_effect=fake_flush) as flush,
+    ):
+        sweeper.tick()
+
+    # Drained by the queue pass, so the idle pass does not flush them again.
+    assert flush.call_count == 3
+    assert len(threads) == 3
+    metrics = sweeper.flush_metrics()
+    assert metrics is not None and metrics["completed"] == 3
+
+
+def test_flush_workers_share_one_store_for_concurrent_sessions(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite", check_same_thread=False)
+    sessions = ["sess-a", "sess-b"]
+    for session_id in sessions:
+        store.record_raw_events_batch(
+            opencode_session_id=session_id,
+            events=[
+                {
+                    "event_id": f"{session_id}-{i}",
+                    "event_type": "user_prompt",
+                    "payload": {"type": "user_prompt", "prompt_text": f"Fix {session_id} {i}"},
+                    "ts_wall_ms": 100 + i,
+                    "ts_mono_ms": float(i),
+                }
+                for i in range(3)
+            ],
+        )
+    # Both workers must be inside the observer call at once, between their store phases.
+    in_observer = threading.Barrier(2, timeout=5)
+
+    def observe(context: object) -> MagicMock:
+        in_observer.wait()
+        response = MagicMock()
+        response.raw = "<summary/>"
+        response.parsed.observations = []
+        response.parsed.skip_summary_reason = None
+        response.parsed.summary = ParsedSummary(
+            request="Fix the flush",
+            investigated="",
+            learned="The flush works",
+            completed="",
+            next_steps="",
+            notes="",
+            files_read=[],
+            files_modified=[],
+        )
+        return response
+
+    pool = RawEventFlushPool(2)
+    try:
+        with (
+            patch("codemem.plugin_ingest.OBSERVER") as observer,
+            patch("codemem.plugin_ingest.capture_pre_context", return_value={"project": "p"}),
+            patch(
+                "codemem.plugin_ingest.capture_post_context",
+                return_value={"git_diff": "", "recent_files": ""},
+            ),
+        ):
+            observer.observe.side_effect = observe
+            futures = [
+                pool.submit(
+                    session_id,
+                    "openai",
+                    lambda session_id=session_id: flush_raw_events(
+                        store,
+                        opencode_session_id=session_id,
+                        cwd=str(tmp_path),
+                        project="p",
+                        started_at="2026-01-01T00:00:00Z",
+                    ),
+                )
+                for session_id in sessions
+            ]
+            results = [future.result(timeout=30) for future in futures if future is not None]
+
+        assert results == [{"flushed": 3, "updated_state": 1}] * 2
+        assert [store.raw_event_flush_state(session_id) for session_id in sessions] == [2, 2]
+        statuses = store.conn.execute(
+            "SELECT status FROM raw_event_flush_batches ORDER BY opencode_session_id"
+        ).fetchall()
+        assert [row[0] for row in statuses] == ["completed", "completed"]
+        summaries = store.conn.execute("SELECT COUNT(*) FROM session_summaries").fetchone()[0]
+        assert summaries == 2
+        assert not store.conn.in_transaction
+    finally:
+        pool.shutdown()
+        store.close()
+
+
+def test_prune_raw_events_deletes_in_batches_and_cascades(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        for session_id in ("old", "live"):
+            store.record_raw_events_batch(
+                opencode_session_id=session_id,
+                events=[
+                    {
+                        "event_id": f"{session_id}-{i}",
+                        "event_type": "user_prompt",
+                        "payload": {"type": "user_prompt", "prompt_text": "x" * 2000},
+                        "ts_wall_ms": 100 + i if session_id == "old" else 10_000 + i,
+                        "ts_mono_ms": float(i),
+                    }
+                    for i in range(5)
+                ],
+            )
+        for session_id, end in (("old", 4), ("live", 4)):
+            batch_id, _ = store.get_or_create_raw_event_flush_batch(
+                opencode_session_id=session_id,
+                start_event_seq=0,
+                end_event_seq=end,
+                extractor_version="v1",
+            )
+            store.update_raw_event_flush_batch_status(batch_id, "completed")
+            store.update_raw_event_flush_state(session_id, end)
+        store.conn.execute(
+            "UPDATE raw_event_sessions SET updated_at = ? WHERE opencode_session_id = ?",
+            ("1970-01-01T00:00:00+00:00", "old"),
+        )
+        store.conn.commit()
+
+        statements: list[str] = []
+        store.conn.set_trace_callback(statements.append)
+        result = store_raw_events.prune_raw_events_before(store.conn, 1_000, batch_rows=2)
+        store.conn.set_trace_callback(None)
+
+        assert result["raw_events"] == 5
+        assert result["sessions"] == 1
+        assert result["flush_batches"] == 1
+        assert result["freed_pages"] > 0
+        assert result["vacuumed_pages"] == 0
+        # 5 rows in batches of 2 take three DELETE statements, each committed on its own.
+        event_deletes = [sql for sql in statements if sql.startswith("DELETE FROM raw_events ")]
+        assert len(event_deletes) == 3
+        sessions = store.conn.execute(
+            "SELECT opencode_session_id FROM raw_event_sessions"
+        ).fetchall()
+        assert [row[0] for row in sessions] == ["live"]
+        batches = store.conn.execute(
+            "SELECT opencode_session_id FROM raw_event_flush_batches"
+        ).fetchall()
+        assert [row[0] for row in batches] == ["live"]
+
+        # Retention disabled reports the same keys, all zero.
+        disabled = store_raw_events.prune_raw_events(store.conn, 0)
+        assert disabled == dict.fromkeys(result, 0)
+    finally:
+        store.close()
@@ -3,16 +3,20 @@ import http.client
 import json
 import sqlite3
 import threading
+import time
 from http.server import HTTPServer
 from pathlib import Path
 from typing import cast
 
+import pytest
+
 from codemem import db
 from codemem import store as store_module
 from codemem import viewer as viewer_module
 from codemem.store import MemoryStore, ReplicationOp
 from codemem.store.types import MemoryResult
 from codemem.viewer import ViewerHandler
+from codemem.viewer_store_pool import ViewerStorePool
 
 
 def test_insert_and_search(tmp_path: Path) -> None:
@@ -62,6 +66,42 @@ def test_recent_filters(tmp_path: Path) -> None:
     assert observations[0]["kind"] == "observation"
 
 
+def test_recent_records_project_columns_and_decode_metadata_lazily(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    mid = store.remember(
+        session,
+        kind="decision",
+        title="Alpha",
+        body_text="Alpha body",
+        metadata={"discovery_tokens": 42},
+    )
+    store.end_session(session)
+
+    records = store.recent(limit=10, log_usage=False, records=True)
+    assert [type(item) for item in records] == [store_module.MemoryRecord]
+    record = cast(store_module.MemoryRecord, records[0])
+    assert "narrative" not in record
+    assert isinstance(record["metadata_json"], str)
+    assert record.metadata["discovery_tokens"] == 42
+    assert record.metadata is record.metadata
+    assert record.to_dict()["metadata_json"]["discovery_tokens"] == 42
+
+    by_kind = store.recent_by_kinds(["decision"], limit=5, log_usage=False, records=True)
+    assert [item["id"] for item in by_kind] == [mid]
+    assert [item["id"] for item in store.get_many([mid], records=True)] == [mid]
+    timeline = store._timeline_around(record, 1, 1, None, records=True)
+    assert [item["id"] for item in timeline] == [mid]
+    assert timeline[0]["linked_prompt"] is None
+
+
 def test_rejects_invalid_memory_kind(tmp_path: Path) -> None:
     store = MemoryStore(tmp_path / "mem.sqlite")
     session = store.start_session(
@@ -131,6 +171,7 @@ def test_migrates_legacy_project_kind_to_decision(tmp_path: Path, monkeypatch) -
                 "legacy-import-key",
             ),
         )
+        store.conn.execute("PRAGMA user_version = 1")
         store.conn.commit()
 
         # Re-run schema init to apply the one-off normalization.
@@ -386,6 +427,104 @@ def test_usage_stats(tmp_path: Path) -> None:
     assert usage["pack"]["tokens_read"] > 0
 
 
+def test_usage_events_are_buffered_until_flush(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    store.USAGE_FLUSH_INTERVAL_S = 3600.0
+    store.USAGE_FLUSH_MAX_EVENTS = 3
+
+    def persisted() -> int:
+        return int(store.conn.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0])
+
+    store.recent(limit=1)
+    store.recent(limit=1)
+    assert persisted() == 0
+
+    store.recent(limit=1)
+    assert persisted() == 3
+
+    store.recent(limit=1)
+    assert persisted() == 3
+    assert store.usage_totals()["events"] == 4
+
+    store.recent(limit=1)
+    store.close()
+    reopened = MemoryStore(tmp_path / "mem.sqlite")
+    assert reopened.conn.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0] == 5
+
+
+def test_shared_store_flushes_idle_usage_on_a_timer(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite", check_same_thread=False)
+    store.USAGE_FLUSH_INTERVAL_S = 0.05
+    try:
+        store.recent(limit=1)
+        other = sqlite3.connect(tmp_path / "mem.sqlite")
+        try:
+            deadline = time.monotonic() + 5
+            count = 0
+            while time.monotonic() < deadline and not count:
+                count = other.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0]
+                time.sleep(0.01)
+        finally:
+            other.close()
+        assert count == 1
+    finally:
+        store.close()
+
+
+def test_failed_usage_flush_keeps_events_buffered(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    store.USAGE_FLUSH_INTERVAL_S = 3600.0
+    try:
+        store.recent(limit=1)
+        store.conn.execute("ALTER TABLE usage_events RENAME TO usage_events_moved")
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush_usage()
+        assert not store.conn.in_transaction
+        store.conn.execute("ALTER TABLE usage_events_moved RENAME TO usage_events")
+        assert store.flush_usage() == 1
+    finally:
+        store.close()
+
+
+def test_close_drops_usage_it_cannot_flush_and_stops_the_timer(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite", check_same_thread=False)
+    store.USAGE_FLUSH_INTERVAL_S = 0.05
+    store.USAGE_FLUSH_MAX_EVENTS = 100
+    locker = sqlite3.connect(tmp_path / "mem.sqlite")
+    try:
+        store.conn.execute("PRAGMA busy_timeout = 0")
+        store.record_usage("get")
+        locker.execute("BEGIN EXCLUSIVE")
+        store.close()
+        assert store._usage_timer is None
+        assert store._usage_pending == []
+        store.record_usage("get")
+        assert store._usage_pending == []
+        assert store._usage_timer is None
+    finally:
+        locker.rollback()
+        locker.close()
+
+
+def test_pack_records_only_the_pack_usage_event(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    store.remember(session, kind="note", title="Alpha", body_text="Alpha body text")
+    store.end_session(session)
+
+    store.build_memory_pack("nothing matches this", limit=5)
+
+    events = {row["event"] for row in store.usage_summary()}
+    assert events == {"pack"}
+
+
 def test_pack_reuse_savings(tmp_path: Path) -> None:
     store = MemoryStore(tmp_path / "mem.sqlite")
     session = store.start_session(
@@ -1613,6 +1752,66 @@ def test_pack_recall_prefers_recent_session_summaries(tmp_path: Path) -> None:
     assert "## Summary" in pack["pack_text"]
 
 
+def test_batch_commits_once_and_rolls_back_on_error(tmp_path: Path) -> None:
+    db_path = tmp_path / "mem.sqlite"
+    store = MemoryStore(db_path)
+    try:
+        with store.batch():
+            session = store.start_session(
+                cwd="/tmp",
+                git_remote=None,
+                git_branch="main",
+                user="tester",
+                tool_version="test",
+                project="/tmp/project-a",
+            )
+            with store.batch():
+                store.add_user_prompt(session, "/tmp/project-a", "Ship it", prompt_number=1)
+            store.remember(session, kind="note", title="Kept", body_text="Committed together")
+            other = sqlite3.connect(db_path)
+            try:
+                # Nothing is visible to other connections until the batch commits.
+                assert other.execute("SELECT COUNT(*) FROM memory_items").fetchone()[0] == 0
+            finally:
+                other.close()
+        assert not store.conn.in_transaction
+
+        with pytest.raises(RuntimeError), store.batch():
+            store.remember(session, kind="note", title="Dropped", body_text="Rolled back")
+            store.end_session(session)
+            raise RuntimeError("observer failed")
+    finally:
+        store.close()
+
+    store = MemoryStore(db_path)
+    try:
+        titles = [row[0] for row in store.conn.execute("SELECT title FROM memory_items")]
+        prompts = store.conn.execute("SELECT COUNT(*) FROM user_prompts").fetchone()[0]
+        ended = store.conn.execute("SELECT ended_at FROM sessions").fetchone()[0]
+    finally:
+        store.close()
+    assert titles == ["Kept"]
+    assert prompts == 1
+    assert ended is None
+
+
+def test_batch_is_scoped_to_the_calling_thread(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite", check_same_thread=False)
+    seen: list[object] = []
+    try:
+        with store.batch():
+            thread = threading.Thread(target=lambda: seen.append(store.conn))
+            thread.start()
+            thread.join()
+            assert store.conn is not seen[0]
+            # An inner rollback would silently drop the whole batch, so it is refused.
+            with pytest.raises(RuntimeError):
+                store.conn.rollback()
+        assert seen[0] is store.conn
+    finally:
+        store.close()
+
+
 def test_pack_fuzzy_fallback_on_typos(tmp_path: Path) -> None:
     store = MemoryStore(tmp_path / "mem.sqlite")
     session = store.start_session(
@@ -1632,6 +1831,68 @@ def test_pack_fuzzy_fallback_on_typos(tmp_path: Path) -> None:
     assert any("Memory pack improvements" in item["body"] for item in pack["items"])
 
 
+def test_fuzzy_search_uses_trigram_index_beyond_recent_window(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    old_id = store.remember(
+        session, kind="note", title="Vector backfill", body_text="Backfill embeddings in batches"
+    )
+    for index in range(12):
+        store.remember(session, kind="note", title=f"Other {index}", body_text="Unrelated work")
+    store.conn.execute(
+        "UPDATE memory_items SET created_at = ?, created_at_epoch = ? WHERE id = ?",
+        ("2020-01-01T00:00:00", 1577836800, old_id),
+    )
+    store.conn.commit()
+    store.FUZZY_CANDIDATE_LIMIT = 2
+    before = store.conn.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0]
+
+    matches = store._fuzzy_search("vectr backfil", limit=1, filters=None)
+
+    assert [item["id"] for item in matches] == [old_id]
+    assert isinstance(matches[0]["metadata_json"], dict)
+    after = store.conn.execute("SELECT COUNT(*) FROM usage_events").fetchone()[0]
+    assert after == before
+
+
+def test_fuzzy_min_score_separates_typos_from_unrelated_text() -> None:
+    from codemem.store import search as search_module
+
+    def score(query: str, text: str) -> float:
+        return search_module._fuzzy_score(query.split(), query, text)
+
+    threshold = MemoryStore.FUZZY_MIN_SCORE
+    for query, text in [
+        ("vectr backfil", "Vector backfill job reindexes embeddings"),
+        ("memry pakc", "Memory pack improvements"),
+        ("depoly", "Deploy checklist"),
+        ("sesion sumary", "Session summary written"),
+    ]:
+        assert score(query, text) >= threshold, (query, text)
+    for query, text in [
+        ("vectr backfil", "Lecture notes on fill lines"),
+        ("vectr backfil", "Deploy checklist steps for release"),
+        ("sesion sumary", "Server startup logs"),
+    ]:
+        assert score(query, text) < threshold, (query, text)
+    assert score("depoly", "Deploy steps") > score("depoly", "Dependency policy update")
+
+
+def test_trigram_match_query_caps_trigrams_across_words() -> None:
+    from codemem.store import search as search_module
+
+    match = search_module._trigram_match_query(["authentication", "vector"], 4)
+
+    assert match == '"aut" OR "vec" OR "uth" OR "ect"'
+
+
 def test_pack_reranks_by_recency(tmp_path: Path) -> None:
     store = MemoryStore(tmp_path / "mem.sqlite")
     session = store.start_session(
@@ -1645,8 +1906,8 @@ def test_pack_reranks_by_recency(tmp_path: Path) -> None:
     old_id = store.remember(session, kind="note", title="Alpha", body_text="Update search ranking")
     new_id = store.remember(session, kind="note", title="Beta", body_text="Update search ranking")
     store.conn.execute(
-        "UPDATE memory_items SET created_at = ?, updated_at = ? WHERE id = ?",
-        ("2020-01-01T00:00:00", "2020-01-01T00:00:00", old_id),
+        "UPDATE memory_items SET created_at = ?, updated_at = ?, created_at_epoch = ? WHERE id = ?",
+        ("2020-01-01T00:00:00", "2020-01-01T00:00:00", 1577836800, old_id),
     )
     store.conn.commit()
     store.end_session(session)
@@ -1675,16 +1936,16 @@ def test_pack_recall_uses_timeline(tmp_path: Path) -> None:
     )
     last_id = store.remember(session, kind="note", title="Last", body_text="Gamma follow-up")
     store.conn.execute(
-        "UPDATE memory_items SET created_at = ?, updated_at = ? WHERE id = ?",
-        ("2020-01-01T00:00:00", "2020-01-01T00:00:00", first_id),
+        "UPDATE memory_items SET created_at = ?, updated_at = ?, created_at_epoch = ? WHERE id = ?",
+        ("2020-01-01T00:00:00", "2020-01-01T00:00:00", 1577836800, first_id),
     )
     store.conn.execute(
-        "UPDATE memory_items SET created_at = ?, updated_at = ? WHERE id = ?",
-        ("2020-01-02T00:00:00", "2020-01-02T00:00:00", summary_id),
+        "UPDATE memory_items SET created_at = ?, updated_at = ?, created_at_epoch = ? WHERE id = ?",
+        ("2020-01-02T00:00:00", "2020-01-02T00:00:00", 1577923200, summary_id),
     )
     store.conn.execute(
-        "UPDATE memory_items SET created_at = ?, updated_at = ? WHERE id = ?",
-        ("2020-01-03T00:00:00", "2020-01-03T00:00:00", last_id),
+        "UPDATE memory_items SET created_at = ?, updated_at = ?, created_at_epoch = ? WHERE id = ?",
+        ("2020-01-03T00:00:00", "2020-01-03T00:00:00", 1578009600, last_id),
     )
     store.conn.commit()
     store.end_session(session)
@@ -1825,6 +2086,7 @@ def test_initialize_schema_cleans_orphan_prompt_links(tmp_path: Path) -> None:
     )
     memory_id = store.remember(session, kind="note", title="Orphan link", body_text="cleanup")
     store.conn.execute("UPDATE memory_items SET user_prompt_id = 999999 WHERE id = ?", (memory_id,))
+    store.conn.execute("PRAGMA user_version = 1")
     store.conn.commit()
 
     db.initialize_schema(store.conn)
@@ -2056,6 +2318,624 @@ def test_pack_semantic_fallback(monkeypatch, tmp_path: Path) -> None:
     assert pack["items"][0]["title"] == "Alpha memory"
 
 
+def test_pack_runs_semantic_search_once(monkeypatch, tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    store.remember(session, kind="note", title="Alpha memory", body_text="Alpha recall")
+    store.end_session(session)
+
+    calls: list[str] = []
+
+    def fake_semantic_search(_store, query, limit, filters):
+        calls.append(query)
+        return []
+
+    monkeypatch.setattr("codemem.store.search._semantic_search", fake_semantic_search)
+
+    store.build_memory_pack("alpha recall", limit=3)
+
+    assert calls == ["alpha recall"]
+
+
+def test_embed_query_caches_by_model_and_normalized_text(monkeypatch) -> None:
+    from codemem import semantic
+
+    class CountingEmbeddingClient:
+        model = "fake-model"
+
+        def __init__(self) -> None:
+            self.calls: list[list[str]] = []
+
+        def embed(self, texts):
+            batch = list(texts)
+            self.calls.append(batch)
+            return [[1.0, 0.0] for _ in batch]
+
+    client = CountingEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    semantic.clear_query_cache()
+
+    first = semantic.embed_query("alpha  recall")
+    second = semantic.embed_query(" alpha recall\n")
+
+    assert first is not None
+    assert first == second
+    assert client.calls == [["alpha recall"]]
+
+    client.model = "other-model"
+    semantic.embed_query("alpha recall")
+    assert len(client.calls) == 2
+    semantic.clear_query_cache()
+
+
+def test_embed_query_does_not_share_cache_between_unnamed_clients(monkeypatch) -> None:
+    from codemem import semantic
+
+    class UnnamedEmbeddingClient:
+        def __init__(self, vector: list[float]) -> None:
+            self.vector = vector
+
+        def embed(self, texts):
+            return [self.vector for _ in texts]
+
+    first_client = UnnamedEmbeddingClient([1.0, 0.0])
+    second_client = UnnamedEmbeddingClient([0.0, 1.0])
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: first_client)
+    first = semantic.embed_query("alpha")
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: second_client)
+    second = semantic.embed_query("alpha")
+
+    assert first != second
+
+
+def test_backfill_vectors_batches_across_memories_and_resumes(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    class CountingEmbeddingClient:
+        model = "fake-model"
+
+        def __init__(self) -> None:
+            self.calls: list[int] = []
+
+        def embed(self, texts):
+            batch = list(texts)
+            self.calls.append(len(batch))
+            return [[0.1] * 384 for _ in batch]
+
+    client = CountingEmbeddingClient()
+    active: dict[str, CountingEmbeddingClient | None] = {"client": None}
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: active["client"])
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: active["client"])
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    # Written while embeddings are unavailable, so every memory needs a backfill.
+    memory_ids = [
+        store.remember(session, kind="discovery", title=f"Note {index}", body_text="Body")
+        for index in range(3)
+    ]
+    active["client"] = client
+    progress: list[dict[str, int]] = []
+    try:
+        result = store.backfill_vectors(batch_size=2, progress=progress.append)
+        assert result == {"checked": 3, "embedded": 3, "inserted": 3, "skipped": 0}
+        assert client.calls == [2, 1]
+        assert [update["inserted"] for update in progress] == [2, 3]
+        assert all(update["total"] == 3 for update in progress)
+        rows = store.conn.execute(
+            "SELECT memory_id, chunk_index FROM memory_vectors WHERE model = ?",
+            ("fake-model",),
+        ).fetchall()
+        assert sorted((row["memory_id"], row["chunk_index"]) for row in rows) == [
+            (memory_id, 0) for memory_id in memory_ids
+        ]
+
+        rerun = store.backfill_vectors(batch_size=2)
+        assert rerun == {"checked": 3, "embedded": 0, "inserted": 0, "skipped": 3}
+        assert client.calls == [2, 1]
+    finally:
+        store.close()
+
+
+def test_backfill_vectors_fails_when_embedder_returns_too_few_vectors(
+    tmp_path: Path, monkeypatch
+) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    class ShortEmbeddingClient:
+        model = "fake-model"
+
+        def embed(self, texts):
+            return [[0.1] * 384 for _ in list(texts)[:-1]]
+
+    active: dict[str, ShortEmbeddingClient | None] = {"client": None}
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: active["client"])
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: active["client"])
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="/tmp/project-a",
+    )
+    for index in range(2):
+        store.remember(session, kind="discovery", title=f"Note {index}", body_text="Body")
+    active["client"] = ShortEmbeddingClient()
+    try:
+        with pytest.raises(ValueError):
+            store.backfill_vectors(batch_size=2)
+        count = store.conn.execute("SELECT COUNT(*) FROM memory_vectors").fetchone()[0]
+        assert count == 0
+    finally:
+        store.close()
+
+
+def test_remember_queues_vectors_for_background_indexing(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    monkeypatch.setenv("CODEMEM_VECTOR_INDEX_ASYNC", "1")
+
+    class CountingEmbeddingClient:
+        model = "fake-model"
+
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def embed(self, texts):
+            self.calls += 1
+            return [[0.1] * 384 for _ in texts]
+
+    client = CountingEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        memory_id = store.remember(
+            session, kind="discovery", title="Queued note", body_text="Indexed later"
+        )
+        obs_id = store.remember_observation(
+            session, kind="discovery", title="Queued observation", narrative="Also later"
+        )
+
+        assert client.calls == 0
+        status = store.vector_index_status()
+        assert status["pending"] == 2
+        assert status["oldest_enqueued_at"]
+        assert store.stats()["database"]["vector_index"]["pending"] == 2
+        # Unindexed rows are still reachable through keyword search.
+        assert memory_id in {item.id for item in store.search("Queued note", limit=5)}
+
+        result = store.index_pending_vectors()
+        assert result == {"indexed": 2, "inserted": 2}
+        assert client.calls == 1
+        assert store.vector_index_status()["pending"] == 0
+        rows = store.conn.execute("SELECT memory_id FROM memory_vectors").fetchall()
+        assert sorted(row["memory_id"] for row in rows) == sorted([memory_id, obs_id])
+    finally:
+        store.close()
+
+
+def test_remember_embeds_inline_without_a_vector_indexer(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    monkeypatch.delenv("CODEMEM_VECTOR_INDEX_ASYNC", raising=False)
+    client = type(
+        "Client",
+        (),
+        {"model": "fake-model", "embed": lambda self, texts: [[0.1] * 384 for _ in texts]},
+    )()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        memory_id = store.remember(session, kind="discovery", title="Inline", body_text="Now")
+        assert store.vector_index_status()["pending"] == 0
+        rows = store.conn.execute("SELECT memory_id FROM memory_vectors").fetchall()
+        assert [row["memory_id"] for row in rows] == [memory_id]
+    finally:
+        store.close()
+
+
+def test_batched_remember_embeds_after_the_batch_commits(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    monkeypatch.delenv("CODEMEM_VECTOR_INDEX_ASYNC", raising=False)
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    seen: list[tuple[bool, int]] = []
+
+    class CheckingEmbeddingClient:
+        model = "fake-model"
+
+        def embed(self, texts):
+            reader = sqlite3.connect(tmp_path / "mem.sqlite")
+            try:
+                visible = reader.execute("SELECT COUNT(*) FROM memory_items").fetchone()[0]
+            finally:
+                reader.close()
+            seen.append((store.conn.in_transaction, visible))
+            return [[0.1] * 384 for _ in texts]
+
+    client = CheckingEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        with store.batch():
+            memory_id = store.remember(session, kind="discovery", title="Batched", body_text="A")
+            assert seen == []
+        # Embedded outside the transaction, once the memory was visible to other readers.
+        assert seen == [(False, 1)]
+        rows = store.conn.execute("SELECT memory_id FROM memory_vectors").fetchall()
+        assert [row["memory_id"] for row in rows] == [memory_id]
+
+        with pytest.raises(RuntimeError), store.batch():
+            store.remember(session, kind="discovery", title="Rolled back", body_text="B")
+            raise RuntimeError("abort")
+        assert len(seen) == 1
+    finally:
+        store.close()
+
+
+def test_index_pending_vectors_keeps_requests_requeued_mid_pass(
+    tmp_path: Path, monkeypatch
+) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    monkeypatch.setenv("CODEMEM_VECTOR_INDEX_ASYNC", "1")
+    client = type(
+        "Client",
+        (),
+        {"model": "fake-model", "embed": lambda self, texts: [[0.1] * 384 for _ in texts]},
+    )()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        memory_id = store.remember(session, kind="discovery", title="Draft", body_text="v1")
+        real_backfill = vectors_module.backfill_vectors
+
+        def backfill_then_edit(store_arg, **kwargs):
+            result = real_backfill(store_arg, **kwargs)
+            # An edit lands while the pass is still embedding the previous version.
+            store_arg.enqueue_vector_index([memory_id])
+            return result
+
+        monkeypatch.setattr(vectors_module, "backfill_vectors", backfill_then_edit)
+        assert store.index_pending_vectors()["indexed"] == 1
+        assert store.vector_index_status()["pending"] == 1
+    finally:
+        store.close()
+
+
+def test_fuse_candidates_rrf_and_weighted() -> None:
+    from codemem.store.search import _fuse_candidates
+
+    keyword = [(1, 9.0), (2, 4.0)]
+    vector = [(3, 0.9), (1, 0.5)]
+
+    rrf = _fuse_candidates([(keyword, 1.0), (vector, 1.0)], mode="rrf", rrf_k=60)
+    assert [memory_id for memory_id, _ in rrf] == [1, 3, 2]
+    assert rrf[0][1] == 1.0 / 61 + 1.0 / 62
+
+    weighted = _fuse_candidates([(keyword, 1.0), (vector, 2.0)], mode="weighted")
+    assert [memory_id for memory_id, _ in weighted] == [3, 1, 2]
+    assert _fuse_candidates([(keyword, 1.0), (vector, 0.0)]) == [
+        (1, 1.0 / 61),
+        (2, 1.0 / 62),
+    ]
+
+
+def test_hybrid_rerank_still_weighs_recency_and_kind(tmp_path: Path) -> None:
+    from codemem.store.search import _rerank_results_hybrid
+
+    now = int(time.time())
+
+    def result(memory_id: int, kind: str, age_days: int) -> MemoryResult:
+        return MemoryResult(
+            id=memory_id,
+            kind=kind,
+            title=f"m{memory_id}",
+            body_text="",
+            confidence=0.5,
+            created_at="",
+            updated_at="",
+            tags_text="",
+            score=1.0,
+            session_id=1,
+            metadata={},
+            created_at_epoch=now - age_days * 86400,
+        )
+
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        # Keyword rank alone puts the older / lower-priority memory first.
+        older = result(1, "observation", 90)
+        newer = result(2, "observation", 0)
+        ordered = _rerank_results_hybrid(
+            store, [older, newer], limit=2, fts_ids={1, 2}, vector_results=[]
+        )
+        assert [item.id for item in ordered] == [2, 1]
+
+        observation = result(3, "observation", 0)
+        decision = result(4, "decision", 0)
+        ordered = _rerank_results_hybrid(
+            store, [observation, decision], limit=2, fts_ids={3, 4}, vector_results=[]
+        )
+        assert [item.id for item in ordered] == [4, 3]
+    finally:
+        store.close()
+
+
+def test_hybrid_search_fuses_keyword_and_vector_candidates(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    class AlphaEmbeddingClient:
+        model = "fake-model"
+
+        def embed(self, texts):
+            return [
+                [1.0] + [0.0] * 383 if "alpha" in text.lower() else [0.0, 1.0] + [0.0] * 382
+                for text in texts
+            ]
+
+    client = AlphaEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    semantic.clear_query_cache()
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        both_id = store.remember(session, kind="note", title="Deploy alpha", body_text="Alpha")
+        keyword_id = store.remember(
+            session, kind="note", title="Deploy checklist", body_text="Steps"
+        )
+        vector_id = store.remember(session, kind="note", title="Alphabet soup", body_text="Lunch")
+        store.index_pending_vectors()
+
+        assert [item.id for item in store.search("alpha deploy", limit=5)] == [
+            both_id,
+            keyword_id,
+        ]
+
+        store._hybrid_retrieval_enabled = True
+        results = store.search("alpha deploy", limit=5)
+        assert results[0].id == both_id
+        assert {item.id for item in results} == {both_id, keyword_id, vector_id}
+        assert results[0].metadata.get("clock_device_id") == "local"
+
+        store._hybrid_retrieval_vector_weight = 0.0
+        keyword_only = store.search("alpha deploy", limit=5)
+        assert [item.id for item in keyword_only] == [both_id, keyword_id]
+    finally:
+        semantic.clear_query_cache()
+        store.close()
+
+
+def test_semantic_search_filters_inside_knn_and_widens_k(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    class DistanceEmbeddingClient:
+        model = "fake-model"
+
+        def embed(self, texts):
+            # "near" memories sit closest to the query; "far" ones are further away.
+            vectors = []
+            for text in texts:
+                first = 1.0 if "near" in text.lower() else 0.5
+                vectors.append([first, 1.0 - first] + [0.0] * 382)
+            return vectors
+
+    client = DistanceEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    semantic.clear_query_cache()
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        noisy = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-b",
+        )
+        for index in range(20):
+            store.remember(noisy, kind="note", title=f"Near {index}", body_text="near")
+        target = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        target_ids = [
+            store.remember(target, kind="note", title=f"Far {index}", body_text="far")
+            for index in range(3)
+        ]
+        decision_id = store.remember(target, kind="decision", title="Far call", body_text="far")
+        store.index_pending_vectors()
+
+        results = store._semantic_search("near query", limit=4, filters={"project": "project-a"})
+        assert sorted(item["id"] for item in results) == [*target_ids, decision_id]
+
+        kind_results = store._semantic_search(
+            "near query", limit=5, filters={"project": "project-a", "kind": "decision"}
+        )
+        assert [item["id"] for item in kind_results] == [decision_id]
+
+        store.conn.execute("UPDATE memory_items SET active = 0 WHERE id = ?", (target_ids[0],))
+        store.conn.commit()
+        active_results = store._semantic_search(
+            "near query", limit=10, filters={"project": "project-a"}
+        )
+        assert target_ids[0] not in {item["id"] for item in active_results}
+        assert len(active_results) == 3
+
+        store.rename_project("project-a", "project-c", dry_run=False)
+        renamed = store._semantic_search("near query", limit=10, filters={"project": "project-c"})
+        assert len(renamed) == 3
+    finally:
+        semantic.clear_query_cache()
+        store.close()
+
+
+def test_vector_metadata_refresh_only_touches_changed_memories(tmp_path: Path, monkeypatch) -> None:
+    from codemem import semantic
+    from codemem.store import vectors as vectors_module
+
+    class FakeEmbeddingClient:
+        model = "fake-model"
+
+        def embed(self, texts):
+            return [[1.0] + [0.0] * 383 for _ in texts]
+
+    client = FakeEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        kept_id = store.remember(session, kind="note", title="Kept", body_text="Same kind")
+        changed_id = store.remember(session, kind="note", title="Changed", body_text="New kind")
+        store.conn.execute("UPDATE memory_items SET kind = 'note' WHERE id = ?", (kept_id,))
+        store.conn.execute("UPDATE memory_items SET kind = 'decision' WHERE id = ?", (changed_id,))
+        store.conn.commit()
+        queued = [
+            row[0] for row in store.conn.execute("SELECT memory_id FROM vector_metadata_queue")
+        ]
+
+        updated = store.refresh_vector_metadata()
+        kinds = dict(store.conn.execute("SELECT memory_id, kind FROM memory_vectors").fetchall())
+        remaining = store.conn.execute("SELECT COUNT(*) FROM vector_metadata_queue").fetchone()[0]
+    finally:
+        store.close()
+
+    assert queued == [changed_id]
+    assert updated == 1
+    assert kinds == {kept_id: "note", changed_id: "decision"}
+    assert remaining == 0
+
+
+def test_legacy_memory_vectors_gain_filter_metadata(tmp_path: Path) -> None:
+    from codemem.semantic import _serialize_vector
+
+    db_path = tmp_path / "mem.sqlite"
+    store = MemoryStore(db_path)
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        memory_id = store.remember(session, kind="decision", title="Pick sqlite", body_text="Why")
+        store.conn.execute("DROP TABLE memory_vectors")
+        store.conn.execute(
+            """
+            CREATE VIRTUAL TABLE memory_vectors USING vec0(
+                embedding float[384],
+                memory_id INTEGER,
+                chunk_index INTEGER,
+                content_hash TEXT,
+                model TEXT
+            )
+            """
+        )
+        store.conn.execute(
+            """
+            INSERT INTO memory_vectors(embedding, memory_id, chunk_index, content_hash, model)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (_serialize_vector([0.1] * 384), memory_id, 0, "hash", "fake-model"),
+        )
+        # Databases from before numbered migrations are all at version 1.
+        store.conn.execute("PRAGMA user_version = 1")
+        store.conn.commit()
+    finally:
+        store.close()
+
+    store = MemoryStore(db_path)
+    try:
+        row = store.conn.execute(
+            "SELECT memory_id, project_key, kind, content_hash FROM memory_vectors"
+        ).fetchone()
+    finally:
+        store.close()
+
+    assert tuple(row) == (memory_id, "project-a", "decision", "hash")
+
+
 def test_semantic_search_respects_project_filter(monkeypatch, tmp_path: Path) -> None:
     class FakeEmbeddingClient:
         def embed(self, texts):
@@ -2093,6 +2973,7 @@ def test_semantic_search_respects_project_filter(monkeypatch, tmp_path: Path) ->
     b_id = store.remember(session_b, kind="note", title="Alpha", body_text="Alpha B")
     store.end_session(session_b)
 
+    store.index_pending_vectors()
     results = store._semantic_search("alpha", limit=5, filters={"project": "/tmp/project-a"})
     ids = {item["id"] for item in results}
     assert a_id in ids
@@ -2124,6 +3005,7 @@ def test_semantic_search_respects_kind_filter(monkeypatch, tmp_path: Path) -> No
     )
     store.end_session(session)
 
+    store.index_pending_vectors()
     results = store._semantic_search("alpha", limit=10, filters={"kind": "note"})
     ids = {item["id"] for item in results}
     assert note_id in ids
@@ -2160,6 +3042,7 @@ def test_semantic_search_respects_project_and_kind_filter(monkeypatch, tmp_path:
     b_note = store.remember(b, kind="note", title="Alpha", body_text="Alpha")
     store.end_session(b)
 
+    store.index_pending_vectors()
     results = store._semantic_search(
         "alpha",
         limit=10,
@@ -2333,6 +3216,7 @@ def test_merge_ranked_results_shadow_logs_without_changing_baseline(
     )
 
     assert [item.id for item in ranked] == [1, 2]
+    store.flush_usage()
     row = store.conn.execute(
         "SELECT metadata_json FROM usage_events WHERE event = 'search_hybrid_shadow' ORDER BY id DESC LIMIT 1"
     ).fetchone()
@@ -2346,6 +3230,41 @@ def test_merge_ranked_results_shadow_logs_without_changing_baseline(
     assert metadata["position_shift_sum"] == 2
 
 
+def test_hybrid_search_logs_unexpected_vector_errors(tmp_path: Path, monkeypatch, caplog) -> None:
+    from codemem.store import search as search_module
+
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    try:
+        session = store.start_session(
+            cwd="/tmp",
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="/tmp/project-a",
+        )
+        memory_id = store.remember(session, kind="note", title="Deploy alpha", body_text="Alpha")
+        store._hybrid_retrieval_enabled = True
+
+        def missing_table(*_args, **_kwargs):
+            raise sqlite3.OperationalError("no such table: memory_vectors")
+
+        monkeypatch.setattr(search_module, "_vector_candidates", missing_table)
+        with caplog.at_level("ERROR", logger="codemem.store.search"):
+            assert [item.id for item in store.search("alpha", limit=5)] == [memory_id]
+        assert not caplog.records
+
+        def broken(*_args, **_kwargs):
+            raise ValueError("shape mismatch")
+
+        monkeypatch.setattr(search_module, "_vector_candidates", broken)
+        with caplog.at_level("ERROR", logger="codemem.store.search"):
+            assert [item.id for item in store.search("alpha", limit=5)] == [memory_id]
+        assert "vector lookup failed" in caplog.text
+    finally:
+        store.close()
+
+
 def test_merge_ranked_results_can_activate_hybrid(monkeypatch, tmp_path: Path) -> None:
     monkeypatch.setenv("CODEMEM_HYBRID_RETRIEVAL_ENABLED", "1")
     monkeypatch.setenv("CODEMEM_HYBRID_RETRIEVAL_SHADOW_LOG", "1")
@@ -2404,6 +3323,7 @@ def test_merge_ranked_results_can_activate_hybrid(monkeypatch, tmp_path: Path) -
     )
 
     assert [item.id for item in ranked] == [2, 1]
+    store.flush_usage()
     row = store.conn.execute(
         "SELECT metadata_json FROM usage_events WHERE event = 'search_hybrid_shadow' ORDER BY id DESC LIMIT 1"
     ).fetchone()
@@ -2582,6 +3502,47 @@ def test_record_raw_events_batch_assigns_monotonic_seqs(tmp_path: Path) -> None:
     assert seqs == [0, 1]
 
 
+def test_record_raw_events_batch_counts_duplicates_and_conflicts(tmp_path: Path) -> None:
+    store = MemoryStore(tmp_path / "mem.sqlite")
+    store.record_raw_events_batch(
+        opencode_session_id="sess",
+        events=[{"event_id": "a", "event_type": "t", "payload": {"path": "é.py"}}],
+    )
+    # Occupy the next server-assigned seq so one insert in the batch conflicts.
+    store.conn.execute(
+        """
+        INSERT INTO raw_events(opencode_session_id, event_id, event_seq, event_type,
+                               payload_json, created_at)
+        VALUES ('sess', 'manual', 1, 't', '{}', '2026-01-01T00:00:00Z')
+        """
+    )
+    store.conn.commit()
+
+    result = store.record_raw_events_batch(
+        opencode_session_id="sess",
+        events=[
+            {"event_id": "a", "event_type": "t", "payload": {}},
+            {"event_id": "b", "event_type": "t", "payload": {}},
+            {"event_id": "c", "event_type": "t", "payload": {}},
+            {"event_id": "c", "event_type": "t", "payload": {}},
+            {"event_id": "", "event_type": "t", "payload": {}},
+        ],
+    )
+
+    assert result == {"inserted": 1, "skipped": 4}
+    stats = store.conn.execute(
+        """
+        SELECT inserted_events, skipped_invalid, skipped_duplicate, skipped_conflict
+        FROM raw_event_ingest_stats WHERE id = 1
+        """
+    ).fetchone()
+    assert tuple(stats) == (2, 1, 2, 1)
+    payload = store.conn.execute(
+        "SELECT payload_json FROM raw_events WHERE event_id = 'a'"
+    ).fetchone()[0]
+    assert db.from_json(payload) == {"path": "é.py"}
+
+
 def test_raw_events_since_orders_by_ts_mono(tmp_path: Path) -> None:
     store = MemoryStore(tmp_path / "mem.sqlite")
     store.record_raw_events_batch(
@@ -3254,6 +4215,49 @@ def test_viewer_api_returns_json_500_on_store_init_failure(monkeypatch, tmp_path
         server.shutdown()
 
 
+def test_viewer_pack_reuses_pooled_reader_store(monkeypatch, tmp_path: Path) -> None:
+    db_path = tmp_path / "mem.sqlite"
+    monkeypatch.setenv("CODEMEM_DB", str(db_path))
+    seed = MemoryStore(db_path)
+    session = seed.start_session(
+        cwd=str(tmp_path),
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="proj-a",
+    )
+    seed.remember(session, kind="note", title="Login flow", body_text="Login flow notes")
+    seed.end_session(session)
+    seed.close()
+
+    opened: list[tuple[str, str]] = []
+
+    def tracking_store(path: str, role: str) -> MemoryStore:
+        opened.append((str(path), role))
+        return MemoryStore(path, check_same_thread=False, role=role)
+
+    pool = ViewerStorePool(tracking_store, size=2)
+    monkeypatch.setattr(viewer_module, "VIEWER_STORE_POOL", pool)
+    server = HTTPServer(("127.0.0.1", 0), ViewerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = int(server.server_address[1])
+    try:
+        for _ in range(2):
+            http_conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            http_conn.request("GET", "/api/pack?context=login&project=proj-a&limit=3")
+            resp = http_conn.getresponse()
+            data = json.loads(resp.read().decode("utf-8"))
+            assert resp.status == 200
+            assert any("Login" in item["title"] for item in data["items"])
+            assert data["metrics"]["project"] == "proj-a"
+        assert opened == [(str(db_path), "reader")]
+    finally:
+        server.shutdown()
+        pool.close()
+
+
 def test_viewer_rejects_message_id_as_session_id(monkeypatch, tmp_path: Path) -> None:
     db_path = tmp_path / "mem.sqlite"
     monkeypatch.setenv("CODEMEM_DB", str(db_path))
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+from codemem.sweeper_benchmark import SWEEPER_PROBES, benchmark_sweeper_queries
+
+
+def test_sweeper_benchmark_reports_each_size() -> None:
+    results = benchmark_sweeper_queries([200, 400], sessions=4, repeat=1)
+
+    assert [result["events"] for result in results] == [200, 400]
+    assert set(results[0]["seconds"]) == set(SWEEPER_PROBES)
@@ -558,9 +558,9 @@ def test_sync_once_updates_addresses_from_mdns(monkeypatch, tmp_path: Path) -> N
     finally:
         conn.close()
 
-    monkeypatch.setattr("codemem.cli_app.mdns_enabled", lambda: True)
+    monkeypatch.setattr("codemem.sync.discovery.mdns_enabled", lambda: True)
     monkeypatch.setattr(
-        "codemem.cli_app.discover_peers_via_mdns",
+        "codemem.sync.discovery.discover_peers_via_mdns",
         lambda: [{"host": "192.168.1.22", "port": 7337, "properties": {"device_id": "peer-1"}}],
     )
     monkeypatch.setattr("codemem.sync.sync_pass.sync_pass_preflight", lambda store: None)
@@ -608,8 +608,10 @@ def test_sync_once_runs_preflight(monkeypatch, tmp_path: Path) -> None:
 
     monkeypatch.setattr("codemem.store.MemoryStore.migrate_legacy_import_keys", fake_legacy)
     monkeypatch.setattr("codemem.store.MemoryStore.backfill_replication_ops", fake_backfill)
-    monkeypatch.setattr("codemem.cli_app.run_sync_pass", lambda store, peer, **k: {"ok": True})
-    monkeypatch.setattr("codemem.cli_app.mdns_enabled", lambda: False)
+    monkeypatch.setattr(
+        "codemem.sync.sync_pass.run_sync_pass", lambda store, peer, **k: {"ok": True}
+    )
+    monkeypatch.setattr("codemem.sync.discovery.mdns_enabled", lambda: False)
 
     result = runner.invoke(app, ["sync", "once", "--db-path", str(db_path)])
     assert result.exit_code == 0
@@ -769,7 +769,7 @@ def test_sync_once_backfills_tags_and_vectors_for_incoming_upserts(
             lambda **kwargs: {},
         )
 
-        captured: dict[str, list[int]] = {"tags": [], "vectors": []}
+        captured: dict[str, list[int]] = {"tags": [], "vectors": [], "queued": []}
 
         def fake_backfill_tags_text(*, memory_ids=None, active_only=True, **kwargs):
             captured["tags"] = list(memory_ids or [])
@@ -780,7 +780,13 @@ def test_sync_once_backfills_tags_and_vectors_for_incoming_upserts(
             return {"checked": len(captured["vectors"]), "embedded": 0, "inserted": 0, "skipped": 0}
 
         monkeypatch.setattr(store, "backfill_tags_text", fake_backfill_tags_text)
+
+        def fake_enqueue_vector_index(memory_ids):
+            captured["queued"] = list(memory_ids)
+            return len(captured["queued"])
+
         monkeypatch.setattr(store, "backfill_vectors", fake_backfill_vectors)
+        monkeypatch.setattr(store, "enqueue_vector_index", fake_enqueue_vector_index)
         monkeypatch.setattr(
             store,
             "apply_replication_ops",
@@ -816,7 +822,9 @@ def test_sync_once_backfills_tags_and_vectors_for_incoming_upserts(
         result = sync_pass.sync_once(store, "peer-1", ["127.0.0.1:7337"], limit=10)
         assert result["ok"] is True
         assert captured["tags"] == [memory_id]
+        # Without a vector indexer in this process, incoming memories embed inline.
         assert captured["vectors"] == [memory_id]
+        assert captured["queued"] == []
     finally:
         store.close()
 
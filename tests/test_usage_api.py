@@ -32,15 +32,15 @@ def test_api_usage_totals_respect_project_filter(tmp_path: Path, monkeypatch) ->
         )
         conn.execute(
             """
-            INSERT INTO usage_events(session_id, event, tokens_read, tokens_written, tokens_saved, created_at, metadata_json)
-            VALUES (1, 'pack', 10, 0, 5, '2026-01-01T00:00:01Z', ?)
+            INSERT INTO usage_events(session_id, event, tokens_read, tokens_written, tokens_saved, created_at, metadata_json, project, project_key)
+            VALUES (1, 'pack', 10, 0, 5, '2026-01-01T00:00:01Z', ?, 'codemem', 'codemem')
             """,
             (json.dumps({"project": "codemem"}),),
         )
         conn.execute(
             """
-            INSERT INTO usage_events(session_id, event, tokens_read, tokens_written, tokens_saved, created_at, metadata_json)
-            VALUES (2, 'pack', 20, 0, 7, '2026-01-01T00:00:02Z', ?)
+            INSERT INTO usage_events(session_id, event, tokens_read, tokens_written, tokens_saved, created_at, metadata_json, project, project_key)
+            VALUES (2, 'pack', 20, 0, 7, '2026-01-01T00:00:02Z', ?, 'dotfiles', 'dotfiles')
             """,
             (json.dumps({"project": "dotfiles"}),),
         )
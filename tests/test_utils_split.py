@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import os
+
+import codemem.git_info as git_info
 import codemem.redaction as redaction
 import codemem.utils as utils
 
@@ -18,3 +21,33 @@ def test_strip_ansi_is_stable_through_utils_facade() -> None:
 
 def test_resolve_project_accepts_override() -> None:
     assert utils.resolve_project("/tmp", override=" demo ") == "demo"
+
+
+def test_cached_git_info_reuses_result_until_index_changes(monkeypatch, tmp_path) -> None:
+    git_dir = tmp_path / ".git"
+    git_dir.mkdir()
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    index = git_dir / "index"
+    index.write_text("one")
+    (tmp_path / "pkg").mkdir()
+    calls: list[str] = []
+
+    def fake_detect(cwd: str) -> dict[str, str | None]:
+        calls.append(cwd)
+        return {"repo_root": str(tmp_path), "status": f"call {len(calls)}"}
+
+    monkeypatch.setattr(git_info, "detect_git_info", fake_detect)
+    monkeypatch.setattr(git_info, "_GIT_INFO_CACHE", {})
+    monkeypatch.setenv("CODEMEM_GIT_CONTEXT_TTL_MS", "60000")
+    cwd = str(tmp_path / "pkg")
+
+    assert git_info.cached_git_info(cwd)["status"] == "call 1"
+    assert git_info.cached_git_info(cwd)["status"] == "call 1"
+    assert len(calls) == 1
+
+    stat = index.stat()
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert git_info.cached_git_info(cwd)["status"] == "call 2"
+
+    monkeypatch.setenv("CODEMEM_GIT_CONTEXT_TTL_MS", "0")
+    assert git_info.cached_git_info(cwd)["status"] == "call 3"
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from codemem import semantic
+from codemem.store import MemoryStore
+from codemem.store import vectors as vectors_module
+from codemem.viewer_vector_index import VectorIndexWorker
+
+
+class FakeEmbeddingClient:
+    model = "fake-model"
+
+    def embed(self, texts):
+        return [[0.1] * 384 for _ in texts]
+
+
+def test_vector_index_worker_drains_queue_in_batches(monkeypatch, tmp_path: Path) -> None:
+    db_path = tmp_path / "mem.sqlite"
+    monkeypatch.setenv("CODEMEM_DB", str(db_path))
+    monkeypatch.setenv("CODEMEM_VECTOR_INDEXER_LIMIT", "2")
+    monkeypatch.setenv("CODEMEM_VECTOR_INDEX_ASYNC", "1")
+    client = FakeEmbeddingClient()
+    monkeypatch.setattr(semantic, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(vectors_module, "get_embedding_client", lambda: client)
+
+    store = MemoryStore(db_path)
+    try:
+        session = store.start_session(
+            cwd=str(tmp_path),
+            git_remote=None,
+            git_branch="main",
+            user="tester",
+            tool_version="test",
+            project="test-project",
+        )
+        for index in range(5):
+            store.remember(session, kind="discovery", title=f"Note {index}", body_text="Body")
+        assert store.vector_index_status()["pending"] == 5
+    finally:
+        store.close()
+
+    assert VectorIndexWorker().tick() == 5
+
+    store = MemoryStore(db_path)
+    try:
+        assert store.vector_index_status()["pending"] == 0
+        count = store.conn.execute("SELECT COUNT(*) FROM memory_vectors").fetchone()[0]
+        assert count == 5
+    finally:
+        store.close()
+
+
+def test_vector_index_worker_disabled_when_writes_embed_inline(monkeypatch) -> None:
+    monkeypatch.setenv("CODEMEM_VECTOR_INDEX_ASYNC", "0")
+    assert VectorIndexWorker().enabled() is False
+    assert VectorIndexWorker().tick() == 0
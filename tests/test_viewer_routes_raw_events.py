@@ -107,6 +107,7 @@ def test_handle_post_rejects_oversized_payload(monkeypatch) -> None:
     assert store_factory_called is False
     assert store.closed is False
     assert flusher.noted == []
+    assert handler.close_connection is True
 
 
 def test_handle_post_accepts_payload_within_size_limit(monkeypatch) -> None:
@@ -307,6 +308,16 @@ def test_handle_get_raw_events_status_returns_items_and_totals() -> None:
         },
     }
 
+    handler = DummyHandler(body=b"", content_length=0)
+    raw_events.handle_get(
+        handler,
+        store,
+        "/api/raw-events/status",
+        "",
+        flush_metrics=lambda: {"in_flight": 2},
+    )
+    assert handler.response["flush_pool"] == {"in_flight": 2}
+
 
 def test_handle_get_raw_events_status_rejects_bad_limit() -> None:
     handler = DummyHandler(body=b"", content_length=0)
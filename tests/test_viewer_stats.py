@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from codemem.store import MemoryStore
+from codemem.viewer_stats import StatsSnapshot
+
+
+def _add_memory(store: MemoryStore) -> None:
+    session = store.start_session(
+        cwd="/tmp",
+        git_remote=None,
+        git_branch="main",
+        user="tester",
+        tool_version="test",
+        project="test-project",
+    )
+    store.remember(session, kind="note", title="Note", body_text="Body")
+
+
+def _opener(db_path: Path, opened: list[int] | None = None):
+    @contextmanager
+    def open_store() -> Iterator[MemoryStore]:
+        if opened is not None:
+            opened.append(1)
+        store = MemoryStore(db_path)
+        try:
+            yield store
+        finally:
+            store.close()
+
+    return open_store
+
+
+def test_stats_snapshot_serves_cached_payload_within_ttl(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_STATS_TTL_S", "3600")
+    snapshot = StatsSnapshot()
+    db_path = tmp_path / "mem.sqlite"
+    opened: list[int] = []
+    store = MemoryStore(db_path)
+    try:
+        first = snapshot.get(db_path, _opener(db_path, opened))
+        _add_memory(store)
+        second = snapshot.get(db_path, _opener(db_path, opened))
+    finally:
+        store.close()
+
+    assert first["as_of"]
+    assert second is first
+    # Only the cold request opens a store.
+    assert len(opened) == 1
+    assert second["database"]["memory_items"] == 0
+
+
+def test_stats_snapshot_refreshes_stale_payload_in_background(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_STATS_TTL_S", "0.01")
+    snapshot = StatsSnapshot()
+    db_path = tmp_path / "mem.sqlite"
+    store = MemoryStore(db_path)
+    try:
+        first = snapshot.get(db_path, _opener(db_path))
+        _add_memory(store)
+        time.sleep(0.02)
+        stale = snapshot.get(db_path, _opener(db_path))
+        deadline = time.monotonic() + 5
+        refreshed = stale
+        while refreshed is stale and time.monotonic() < deadline:
+            time.sleep(0.01)
+            refreshed = snapshot._snapshots[str(db_path)][0]
+    finally:
+        store.close()
+
+    assert stale is first
+    assert refreshed["database"]["memory_items"] == 1
+    assert refreshed["as_of"] >= first["as_of"]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from codemem import db
+from codemem.store import MemoryStore
+from codemem.viewer_store_pool import ViewerStorePool
+
+
+def test_reader_reuses_pooled_store(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "mem.sqlite"))
+    pool = ViewerStorePool(size=2)
+    try:
+        with pool.reader() as first:
+            pass
+        with pool.reader() as second:
+            assert second is first
+            assert second.conn.execute("SELECT 1").fetchone()[0] == 1
+    finally:
+        pool.close()
+
+
+def test_reader_reopens_when_db_path_changes(monkeypatch, tmp_path: Path) -> None:
+    pool = ViewerStorePool(size=2)
+    try:
+        monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "a.sqlite"))
+        with pool.reader() as first:
+            pass
+        monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "b.sqlite"))
+        with pool.reader() as second:
+            assert second is not first
+            assert second.db_path == tmp_path / "b.sqlite"
+    finally:
+        pool.close()
+
+
+def test_writer_is_not_blocked_by_busy_readers(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "mem.sqlite"))
+    pool = ViewerStorePool(size=1)
+    reader_started = threading.Event()
+    release_reader = threading.Event()
+
+    def hold_reader() -> None:
+        with pool.reader():
+            reader_started.set()
+            release_reader.wait(5)
+
+    thread = threading.Thread(target=hold_reader)
+    thread.start()
+    try:
+        assert reader_started.wait(5)
+        lease = pool.writer_lease()
+        result = lease.record_raw_events_batch(
+            opencode_session_id="sess-1",
+            events=[{"event_id": "evt-1", "event_type": "test", "payload": {}}],
+        )
+        lease.close()
+        assert result["inserted"] == 1
+        # The lease hands the writer back open, so the next write reuses it.
+        with pool.writer() as writer:
+            assert writer.conn.execute("SELECT COUNT(*) FROM raw_events").fetchone()[0] == 1
+    finally:
+        release_reader.set()
+        thread.join()
+        pool.close()
+
+
+def test_readers_and_writer_open_with_their_connection_profiles(
+    monkeypatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("CODEMEM_DB", str(tmp_path / "mem.sqlite"))
+    roles: list[str] = []
+
+    def open_store(db_path: str, role: str) -> MemoryStore:
+        roles.append(role)
+        return MemoryStore(db_path, check_same_thread=False, role=role)
+
+    pool = ViewerStorePool(open_store, size=1)
+    try:
+        with pool.reader() as reader:
+            reader_settings = db.connection_settings(reader.conn)
+        with pool.writer() as writer:
+            writer_settings = db.connection_settings(writer.conn)
+    finally:
+        pool.close()
+
+    assert roles == ["reader", "writer"]
+    assert reader_settings == db.connection_profile("reader")
+    assert writer_settings == db.connection_profile("writer")